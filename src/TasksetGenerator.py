@@ -4,10 +4,13 @@
 # @author Wonseo Choi
 
 import os
+import json
 from datetime import datetime 
 from tasksets.BasicTaskSet import BasicTaskSet
 from tasksets.DagTaskSet import DagTaskSet
-from tasksets.CustomTaskSet import CustomTaskSet
+from tasksets.CustomTaskSet import CustomTaskSet, load_template, template_grid
+from tasksets.LFWriter import LFWriter
+from profiling.Profiler import PROFILER
 
 class TasksetGenerator(object):
     
@@ -18,13 +21,17 @@ class TasksetGenerator(object):
             'timeout': {'value': 10, 'timeUnit': 'sec'},
             'min_workers': 1,
             'max_workers': 20,
-            'deadline': {'value': 100, 'timeUnit': 'msec'}
+            'deadline': {'value': 100, 'timeUnit': 'msec'},
+            'tracing': False,
+            # Defines TASK_SET_MISS_PROGRESS: the deadline miss progress lines of early termination
+            'miss_progress': False
         }
         self.basic_config = {
             'periodicity': 'sporadic',
             'period': {'value': 0, 'timeUnit': 'sec'},
             'num_tasks': 20,
             'utilization': 0.6,
+            'p_deadline': 0.6,
             'seed': datetime.now()
         }
         self.dag_config = {
@@ -33,9 +40,13 @@ class TasksetGenerator(object):
             'num_outputs': 4,
             'execution_time': {'value': 100, 'timeUnit': 'msec'}
         }
+        self.custom_config = {
+            # Values of the placeholders declared by the custom template
+            'params': {}
+        }
 
     def setConfig(self, config) :
-        configs = [self.config, self.basic_config, self.dag_config]
+        configs = [self.config, self.basic_config, self.dag_config, self.custom_config]
 
         for key, value in config.items():
             for c in configs:
@@ -43,7 +54,10 @@ class TasksetGenerator(object):
                     c[key] = value
     
     # Generate taskset LF files to speicific directory.
-    def makeLF(self, templateDir='./', outputDir='./', template_path=''):
+    # writer: optional LFWriter collecting the manifest of written files.
+    # Files that already hold the generated contents are not rewritten.
+    # model: TaskSetModel rendered instead of drawing a new task set (basic and dag).
+    def makeLF(self, templateDir='./', outputDir='./', template_path='', writer=None, model=None):
         TEMPLATE_PATH = f'{templateDir}/{self.config["type"].capitalize()}TaskSetGeneratorTemplate.lf'
         if len(template_path) > 0:
             TEMPLATE_PATH = template_path
@@ -61,22 +75,131 @@ class TasksetGenerator(object):
             '$TOTAL_TIME$': f'{self.config["timeout"]["value"]} {self.config["timeout"]["timeUnit"]}'
         }   
 
-        if self.config['type'] == 'basic':
-            basic_taskset = BasicTaskSet(TEMPLATE_PATH=TEMPLATE_PATH)
-            basic_taskset.setConfig(self.config)
-            basic_taskset.setConfig(self.basic_config)
-            generated_files = basic_taskset.makeLF(outputDir=outputDir)
-
-        elif self.config['type'] == 'dag':
-            dag_taskset = DagTaskSet(TEMPLATE_PATH=TEMPLATE_PATH)
-            dag_taskset.setConfig(self.config)
-            dag_taskset.setConfig(self.dag_config)
-            generated_files = dag_taskset.makeLF(outputDir=outputDir)
-        
-        elif self.config['type'] == 'custom':
-            custom_taskset = CustomTaskSet(TEMPLATE_PATH=TEMPLATE_PATH)
-            custom_taskset.setConfig(self.config)
-            generated_files = custom_taskset.makeLF(outputDir=outputDir)
-        
+        if writer == None:
+            writer = LFWriter()
+        num_written, num_unchanged = writer.count('written'), writer.count('unchanged')
+
+        with PROFILER.stage('generate', type=self.config['type'], output=outputDir):
+            if self.config['type'] == 'basic':
+                basic_taskset = BasicTaskSet(TEMPLATE_PATH=TEMPLATE_PATH)
+                basic_taskset.setConfig(self.config)
+                basic_taskset.setConfig(self.basic_config)
+                generated_files = basic_taskset.makeLF(outputDir=outputDir, writer=writer, model=model)
+
+            elif self.config['type'] == 'dag':
+                dag_taskset = DagTaskSet(TEMPLATE_PATH=TEMPLATE_PATH)
+                dag_taskset.setConfig(self.config)
+                dag_taskset.setConfig(self.dag_config)
+                generated_files = dag_taskset.makeLF(outputDir=outputDir, writer=writer, model=model)
+
+            elif self.config['type'] == 'custom':
+                custom_taskset = CustomTaskSet(TEMPLATE_PATH=TEMPLATE_PATH)
+                custom_taskset.setConfig(self.config)
+                custom_taskset.setConfig(self.custom_config)
+                generated_files = custom_taskset.makeLF(outputDir=outputDir, writer=writer)
 
+        print(f"{writer.count('written') - num_written} files written, {writer.count('unchanged') - num_unchanged} unchanged: {outputDir}")
         return generated_files
+
+    # Draw the task set of the config without rendering it (see tasksets/TaskSetModel.py)
+    def makeModel(self, templateDir='./', template_path=''):
+        TEMPLATE_PATH = template_path if len(template_path) > 0 else f'{templateDir}/{self.config["type"].capitalize()}TaskSetGeneratorTemplate.lf'
+        with PROFILER.stage('model', type=self.config['type']):
+            if self.config['type'] == 'basic':
+                taskset = BasicTaskSet(TEMPLATE_PATH=TEMPLATE_PATH)
+                taskset.setConfig(self.config)
+                taskset.setConfig(self.basic_config)
+            elif self.config['type'] == 'dag':
+                taskset = DagTaskSet(TEMPLATE_PATH=TEMPLATE_PATH)
+                taskset.setConfig(self.config)
+                taskset.setConfig(self.dag_config)
+            else:
+                raise RuntimeError("Only 'basic' and 'dag' task sets have a model")
+            return taskset.model()
+
+    # Generator configured as the one that drew model; makeLF(model=model) renders it again
+    @staticmethod
+    def fromModel(model):
+        generator = TasksetGenerator()
+        generator.setConfig(model.settings)
+        generator.setConfig({'type': model.type})
+        return generator
+
+    # Sweep grid of a custom template: one {name: value} per combination of the values its
+    # placeholders declare (see tasksets/CustomTaskSet.py); grid {name: [values]} replaces some.
+    # Generate the points with setConfig({'params': point}) or makeBulk.
+    @staticmethod
+    def templateGrid(template_path, grid=None):
+        if not os.path.isfile(template_path):
+            raise RuntimeError("No template file of task generator: " + template_path)
+        return template_grid(load_template(template_path), grid)
+
+    # Seeds of num_tasksets replicas: the configured seed, then seeds spawned from it.
+    def replicaSeeds(self, num_tasksets):
+        import numpy as np
+        base_seed = self.basic_config['seed'] if self.config['type'] == 'basic' else self.dag_config['seed']
+        if not isinstance(base_seed, int):
+            base_seed = int(round(datetime.now().timestamp()))
+        return [base_seed] + [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(base_seed).spawn(num_tasksets)[1:]]
+
+    # Generate num_tasksets independently seeded task sets of the same configuration,
+    # each into outputDir/taskset_<k>/src. Set 0 keeps the configured seed; the others
+    # are spawned from it, so the same seed always reproduces the same replicas.
+    def makeReplicas(self, num_tasksets, templateDir='./', outputDir='./', template_path=''):
+        if self.config['type'] == 'custom' and num_tasksets > 1:
+            raise RuntimeError("Custom task sets have no random seed to replicate")
+
+        seeds = self.replicaSeeds(num_tasksets)
+        base_seed = seeds[0]
+
+        replicas = []
+        for k, seed in enumerate(seeds):
+            self.setConfig({'seed': seed})
+            replicas.append({
+                'seed': seed,
+                'files': self.makeLF(templateDir=templateDir, outputDir=f'{outputDir}/taskset_{k}/src', template_path=template_path)
+            })
+        self.setConfig({'seed': base_seed})
+
+        return replicas
+
+    # Generate one task set per entry of configs (settings over this generator's), each
+    # into outputDir/config_<i>/src, spread over a pool of processes (os.cpu_count() if
+    # None). An entry may name its template with 'template'. Returns
+    # {'datasets': [generated files per entry], 'manifest': [{'index', 'path', 'sha256', 'bytes'}]},
+    # and saves the manifest to outputDir/manifest.json.
+    def makeBulk(self, configs, templateDir='./', outputDir='./', processes=None):
+        # Only bulk generation needs the pool; importing it costs every cli.py start
+        from concurrent.futures import ProcessPoolExecutor
+
+        base = (self.config, self.basic_config, self.dag_config, self.custom_config)
+        jobs = [(base, config, templateDir, f'{outputDir}/config_{i}/src') for i, config in enumerate(configs)]
+
+        processes = processes if processes != None else (os.cpu_count() or 1)
+        chunksize = max(1, len(jobs) // (processes * 4))
+        with PROFILER.stage('bulk', configs=len(jobs), processes=processes):
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                results = list(pool.map(generate_config, jobs, chunksize=chunksize))
+
+        manifest = []
+        for i, (files, written) in enumerate(results):
+            manifest += [dict(entry, index=i) for entry in written]
+        os.makedirs(outputDir, exist_ok=True)
+        LFWriter().write(f'{outputDir}/manifest.json', json.dumps(manifest, indent=1))
+
+        return {'datasets': [files for files, _ in results], 'manifest': manifest}
+
+# makeBulk job, run in a pool process: (generated files, manifest entries)
+def generate_config(job):
+    (config, basic_config, dag_config, custom_config), overrides, templateDir, outputDir = job
+    generator = TasksetGenerator()
+    generator.config.update(config)
+    generator.basic_config.update(basic_config)
+    generator.dag_config.update(dag_config)
+    generator.custom_config.update(custom_config)
+    generator.setConfig(overrides)
+
+    writer = LFWriter()
+    files = generator.makeLF(templateDir=templateDir, outputDir=outputDir,
+                             template_path=overrides.get('template', ''), writer=writer)
+    return files, writer.manifest
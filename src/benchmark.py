@@ -0,0 +1,135 @@
+# Benchmarks of the task set generator pipeline. (Command line interface version.)
+# `python3 benchmark.py orchestration` measures the overhead, parallel scaling and parser
+# throughput of building and running task sets, with a fake LF toolchain
+# (benchmarks/FakeToolchain.py) instead of LF_PATH, so it runs on any Linux machine.
+# `python3 benchmark.py generator` times the generator's hot paths over growing sizes,
+# stores the results per git revision and flags regressions against a baseline revision.
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+from datetime import datetime
+
+from profiling.Profiler import PROFILER
+
+class BenchmarkCLI(object):
+    def __init__(self):
+        parser = argparse.ArgumentParser(description="Benchmarks of the task set generator pipeline.")
+        benchmarks = parser.add_subparsers(dest='benchmark', required=True)
+
+        orchestration = benchmarks.add_parser('orchestration', help="Build/run orchestration and output parsing, with a fake LF toolchain")
+        orchestration.add_argument("--build_latency", type=float, default=0.05,
+                                   help="Set the seconds of every fake build")
+        orchestration.add_argument("--run_latency", type=float, default=0.1,
+                                   help="Set the seconds of every fake run")
+        orchestration.add_argument("--output_lines", type=int, default=200,
+                                   help="Set the task release lines printed by every fake run")
+        orchestration.add_argument("-J", "--jobs", nargs='+', type=int, default=[1, 2, 4, 8],
+                                   help="Set the numbers of parallel jobs to measure")
+        orchestration.add_argument("-NI", "--num_iteration", type=int, default=3,
+                                   help="Set the number of iterations")
+        orchestration.add_argument("-K", "--num_tasksets", type=int, default=2,
+                                   help="Set the number of task sets")
+        orchestration.add_argument("-BW", "--max_workers", type=int, default=4,
+                                   help="Set the maximum number of workers (files per scheduler)")
+        orchestration.add_argument("--parse_lines", nargs='+', type=int, default=[100, 10000, 100000],
+                                   help="Set the output sizes (lines) of the parser benchmark")
+        orchestration.add_argument("--no_profile", action='store_true',
+                                   help="Do not record the stage summary of every number of jobs")
+
+        generator = benchmarks.add_parser('generator', help="Time and peak memory of the task set generator")
+        generator.add_argument("--results", type=str, default='output/benchmarks/generator.json',
+                               help="Set the JSON file of the results of every git revision")
+        generator.add_argument("--baseline", type=str,
+                               help="Set the revision to compare with (default: the previous one in the results)")
+        generator.add_argument("--threshold", type=float, default=0.2,
+                               help="Flag cases whose time or peak memory grew by more than this fraction")
+        generator.add_argument("-NT", "--num_tasks", nargs='+', type=int, default=[10, 100, 1000, 10000],
+                               help="Set the numbers of tasks of basic task sets")
+        generator.add_argument("--max_depth", nargs='+', type=int, default=[4, 32, 256],
+                               help="Set the depths of DAG task sets")
+        generator.add_argument("--num_outputs", nargs='+', type=int, default=[4, 32, 128],
+                               help="Set the numbers of outputs of DAG task sets")
+        generator.add_argument("--repeat", type=int, default=5,
+                               help="Set the number of timing repeats (the best is kept)")
+
+        self.args = parser.parse_args()
+
+    def Run(self):
+        if self.args.benchmark == 'generator':
+            return self.Generator()
+
+        WORKING_DIR = os.getcwd()
+        output_dir = f'{WORKING_DIR}/output/benchmark_{int(round(datetime.now().timestamp()))}'
+        os.makedirs(output_dir, exist_ok=True)
+        results = self.Orchestration()
+
+        with open(f'{output_dir}/{self.args.benchmark}.json', 'w') as f:
+            json.dump(results, f, indent=1)
+        print(f"Saved the results to {output_dir}/{self.args.benchmark}.json")
+
+    def Orchestration(self):
+        from benchmarks.OrchestrationBenchmark import OrchestrationBenchmark
+
+        benchmark = OrchestrationBenchmark()
+        benchmark.setConfig({
+            'build_latency': self.args.build_latency,
+            'run_latency': self.args.run_latency,
+            'output_lines': self.args.output_lines,
+            'jobs': self.args.jobs,
+            'num_iteration': self.args.num_iteration,
+            'num_tasksets': self.args.num_tasksets,
+            'max_workers': self.args.max_workers,
+            'parse_lines': self.args.parse_lines,
+        })
+        if not self.args.no_profile:
+            PROFILER.enable()
+        with tempfile.TemporaryDirectory() as workDir:
+            results = benchmark.run(workDir)
+        OrchestrationBenchmark.print_results(results)
+        return results
+
+    def Generator(self):
+        from benchmarks.GeneratorBenchmark import GeneratorBenchmark, git_revision, save_results
+
+        benchmark = GeneratorBenchmark()
+        benchmark.setConfig({
+            'num_tasks': self.args.num_tasks,
+            'max_depth': self.args.max_depth,
+            'num_outputs': self.args.num_outputs,
+            'repeat': self.args.repeat,
+            'threshold': self.args.threshold,
+        })
+        revision = git_revision()
+        print(f"Generator benchmark of revision {revision}")
+        cases = benchmark.run()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.args.results)), exist_ok=True)
+        results = save_results(self.args.results, revision, cases)
+        print(f"Saved the results to {self.args.results}")
+
+        baseline = self.args.baseline
+        if baseline == None:
+            previous = sorted((r for r in results if r != revision), key=lambda r: results[r]['date'])
+            if len(previous) == 0:
+                print("No baseline revision to compare with")
+                return
+            baseline = previous[-1]
+        if baseline not in results:
+            raise RuntimeError("No results of the baseline revision: " + baseline)
+
+        flagged = benchmark.regressions(results[baseline]['cases'], cases)
+        if len(flagged) == 0:
+            print(f"No regressions against {baseline} (threshold {self.args.threshold:.0%})")
+            return
+        print(f"{len(flagged)} regressions against {baseline} (threshold {self.args.threshold:.0%}):")
+        for id, metric, before, after, ratio in flagged:
+            print(f"  {id} {metric}: {before:.6g} -> {after:.6g} ({ratio:.2f}x)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    cli = BenchmarkCLI()
+    cli.Run()
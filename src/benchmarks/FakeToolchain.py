@@ -0,0 +1,112 @@
+# Fake Toolchain
+# Stand-in for a Lingua Franca install, to test and benchmark the orchestration (generate,
+# build, run, parse) without a JVM or real runs. install(root) makes root usable as LF_PATH:
+#   root/gradlew                        ./gradlew runLfc --args <file>  -> BUILD SUCCESSFUL
+#   root/build/install/lf-cli/bin/lfc   lfc <file>                      -> Code generation finished.
+# Both "compile" <root>/src/<name>.lf into <root>/bin/<name>, a shell script that sleeps for
+# 'run_latency' seconds and prints 'output_lines' task release lines, the deadline miss
+# progress lines, then the '---- Deadline miss:' and '---- Elapsed physical' lines of a real
+# binary, and with 'summary' writes the same result as run summary (see runners/RunSummary.py).
+# Settings live in root/fake_lf.json, read on every build.
+
+import os
+import sys
+import json
+import time
+import random
+
+# Like the templates' C code, the fake binaries do not import runners/RunSummary.py
+SUMMARY_ENV = 'LF_TASKSET_SUMMARY'
+SUMMARY_VERSION = 1
+
+class FakeToolchain(object):
+
+    def __init__(self):
+        self.config = {
+            # Seconds per build and per run
+            'build_latency': 0.0,
+            'run_latency': 0.0,
+            # Task release lines printed by every run
+            'output_lines': 0,
+            # Reported execution time: run_latency (at least 1 msec) times 1 +- jitter
+            'jitter': 0.1,
+            # Deadline misses of a binary: drawn once per build between 0 and this
+            'max_deadline_misses': 0,
+            # Exit code of builds; anything but 0 makes them fail
+            'build_exit_code': 0,
+            # Write the run summary file, as the programs of the task set templates do
+            'summary': True,
+        }
+
+    def setConfig(self, config):
+        for key, value in config.items():
+            if key in self.config.keys():
+                self.config[key] = value
+
+    # Make root a fake LF_PATH; returns root.
+    def install(self, root):
+        lfc_dir = os.path.join(root, 'build', 'install', 'lf-cli', 'bin')
+        os.makedirs(lfc_dir, exist_ok=True)
+        self.save(root)
+        for path in [os.path.join(root, 'gradlew'), os.path.join(lfc_dir, 'lfc')]:
+            with open(path, 'w') as f:
+                f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.abspath(__file__)}" "{os.path.abspath(root)}" "$0" "$@"\n')
+            os.chmod(path, 0o755)
+        return root
+
+    # Write the settings read by the installed compilers
+    def save(self, root):
+        with open(os.path.join(root, 'fake_lf.json'), 'w') as f:
+            json.dump(self.config, f)
+
+# Output of a binary, as a real task set run prints it, and its run summary
+def program_output(config, rng):
+    run_latency = max(config['run_latency'], 0.001)
+    exe_time = int(run_latency * (1 + config['jitter'] * (2 * rng.random() - 1)) * 1000000000)
+    deadline_miss = rng.randint(0, config['max_deadline_misses'])
+
+    lines = []
+    for i in range(config['output_lines']):
+        lines.append(f"Task {i % 20} released at logical time {i * 1000000} nsec, physical time {i * 1000000 + 12345} nsec, execution time 1000000 nsec")
+    lines += [f"---- Deadline miss progress: {n + 1}" for n in range(deadline_miss)]
+    lines.append(f"---- Total reactions triggered: {config['output_lines']}\n")
+    lines.append(f"---- Deadline miss: {deadline_miss}\n")
+    lines.append(f"---- Elapsed physical time (in nsec): {exe_time:,}")
+    summary = {'version': SUMMARY_VERSION, 'elapsed_physical': exe_time, 'deadline_miss': deadline_miss,
+               'reactions_triggered': config['output_lines'], 'tasks': []}
+    return '\n'.join(lines) + '\n', summary
+
+def build(root, program, args):
+    with open(os.path.join(root, 'fake_lf.json')) as f:
+        config = json.load(f)
+    time.sleep(config['build_latency'])
+
+    # ./gradlew runLfc --args <file> or lfc <file>
+    gradlew = os.path.basename(program) == 'gradlew'
+    filepath = args[2] if gradlew else args[0]
+    if config['build_exit_code'] != 0:
+        print(f"Fake build failure of {filepath}")
+        return config['build_exit_code']
+
+    name = os.path.basename(filepath).split('.')[0]
+    bin_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(filepath))), 'bin')
+    os.makedirs(bin_dir, exist_ok=True)
+    binpath = os.path.join(bin_dir, name)
+    with open(filepath, 'rb') as f:
+        rng = random.Random(f.read())
+    output, summary = program_output(config, rng)
+    with open(binpath + '.out', 'w') as f:
+        f.write(output)
+    with open(binpath + '.summary.json', 'w') as f:
+        json.dump(summary, f)
+    with open(binpath, 'w') as f:
+        f.write(f'#!/bin/sh\nsleep {config["run_latency"]}\ncat "$0.out"\n')
+        if config.get('summary', True):
+            f.write(f'if [ -n "${SUMMARY_ENV}" ]; then cat "$0.summary.json" > "${SUMMARY_ENV}"; fi\n')
+    os.chmod(binpath, 0o755)
+
+    print("BUILD SUCCESSFUL in 1s" if gradlew else "Code generation finished.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(build(sys.argv[1], sys.argv[2], sys.argv[3:]))
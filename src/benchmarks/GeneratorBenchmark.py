@@ -0,0 +1,144 @@
+# Generator Benchmark
+# Time and peak memory of the task set generator's hot paths over growing sizes:
+#   basic.task_config                  num_tasks
+#   dag.task_config_multiple_inputs    max_depth x num_outputs
+#   dag.make_component_reactor         num_outputs
+#   basic.makeLF, dag.makeLF           whole generation (render loops and writes)
+# Results are stored in a JSON file keyed by git revision, and compared with a baseline
+# revision to flag regressions. Times are the best of several repeats (timeit), peak
+# memory is measured in a separate call with tracemalloc, which would slow the timing.
+# makeLF rewrites nothing after the first call (see LFWriter), so repeats measure
+# rendering plus comparing with the files already there.
+
+import io
+import json
+import timeit
+import platform
+import itertools
+import tempfile
+import contextlib
+import subprocess
+import tracemalloc
+from datetime import datetime
+
+from TasksetGenerator import TasksetGenerator
+from tasksets.BasicTaskSet import BasicTaskSet
+from tasksets.DagTaskSet import DagTaskSet
+
+class GeneratorBenchmark(object):
+
+    def __init__(self):
+        self.config = {
+            'templateDir': 'templates',
+            'num_tasks': [10, 100, 1000, 10000],
+            'max_depth': [4, 32, 256],
+            'num_outputs': [4, 32, 128],
+            # Files per makeLF call: schedulers x workers
+            'schedulers': ['NP', 'GEDF_NP'],
+            'max_workers': 4,
+            'repeat': 5,
+            # A case is flagged when its time or peak memory grows by more than this fraction
+            'threshold': 0.2,
+        }
+
+    def setConfig(self, config):
+        for key, value in config.items():
+            if key in self.config.keys():
+                self.config[key] = value
+
+    # [(case id, fn)]
+    def cases(self, outputDir):
+        cases = []
+        for num_tasks in self.config['num_tasks']:
+            for periodicity in ['sporadic', 'periodic']:
+                taskset = BasicTaskSet(TEMPLATE_PATH=f'{self.config["templateDir"]}/BasicTaskSetGeneratorTemplate.lf')
+                taskset.setConfig({'num_tasks': num_tasks, 'periodicity': periodicity, 'seed': 0,
+                                   'period': {'value': 100, 'timeUnit': 'msec'}})
+                cases.append((f'basic.task_config[num_tasks={num_tasks},periodicity={periodicity}]', taskset.task_config))
+
+        for max_depth, num_outputs in itertools.product(self.config['max_depth'], self.config['num_outputs']):
+            taskset = DagTaskSet(TEMPLATE_PATH=f'{self.config["templateDir"]}/DagTaskSetGeneratorTemplate.lf')
+            taskset.setConfig({'max_depth': max_depth, 'num_outputs': num_outputs})
+            cases.append((f'dag.task_config_multiple_inputs[max_depth={max_depth},num_outputs={num_outputs}]',
+                          lambda taskset=taskset: taskset.task_config_multiple_inputs(taskset.task_nodes(seed=0))))
+
+        for num_outputs in self.config['num_outputs']:
+            taskset = DagTaskSet(TEMPLATE_PATH=f'{self.config["templateDir"]}/DagTaskSetGeneratorTemplate.lf')
+            taskset.setConfig({'num_outputs': num_outputs})
+            cases.append((f'dag.make_component_reactor[num_outputs={num_outputs}]', taskset.make_component_reactor))
+
+        for num_tasks in self.config['num_tasks']:
+            cases.append((f'basic.makeLF[num_tasks={num_tasks}]',
+                          self.make_lf({'type': 'basic', 'num_tasks': num_tasks, 'periodicity': 'periodic',
+                                        'period': {'value': 100, 'timeUnit': 'msec'}}, f'{outputDir}/basic_{num_tasks}')))
+        for max_depth, num_outputs in itertools.product(self.config['max_depth'], self.config['num_outputs']):
+            cases.append((f'dag.makeLF[max_depth={max_depth},num_outputs={num_outputs}]',
+                          self.make_lf({'type': 'dag', 'max_depth': max_depth, 'num_outputs': num_outputs},
+                                       f'{outputDir}/dag_{max_depth}_{num_outputs}')))
+        return cases
+
+    def make_lf(self, config, outputDir):
+        generator = TasksetGenerator()
+        generator.setConfig({'schedulers': self.config['schedulers'], 'max_workers': self.config['max_workers'], 'seed': 0})
+        generator.setConfig(config)
+        return lambda: generator.makeLF(templateDir=self.config['templateDir'], outputDir=outputDir)
+
+    # {case id: {'seconds', 'number', 'peak_bytes'}}
+    def run(self):
+        results = {}
+        with tempfile.TemporaryDirectory() as outputDir:
+            for id, fn in self.cases(outputDir):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    timer = timeit.Timer(fn)
+                    number, _ = timer.autorange()
+                    seconds = min(timer.repeat(repeat=self.config['repeat'], number=number)) / number
+
+                    tracemalloc.start()
+                    fn()
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                results[id] = {'seconds': seconds, 'number': number, 'peak_bytes': peak}
+                print(f"{id:<70} {seconds * 1000:>10.3f} ms {peak / 1024:>10.1f} KiB")
+        return results
+
+    # Cases whose time or peak memory grew by more than the threshold:
+    # [(case id, metric, baseline, candidate, ratio)], worst first
+    def regressions(self, baseline, candidate):
+        flagged = []
+        for id, result in candidate.items():
+            if id not in baseline:
+                continue
+            for metric in ['seconds', 'peak_bytes']:
+                before, after = baseline[id][metric], result[metric]
+                if before > 0 and after / before > 1 + self.config['threshold']:
+                    flagged.append((id, metric, before, after, after / before))
+        return sorted(flagged, key=lambda r: -r[4])
+
+# Short hash of HEAD, with '-dirty' if the tree has changes; 'unknown' outside git.
+def git_revision():
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return revision + ('-dirty' if len(dirty) > 0 else '')
+
+# {revision: {'date', 'python', 'machine', 'cases': {...}}}
+def load_results(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_results(path, revision, cases):
+    results = load_results(path)
+    results[revision] = {
+        'date': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cases': cases,
+    }
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=1)
+    return results
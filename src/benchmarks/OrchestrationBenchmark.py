@@ -0,0 +1,134 @@
+# Orchestration Benchmark
+# Measures what the pipeline adds on top of the LF compiler and the binaries, with the
+# fake toolchain (benchmarks/FakeToolchain.py) standing in for both:
+#   scaling   measure_datasets wall time per number of jobs, against the ideal time of the
+#             fake latencies alone; the difference is the orchestration overhead
+#   parser    LFRunner.parse_lines throughput on outputs of growing size
+# Everything the pipeline prints is discarded while it is timed.
+
+import os
+import io
+import math
+import time
+import random
+import shutil
+import contextlib
+
+from TasksetGenerator import TasksetGenerator
+from runners.LFRunner import LFRunner
+from profiling.Profiler import PROFILER
+from benchmarks.FakeToolchain import FakeToolchain, program_output
+
+class OrchestrationBenchmark(object):
+
+    def __init__(self):
+        self.config = {
+            'build_latency': 0.05,
+            'run_latency': 0.1,
+            'output_lines': 200,
+            # Numbers of parallel jobs to measure
+            'jobs': [1, 2, 4, 8],
+            'num_iteration': 3,
+            'num_tasksets': 2,
+            'schedulers': ['NP', 'GEDF_NP'],
+            'max_workers': 4,
+            # Output sizes (task release lines) of the parser benchmark
+            'parse_lines': [100, 10000, 100000],
+            # Seconds spent on each parser measurement
+            'parse_time': 0.5,
+        }
+
+    def setConfig(self, config):
+        for key, value in config.items():
+            if key in self.config.keys():
+                self.config[key] = value
+
+    # Run both benchmarks in workDir (a fake LF_PATH and the task sets); returns their results.
+    def run(self, workDir):
+        toolchain = FakeToolchain()
+        toolchain.setConfig({'build_latency': self.config['build_latency'], 'run_latency': self.config['run_latency'],
+                             'output_lines': self.config['output_lines']})
+        os.environ['LF_PATH'] = toolchain.install(os.path.join(workDir, 'lf'))
+
+        generator = TasksetGenerator()
+        generator.setConfig({'schedulers': self.config['schedulers'], 'max_workers': self.config['max_workers'],
+                             'timeout': {'value': 1, 'timeUnit': 'sec'}, 'seed': 0})
+        with contextlib.redirect_stdout(io.StringIO()):
+            replicas = generator.makeReplicas(self.config['num_tasksets'], templateDir='templates',
+                                              outputDir=os.path.join(workDir, 'tasksets'))
+        datasets = [replica['files'] for replica in replicas]
+
+        return {
+            'config': dict(self.config),
+            'scaling': self.scaling(workDir, datasets),
+            'parser': self.parser(),
+        }
+
+    def scaling(self, workDir, datasets):
+        num_jobs = sum(len(files) for dataset in datasets for files in dataset['schedulers'].values())
+        job_time = self.config['build_latency'] + self.config['num_iteration'] * self.config['run_latency']
+
+        results = []
+        for jobs in self.config['jobs']:
+            # Build everything again
+            for k in range(len(datasets)):
+                shutil.rmtree(os.path.join(workDir, 'tasksets', f'taskset_{k}', 'bin'), ignore_errors=True)
+
+            runner = LFRunner()
+            runner.setConfig({'jobs': jobs})
+            if PROFILER.enabled:
+                # Stage summary of this number of jobs only
+                PROFILER.enable()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                runner.measure_datasets(datasets, self.config['num_iteration'])
+            wall_time = time.perf_counter() - start
+
+            # Jobs all take the same time, so they run in ceil(num_jobs / jobs) waves
+            ideal_time = math.ceil(num_jobs / jobs) * job_time
+            results.append({
+                'jobs': jobs,
+                'num_jobs': num_jobs,
+                'wall_time': wall_time,
+                'ideal_time': ideal_time,
+                'overhead': wall_time - ideal_time,
+                # Per build and run, as seen by one job slot
+                'overhead_per_step': (wall_time - ideal_time) * min(jobs, num_jobs) / (num_jobs * (self.config['num_iteration'] + 1)),
+                'speedup': results[0]['wall_time'] / wall_time if len(results) > 0 else 1.0,
+                'stages': PROFILER.summary() if PROFILER.enabled else {},
+            })
+        return results
+
+    def parser(self):
+        runner = LFRunner()
+        config = FakeToolchain().config
+        results = []
+        for lines in self.config['parse_lines']:
+            config['output_lines'] = lines
+            stdout, _ = program_output(config, random.Random(0))
+
+            count = 0
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                while count == 0 or time.perf_counter() - start < self.config['parse_time']:
+                    runner.parse_lines(stdout)
+                    count += 1
+            elapsed = (time.perf_counter() - start) / count
+            results.append({
+                'lines': lines,
+                'bytes': len(stdout),
+                'seconds': elapsed,
+                'lines_per_second': (lines + 3) / elapsed,
+                'megabytes_per_second': len(stdout) / elapsed / 1e6,
+            })
+        return results
+
+    @staticmethod
+    def print_results(results):
+        print(f"{'jobs':>5} {'wall (s)':>10} {'ideal (s)':>10} {'overhead (s)':>13} {'per step (ms)':>14} {'speedup':>8}")
+        for r in results['scaling']:
+            print(f"{r['jobs']:>5} {r['wall_time']:>10.3f} {r['ideal_time']:>10.3f} {r['overhead']:>13.3f} {r['overhead_per_step'] * 1000:>14.2f} {r['speedup']:>8.2f}")
+        print()
+        print(f"{'lines':>8} {'bytes':>10} {'parse (ms)':>11} {'lines/s':>12} {'MB/s':>8}")
+        for r in results['parser']:
+            print(f"{r['lines']:>8} {r['bytes']:>10} {r['seconds'] * 1000:>11.3f} {r['lines_per_second']:>12.0f} {r['megabytes_per_second']:>8.1f}")
@@ -1,15 +1,18 @@
 # A GUI program for task set generator. (Command line interface version.)
 # @author Wonseo Choi
-
-from plots import SavePlot
+#
+# `python3 cli.py generate ...` only writes the LF files. Plotting, the result store and
+# NumPy are imported where they are used, so that generating starts fast.
 
 import os
+import sys
 from datetime import datetime
 
 import argparse
 import csv
 
 from TasksetGenerator import TasksetGenerator
+from profiling.Profiler import PROFILER
 
 class CLI(object):
     def __init__(self):
@@ -17,13 +20,19 @@ class CLI(object):
             'schedulers':[]
         }
 
-        parser = argparse.ArgumentParser(description="A GUI program for task set generator. (Command line interface version.)")
+        # 'run' (default): generate, build, run and plot; 'generate': only write the LF files
+        self.command = 'run'
+        argv = sys.argv[1:]
+        if len(argv) > 0 and argv[0] == 'generate':
+            self.command = 'generate'
+            argv = argv[1:]
+
+        parser = argparse.ArgumentParser(description="A GUI program for task set generator. (Command line interface version.)",
+                                         prog=None if self.command == 'run' else f'{os.path.basename(sys.argv[0])} generate')
         # Set schdeulers
         parser.add_argument("-S", "--schedulers",  nargs='+', type=str, required=True,
                             help="Choose the schedulers: 'NP', 'GEDF_NP', 'GEDF_NP_CI, 'adaptive'")
         # Set General Configuration
-        parser.add_argument("-NI", "--num_iteration", type=int, required=True,
-                            help="Set the number of iterations")
         parser.add_argument("-D", "--deadline", nargs='+', type=str, required=True, default=["1", "sec"],
                             help="Set the dealine(ex. 1sec); can choose the unit(sec, msec, usec, nsec)")
         parser.add_argument("-TT", "--total_time", nargs='+', type=str, default=["1", "sec"],
@@ -56,10 +65,105 @@ class CLI(object):
         # Optional setting random seed
         parser.add_argument("--seed", type=int, default=1234,
                             help="Can set the random seed if the type is 'dag' or 'sporadic basic'")
+        parser.add_argument("--tracing", action='store_true',
+                            help="Build the task sets with LF tracing and plot per-worker timelines of every run")
+
+        if self.command == 'generate':
+            parser.add_argument("-O", "--output_dir", type=str, default='generated/src',
+                                help="Set the directory of the generated LF files")
+            parser.add_argument("--template_dir", type=str, default='templates',
+                                help="Set the directory of the task set templates")
+            parser.add_argument("--export", type=str,
+                                help="Save the task set model (.json or .npz) of the generated task set")
+            parser.add_argument("--model", type=str,
+                                help="Render a saved task set model (.json or .npz) instead of drawing a new one; -S and -BW still apply")
+            self.args, _ = parser.parse_known_args(argv)
+            return
+
+        parser.add_argument("-NI", "--num_iteration", type=int, required=True,
+                            help="Set the number of iterations")
+
+        # Replication: K independently seeded task sets per configuration, measured in parallel
+        parser.add_argument("-K", "--num_tasksets", type=int, default=5,
+                            help="Set the number of independently seeded task sets per configuration")
+        parser.add_argument("-J", "--jobs", type=int, default=1,
+                            help="Set the number of build/run jobs executed in parallel")
+
+        # Early termination; stopped runs are recorded as censored
+        parser.add_argument("--max_misses", type=int,
+                            help="Stop a run as soon as its deadline misses exceed this number")
+        parser.add_argument("--max_slowdown", type=float,
+                            help="Stop a run as soon as it is this many percent slower than the best scheduler so far")
+
+        # Noise control: warmup, randomized interleaving and environment checks
+        parser.add_argument("--interleave", action='store_true',
+                            help="Build everything first, then run every (scheduler, worker, iteration) in a random order")
+        parser.add_argument("--warmup", type=int, default=0,
+                            help="Set the number of discarded warmup runs per binary (with --interleave)")
+        parser.add_argument("--shuffle_seed", type=int,
+                            help="Set the random seed of the interleaved run order")
+        parser.add_argument("--max_load", type=float,
+                            help="Re-queue interleaved runs while the 1-minute load average, minus the runs in flight, exceeds this (default: number of CPUs)")
+        parser.add_argument("--governors", nargs='*', type=str, default=['performance'],
+                            help="Set the CPU frequency governors accepted without a warning (none: any)")
+        parser.add_argument("--max_requeues", type=int, default=3,
+                            help="Set how often a run is re-queued under bad conditions before it is kept")
+        parser.add_argument("--settle_time", type=float, default=5.0,
+                            help="Set the seconds to wait before a re-queued run is retried")
+        parser.add_argument("--sample_threads", action='store_true',
+                            help="Sample the CPU time of every worker thread from /proc during runs")
+        parser.add_argument("--keep_summaries", action='store_true',
+                            help="Keep the run summary (per-task releases and deadline misses) of every iteration")
+        parser.add_argument("--plot_processes", type=int, default=os.cpu_count() or 1,
+                            help="Set the number of processes rendering the graphs")
+        parser.add_argument("--no_profile", action='store_true',
+                            help="Do not time the pipeline stages (profile.json and the summary table)")
 
-        self.args, _ = parser.parse_known_args()
+        parser.add_argument("--estimate", action='store_true',
+                            help="Only print the expected wall-clock time of the measurements, from the store's history")
+
+        # Results already recorded in the store for the same config are not measured again
+        parser.add_argument("--store", type=str, default='output/results.db',
+                            help="Set the SQLite result store shared by runs (ex. --store output/results.db)")
+
+        self.args, _ = parser.parse_known_args(argv)
+
+    def Generate(self):
+        self.setConfig()
+        if self.taskConfig['min_workers'] > self.taskConfig['max_workers']:
+            raise RuntimeError("Minimum numbers of workers have to be smaller or equal to Maximum numbers of workers")
+
+        from tasksets.TaskSetModel import TaskSetModel
+
+        model = None
+        if self.args.model != None:
+            model = TaskSetModel.load(self.args.model)
+            generator = TasksetGenerator.fromModel(model)
+            generator.setConfig({key: self.taskConfig[key] for key in ['schedulers', 'min_workers', 'max_workers']})
+        else:
+            generator = TasksetGenerator()
+            generator.setConfig(self.taskConfig)
+        if self.args.export != None:
+            if model == None:
+                model = generator.makeModel(templateDir=self.args.template_dir)
+            model.save(self.args.export)
+            print(f"Saved the task set model ({len(model)} {'tasks' if model.type == 'basic' else 'nodes'}) to {self.args.export}")
+        generator.makeLF(templateDir=self.args.template_dir, outputDir=self.args.output_dir, model=model)
 
     def Run(self):
+        if self.command == 'generate':
+            return self.Generate()
+
+        from plots import SavePlot
+        from plots.TimelinePlot import TimelinePlot
+        from plots.LivePlot import LivePlot
+        from results.ResultStore import ResultStore
+        from runners.RunnerEvents import NDJSONLog
+        from sweeps.CostEstimator import CostEstimator
+        from runners.Environment import EnvironmentCheck
+
+        if not self.args.no_profile:
+            PROFILER.enable()
         self.setConfig()
         WORKING_DIR = os.getcwd()
 
@@ -68,7 +172,7 @@ class CLI(object):
 
         generator = TasksetGenerator()
         generator.setConfig(self.taskConfig)
-        generated_files = generator.makeLF(templateDir=f'{WORKING_DIR}/templates', outputDir=f'{WORKING_DIR}/.gui/src/')
+        replicas = generator.makeReplicas(self.args.num_tasksets, templateDir=f'{WORKING_DIR}/templates', outputDir=f'{WORKING_DIR}/.gui')
         print("Finished generating LF files!")
         
         plot_title = ''
@@ -79,32 +183,97 @@ class CLI(object):
             plot_title = f'DAG / Seed: {self.taskConfig["seed"]}'
             save_name = f'dag/seed_{self.taskConfig["seed"]}'
             
+        WORKING_DIR = os.getcwd()
+        output_dir = f'{WORKING_DIR}/output'
+        if not os.path.exists(output_dir):
+            os.mkdir(output_dir)
+
+        store = ResultStore(os.path.join(WORKING_DIR, self.args.store))
+        config_hashes = [store.add_config(dict(self.taskConfig, seed=r['seed'])) for r in replicas]
+
+        # Expected duration of every (task set, scheduler, worker) job; the longest start first
+        estimator = CostEstimator().fit(os.path.join(WORKING_DIR, self.args.store))
+        tasks = estimator.measure_tasks([(dict(self.taskConfig, seed=r['seed']), h) for r, h in zip(replicas, config_hashes)],
+                                        self.args.num_iteration, store)
+        print(estimator.summary(CostEstimator.plan(tasks, self.args.jobs)))
+        if self.args.estimate:
+            store.close()
+            return
+        costs = {task['key']: task['cost'] for task in tasks}
+
         plot_generator = SavePlot.PlotGenerator()
         plot_generator.setConfig({
             'title': plot_title,
-            'dataset': generated_files,
+            'dataset': [r['files'] for r in replicas],
             'num_iteration': self.args.num_iteration,
-            'save_name': save_name
+            'save_name': save_name,
+            'processes': self.args.plot_processes,
+            'jobs': self.args.jobs,
+            'store': store,
+            'config_hash': config_hashes
         })
-
-        WORKING_DIR = os.getcwd()
-        output_dir = f'{WORKING_DIR}/output'
-        if not os.path.exists(output_dir):
-            os.mkdir(output_dir)
+        
+        plot_generator.runner.setConfig({
+            'max_deadline_misses': self.args.max_misses,
+            'max_slowdown': self.args.max_slowdown,
+            'sample_threads': self.args.sample_threads,
+            'keep_summaries': self.args.keep_summaries,
+            'tracing': self.args.tracing,
+            'job_cost': lambda k, scheduler, worker, filepath: costs.get((k, scheduler, worker), 0.0)
+        })
+        if self.args.interleave:
+            environment = EnvironmentCheck()
+            environment.setConfig({'max_load': self.args.max_load, 'governors': self.args.governors})
+            plot_generator.runner.setConfig({
+                'interleave': True,
+                'warmup': self.args.warmup,
+                'shuffle_seed': self.args.shuffle_seed,
+                'environment': environment,
+                'max_requeues': self.args.max_requeues,
+                'settle_time': self.args.settle_time,
+            })
         
         output_dir = f'{output_dir}/{int(round(datetime.now().timestamp()))}'
         if not os.path.exists(output_dir):
             os.mkdir(output_dir)
             os.mkdir(os.path.join(output_dir, self.taskConfig['type']))
+
+        # Watch the sweep while it runs: live.png is refreshed every few seconds and
+        # events.ndjson can be tailed by dashboards
+        live_plot = LivePlot()
+        live_plot.setConfig({'title': plot_title})
+        plot_generator.runner.events.subscribe(live_plot.png_subscriber(f'{output_dir}/live.png'))
+        event_log = plot_generator.runner.events.subscribe(NDJSONLog(f'{output_dir}/events.ndjson'))
         
         exe_times, deadline_misses = plot_generator.plot_graph(output_dir)
+        event_log.close()
         result = {
             'workers': [w for w in range(self.taskConfig['min_workers'], self.taskConfig['max_workers']+1)],
             'exe_times': exe_times,
-            'deadline_misses': deadline_misses
+            'deadline_misses': deadline_misses,
+            'exe_time_stats': plot_generator.exe_time_stats,
+            'deadline_miss_stats': plot_generator.deadline_miss_stats,
+            'exe_time_replicas': plot_generator.exe_time_replicas,
+            'censored_runs': plot_generator.censored_runs,
+            'noisy_runs': plot_generator.noisy_runs,
+            'resources': plot_generator.resources,
+            'seeds': [r['seed'] for r in replicas]
         }
 
         self.saveResult(result, output_dir)
+        store.close()
+
+        if self.args.tracing:
+            timeline = TimelinePlot()
+            for k in range(len(replicas)):
+                trace_dir = f'{WORKING_DIR}/.gui/taskset_{k}/traces'
+                if os.path.isdir(trace_dir):
+                    timeline.plot_traces(trace_dir, os.path.join(output_dir, 'timelines', f'taskset_{k}'))
+
+        if PROFILER.enabled:
+            PROFILER.save(f'{output_dir}/profile.json')
+            PROFILER.print_summary()
+            print(f"Saved the stage profile (Chrome trace events) to {output_dir}/profile.json")
 
     def setConfig(self):
 
@@ -127,6 +296,13 @@ class CLI(object):
             'timeUnit': self.args.deadline[1]
         }
 
+        # Traced programs are different programs; only then is the key part of the config
+        if self.args.tracing:
+            self.taskConfig['tracing'] = True
+        # Only runs stopped at a number of misses need the progress lines (no --max_misses to generate)
+        if getattr(self.args, 'max_misses', None) != None:
+            self.taskConfig['miss_progress'] = True
+
         if self.taskConfig['type'] == 'basic':
             self.taskConfig['periodicity'] = self.args.periodicity
             self.taskConfig['period'] = {
@@ -139,14 +315,19 @@ class CLI(object):
         
         elif self.taskConfig['type'] == 'dag':
             self.taskConfig['seed'] = self.args.seed if self.args.seed else int(round(datetime.now().timestamp()))
-            self.taskConfig['max_depth'] = self.args.max_depth
-            self.taskConfig['num_outputs'] = self.args.num_outputs
+            self.taskConfig['max_depth'] = self.args.num_level
+            self.taskConfig['num_outputs'] = self.args.max_num_components
             self.taskConfig['execution_time'] = {
-               'value': int(self.args.execution_time[0]),
-               'timeUnit': self.args.execution_time[1]
+               'value': int(self.args.components_time[0]),
+               'timeUnit': self.args.components_time[1]
             }
 
     def saveResult(self, result, output_dir):
+        from runners.ResourceUsage import RESOURCE_METRICS, RESOURCE_COLUMNS
+        from results.ResultTable import run_table, RUN_TABLE
+
+        # Columnar copy for queries across runs (see results/ResultTable.py)
+        run_table(self.taskConfig, result, self.args.num_iteration).save(f'{output_dir}/{RUN_TABLE}')
         
         if self.taskConfig['type'] == 'basic':
             header = ['type', 'number of iterations', 'minimum workers', 'maximum workers', 'deadline', 'schedulers', 'number of tasks', 'total time', 'utilization', 'periodicity']
@@ -168,6 +349,9 @@ class CLI(object):
                         f'{self.taskConfig["execution_time"]["value"]} {self.taskConfig["execution_time"]["timeUnit"]}'
                       ]
 
+        header += ['number of task sets', 'task set seeds']
+        configs += [len(result['seeds']), ' '.join(str(seed) for seed in result['seeds'])]
+
         output_file = f'{output_dir}/{self.taskConfig["type"]}-{", ".join(self.taskConfig["schedulers"])}.csv'
         
         with open(output_file, 'w', encoding='UTF8', newline='') as f:
@@ -176,12 +360,21 @@ class CLI(object):
             writer.writerow(header)
             writer.writerow(configs)
 
-            outputs_header = ['scheduler', 'worker', 'physical execution time', 'deadline miss']
+            outputs_header = ['scheduler', 'worker', 'physical execution time', 'deadline miss',
+                              'execution time stdev', 'execution time p95', 'execution time p99', 'maximum deadline miss',
+                              'execution time stdev between task sets', 'execution time stdev within task sets', 'censored runs', 'noisy runs'] + RESOURCE_COLUMNS
             outputs = []
 
             for scheduler in self.taskConfig['schedulers']:
                 for i, worker in enumerate(result['workers']):
-                    output = [scheduler, worker, result['exe_times'][scheduler][i], result['deadline_misses'][scheduler][i]]
+                    exe_time_stats = result['exe_time_stats'][scheduler][i]
+                    output = [scheduler, worker, result['exe_times'][scheduler][i], result['deadline_misses'][scheduler][i],
+                              exe_time_stats.stdev(), exe_time_stats.quantile(0.95), exe_time_stats.quantile(0.99),
+                              result['deadline_miss_stats'][scheduler][i].stats.max,
+                              result['exe_time_replicas'][scheduler][i].between_variance() ** 0.5,
+                              result['exe_time_replicas'][scheduler][i].within_variance() ** 0.5,
+                              result['censored_runs'][scheduler][i], result['noisy_runs'][scheduler][i]]
+                    output += [result['resources'][metric][scheduler][i].mean() if metric in result['resources'] else '' for metric in RESOURCE_METRICS]
                     outputs.append(output.copy())
                     output.clear()
             
@@ -0,0 +1,67 @@
+# Scheduler performance regression check. (Command line interface version.)
+# Compares a baseline and a candidate result set, e.g. the result stores or cli.py output
+# directories of the same configurations before and after a Lingua Franca runtime upgrade,
+# and reports the points where the candidate is significantly slower or misses more
+# deadlines (see results/Comparison.py). Exits with status 1 if there are any, so it can
+# gate an upgrade.
+
+import os
+import sys
+import argparse
+from datetime import datetime
+
+from results.Comparison import RegressionComparison, load_result_set
+from plots.ComparisonPlot import ComparisonPlot
+
+class CompareCLI(object):
+    def __init__(self):
+        parser = argparse.ArgumentParser(description="Scheduler performance regression check between two result sets.")
+        parser.add_argument("baseline", type=str,
+                            help="Set the baseline: a result store (.db), a cli.py output directory or its events.ndjson")
+        parser.add_argument("candidate", type=str,
+                            help="Set the candidate, of the same kind as the baseline")
+        parser.add_argument("--alpha", type=float, default=0.05,
+                            help="Set the false discovery rate of the per-point tests")
+        parser.add_argument("--min_effect", type=float, default=0.33,
+                            help="Set the minimum |Cliff's delta| of a regression")
+        parser.add_argument("--min_slowdown", type=float, default=0.05,
+                            help="Set the minimum slowdown of the median execution time (0.05: 5%%)")
+        parser.add_argument("--min_samples", type=int, default=4,
+                            help="Set the minimum number of runs per point and side to test it")
+        parser.add_argument("--top", type=int, default=20,
+                            help="Set the number of regressions listed in the report")
+
+        self.args = parser.parse_args()
+
+    def Run(self):
+        baseline = load_result_set(self.args.baseline)
+        candidate = load_result_set(self.args.candidate)
+
+        comparison = RegressionComparison()
+        comparison.setConfig({
+            'alpha': self.args.alpha,
+            'min_effect': self.args.min_effect,
+            'min_slowdown': self.args.min_slowdown,
+            'min_samples': self.args.min_samples,
+        })
+        rows = comparison.compare(baseline, candidate)
+        if len(rows) == 0:
+            raise RuntimeError("The baseline and the candidate have no points in common")
+
+        output_dir = f'{os.getcwd()}/output/compare_{int(round(datetime.now().timestamp()))}'
+        os.makedirs(output_dir, exist_ok=True)
+        report = comparison.report(rows, baseline, candidate, self.args.top)
+        with open(f'{output_dir}/report.txt', 'w') as f:
+            f.write(report + '\n')
+        comparison.save_csv(rows, f'{output_dir}/comparison.csv')
+        ComparisonPlot().plot(rows, output_dir)
+
+        print(report)
+        print(f"Saved the report, comparison.csv and plots to {output_dir}")
+        if len(RegressionComparison.ranked(rows)) > 0:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    cli = CompareCLI()
+    cli.Run()
@@ -0,0 +1,165 @@
+# Distributed sweeps. (Command line interface version.)
+# `python3 distributed.py coordinator --spec sweeps.yaml` hands the jobs of a sweep spec
+# (see sweeps/SweepSpec.py) to worker agents started on other machines with
+# `python3 distributed.py agent --host <coordinator> --port <port>`, from the same src
+# directory (templates) and with LF_PATH set. --local_agents N starts N agents on this
+# machine, e.g. to try the protocol on localhost.
+
+import os
+import sys
+import argparse
+import subprocess
+from datetime import datetime
+
+class DistributedCLI(object):
+    def __init__(self):
+        parser = argparse.ArgumentParser(description="Distributed sweeps over worker agents.")
+        roles = parser.add_subparsers(dest='role', required=True)
+
+        coordinator = roles.add_parser('coordinator', help="Hand the jobs of a sweep spec to agents")
+        coordinator.add_argument("--spec", type=str, required=True,
+                                 help="Set the sweep spec file (.json, .yaml, .toml)")
+        coordinator.add_argument("--host", type=str, default='0.0.0.0',
+                                 help="Set the address to listen on")
+        coordinator.add_argument("--port", type=int, default=7000,
+                                 help="Set the port to listen on (0: any free port)")
+        coordinator.add_argument("--heartbeat_timeout", type=float, default=10.0,
+                                 help="Set the seconds without a heartbeat before an agent's jobs are retried elsewhere")
+        coordinator.add_argument("--max_retries", type=int, default=2,
+                                 help="Set the number of retries of a failed job")
+        coordinator.add_argument("--local_agents", type=int, default=0,
+                                 help="Start this many agents on this machine")
+        coordinator.add_argument("--agent_cores", type=int,
+                                 help="Set the cores advertised by each local agent (default: all cores)")
+        coordinator.add_argument("--store", type=str, default='output/results.db',
+                                 help="Set the SQLite result store; jobs already measured are skipped on restart")
+
+        agent = roles.add_parser('agent', help="Run jobs of a coordinator")
+        agent.add_argument("--host", type=str, default='127.0.0.1',
+                           help="Set the address of the coordinator")
+        agent.add_argument("--port", type=int, default=7000,
+                           help="Set the port of the coordinator")
+        agent.add_argument("--name", type=str,
+                           help="Set the agent name (default: <hostname>-<pid>)")
+        agent.add_argument("--cores", type=int,
+                           help="Set the cores advertised to the coordinator (default: all cores)")
+        agent.add_argument("--compiler", type=str, default='gradlew',
+                           help="Choose the LF compiler: 'gradlew', 'lfc'")
+
+        self.args = parser.parse_args()
+
+    def Run(self):
+        if self.args.role == 'agent':
+            return self.Agent()
+        return self.Coordinator()
+
+    def Agent(self):
+        from runners.Agent import Agent
+
+        agent = Agent()
+        agent.setConfig({'host': self.args.host, 'port': self.args.port, 'templateDir': f'{os.getcwd()}/templates',
+                         'workDir': f'{os.getcwd()}/.agent'})
+        if self.args.name != None:
+            agent.setConfig({'name': self.args.name})
+        if self.args.cores != None:
+            agent.setConfig({'cores': self.args.cores})
+        agent.runner.setConfig({'compiler': self.args.compiler})
+        agent.run()
+
+    def Coordinator(self):
+        from TasksetGenerator import TasksetGenerator
+        from results.ResultStore import ResultStore
+        from runners.Coordinator import Coordinator
+        from sweeps.SweepSpec import SpecSweep, load_spec, expand
+
+        WORKING_DIR = os.getcwd()
+        points = expand(load_spec(self.args.spec))
+
+        output_dir = f'{WORKING_DIR}/output/distributed_{int(round(datetime.now().timestamp()))}'
+        os.makedirs(output_dir, exist_ok=True)
+        store = ResultStore(os.path.join(WORKING_DIR, self.args.store))
+
+        coordinator = Coordinator()
+        coordinator.setConfig({
+            'host': self.args.host,
+            'port': self.args.port,
+            'heartbeat_timeout': self.args.heartbeat_timeout,
+            'max_retries': self.args.max_retries,
+        })
+
+        # (point, replica, scheduler, workers, config hash, job id or stored samples)
+        tasks = []
+        default_seed = int(round(datetime.now().timestamp()))
+        for point in points:
+            point['config'].setdefault('seed', default_seed)
+            generator = TasksetGenerator()
+            generator.setConfig(point['config'])
+            for k, seed in enumerate(generator.replicaSeeds(point['num_tasksets'])):
+                config = dict(point['config'], seed=seed)
+                config_hash = store.add_config(dict(config, template=point['template']))
+                for scheduler in generator.config['schedulers']:
+                    for worker in range(generator.config['min_workers'], generator.config['max_workers'] + 1):
+                        stored = [store.get(config_hash, scheduler, worker, i) for i in range(point['num_iteration'])]
+                        if all(sample != None for sample in stored):
+                            tasks.append((point, k, scheduler, worker, config_hash, stored))
+                            continue
+                        id = coordinator.add_job({'config': config, 'template': point['template'], 'scheduler': scheduler,
+                                                  'workers': worker, 'num_iteration': point['num_iteration'], 'config_hash': config_hash}, cores=worker)
+                        tasks.append((point, k, scheduler, worker, config_hash, id))
+        print(f"{len(coordinator.jobs)} jobs, {len(tasks) - len(coordinator.jobs)} already in the result store")
+
+        # Results are stored as they arrive, so a restarted coordinator skips them
+        def record(job):
+            config_hash, scheduler, worker = job['payload']['config_hash'], job['payload']['scheduler'], job['payload']['workers']
+            for i, (exe_time, deadline_miss, censored) in enumerate(job['result']['samples']):
+                store.record(config_hash, scheduler, worker, i, exe_time, deadline_miss, censored)
+            if len(job['result']['build_usage']) > 0:
+                store.record_resources(config_hash, scheduler, worker, 0, 'build', job['result']['build_usage'])
+        coordinator.on_result = record
+
+        agents = []
+        try:
+            port = coordinator.start()
+            for i in range(self.args.local_agents):
+                command = [sys.executable, os.path.abspath(__file__), 'agent', '--port', str(port), '--name', f'local{i}']
+                if self.args.agent_cores != None:
+                    command += ['--cores', str(self.args.agent_cores)]
+                agents.append(subprocess.Popen(command, cwd=WORKING_DIR))
+            jobs = coordinator.wait()
+        finally:
+            coordinator.stop()
+            for process in agents:
+                process.wait()
+
+        # Aggregate the samples per point, scheduler and workers
+        samples = {}
+        failed = 0
+        for point, k, scheduler, worker, config_hash, job in tasks:
+            if isinstance(job, list):
+                runs = job
+            elif jobs[job]['state'] == 'done':
+                runs = [tuple(sample) for sample in jobs[job]['result']['samples']]
+            else:
+                failed += 1
+                continue
+            replicas, runs_of_point = samples.setdefault((point['id'], scheduler, worker), ([], []))
+            replicas += [k] * len(runs)
+            runs_of_point += runs
+        store.close()
+
+        sweep = SpecSweep()
+        for point in points:
+            for (id, scheduler, worker), (replicas, runs) in sorted(samples.items()):
+                if id == point['id']:
+                    sweep.aggregate(point, scheduler, worker, replicas, runs)
+
+        name = os.path.splitext(os.path.basename(self.args.spec))[0]
+        sweep.saveResult(points, f'{output_dir}/{name}.csv')
+        print(f"Saved {len(points)} sweep points to {output_dir}" + (f" ({failed} jobs failed)" if failed > 0 else ""))
+        if failed > 0:
+            sys.exit(f"{failed} of {len(coordinator.jobs)} jobs failed")
+
+
+if __name__ == "__main__":
+    cli = DistributedCLI()
+    cli.Run()
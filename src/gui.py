@@ -14,9 +14,41 @@ from PyQt5.QtWidgets import QMessageBox, QFileDialog
 import sys
 import os
 import csv
+import traceback
 from datetime import datetime
 from functools import partial
 from TasksetGenerator import TasksetGenerator
+from results.ResultStore import ResultStore
+from results.ResultTable import run_table
+from runners.ResourceUsage import RESOURCE_METRICS, RESOURCE_COLUMNS
+from runners.LFRunner import Cancelled
+from plots.LivePlot import LivePlot
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+
+# Runs generation, builds and runs off the Qt main thread so that the window stays responsive.
+# The runner publishes its events from the job threads; the signal carries them to the GUI thread.
+class RunWorker(QtCore.QThread):
+    event = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(str)
+    cancelled = QtCore.pyqtSignal()
+
+    def __init__(self, task):
+        super().__init__()
+        self.task = task
+        self.succeeded = False
+
+    def run(self):
+        try:
+            self.task()
+            self.succeeded = True
+        except Cancelled:
+            self.cancelled.emit()
+        except RuntimeError as err:
+            self.failed.emit(str(err))
+        except Exception as err:
+            # Anything else would end the thread silently and leave the window waiting
+            traceback.print_exc()
+            self.failed.emit(f"{type(err).__name__}: {err}")
 
 class Ui_MainWindow(object):
 
@@ -25,6 +57,10 @@ class Ui_MainWindow(object):
             'schedulers':[]
         }
         self.template_path=''
+        self.worker = None
+        self.plot_generator = None
+        self.live_plot = None
+        self.liveWindow = None
     
     def setupUi(self, MainWindow):
 
@@ -118,6 +154,30 @@ class Ui_MainWindow(object):
         self.lineEdit_probability_deadline.setText('0.6')
         self.lineEdit_probability_deadline.textChanged.connect(lambda: self.updateDeadline())
 
+        self.label_numOfTasksets = QtWidgets.QLabel(self.groupBox_generalConfiguration)
+        self.label_numOfTasksets.setGeometry(QtCore.QRect(380, 60, 130, 25))
+        self.label_numOfTasksets.setObjectName("label_numOfTasksets")
+        self.label_numOfTasksets.setText("Number of Task Sets:")
+        self.label_numOfTasksets.setToolTip("Independently seeded task sets generated per configuration")
+        self.spinBox_numOfTasksets = QtWidgets.QSpinBox(self.groupBox_generalConfiguration)
+        self.spinBox_numOfTasksets.setGeometry(QtCore.QRect(510, 60, 55, 25))
+        self.spinBox_numOfTasksets.setMaximum(100)
+        self.spinBox_numOfTasksets.setMinimum(1)
+        self.spinBox_numOfTasksets.setProperty('value', 5)
+        self.spinBox_numOfTasksets.setObjectName('spinBox_numOfTasksets')
+
+        self.label_jobs = QtWidgets.QLabel(self.groupBox_generalConfiguration)
+        self.label_jobs.setGeometry(QtCore.QRect(600, 60, 120, 25))
+        self.label_jobs.setObjectName("label_jobs")
+        self.label_jobs.setText("Parallel Jobs:")
+        self.label_jobs.setToolTip("Number of build/run jobs executed in parallel")
+        self.spinBox_jobs = QtWidgets.QSpinBox(self.groupBox_generalConfiguration)
+        self.spinBox_jobs.setGeometry(QtCore.QRect(760, 60, 55, 25))
+        self.spinBox_jobs.setMaximum(64)
+        self.spinBox_jobs.setMinimum(1)
+        self.spinBox_jobs.setProperty('value', 1)
+        self.spinBox_jobs.setObjectName('spinBox_jobs')
+
         self.groupBox_taskConfiguration = QtWidgets.QGroupBox(self.centralwidget)               # Task Config
         self.groupBox_taskConfiguration.setGeometry(QtCore.QRect(12, 232, 1000, 228))
         self.groupBox_taskConfiguration.setObjectName("groupBox_taskConfiguration")
@@ -364,6 +424,25 @@ class Ui_MainWindow(object):
         self.label_executionT_result.setObjectName("label_executionT_result")
         self.label_executionT_result.setGeometry(QtCore.QRect(210, 470, 400, 25))
         self.label_executionT_result.hide()
+
+        self.progressBar = QtWidgets.QProgressBar(self.centralwidget)
+        self.progressBar.setGeometry(QtCore.QRect(12, 500, 1000, 20))
+        self.progressBar.setObjectName("progressBar")
+        self.progressBar.setValue(0)
+
+        self.label_progress = QtWidgets.QLabel(self.centralwidget)
+        self.label_progress.setGeometry(QtCore.QRect(12, 520, 1000, 20))
+        self.label_progress.setObjectName("label_progress")
+
+        # Filled in as every (task set, scheduler, worker) job finishes
+        self.tableWidget_results = QtWidgets.QTableWidget(self.centralwidget)
+        self.tableWidget_results.setGeometry(QtCore.QRect(12, 542, 1000, 62))
+        self.tableWidget_results.setObjectName("tableWidget_results")
+        self.tableWidget_results.setColumnCount(7)
+        self.tableWidget_results.setHorizontalHeaderLabels(['task set', 'scheduler', 'worker', 'physical execution time', 'execution time p95', 'deadline miss', 'censored runs'])
+        self.tableWidget_results.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
+        self.tableWidget_results.verticalHeader().hide()
+        self.tableWidget_results.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
         
         self.run = QtWidgets.QPushButton(self.centralwidget)
         self.run.setToolTip('Button to run the settings')
@@ -371,6 +450,13 @@ class Ui_MainWindow(object):
         self.run.setObjectName("run")
         self.run.setText("Run")
 
+        self.cancel = QtWidgets.QPushButton(self.centralwidget)
+        self.cancel.setToolTip('Stop the builds and runs in progress')
+        self.cancel.setGeometry(QtCore.QRect(412, 610, 200, 25))
+        self.cancel.setObjectName('cancel')
+        self.cancel.setText('Cancel')
+        self.cancel.setEnabled(False)
+
         self.exit = QtWidgets.QPushButton(self.centralwidget)
         self.exit.setToolTip('Exit the framework')
         self.exit.setGeometry(QtCore.QRect(812, 610, 200, 25))
@@ -379,6 +465,7 @@ class Ui_MainWindow(object):
 
         MainWindow.setCentralWidget(self.centralwidget)
         self.run.clicked.connect(self.clickRun)
+        self.cancel.clicked.connect(self.clickCancel)
         self.exit.clicked.connect(self.clickExit)
         #self.updateExeTime()
         
@@ -477,14 +564,23 @@ class Ui_MainWindow(object):
         try:
             self.Run()
         except RuntimeError as err:
-            print("Python Error: {0}".format(err), file=sys.stderr)
-            msg = QMessageBox()
-            msg.setIcon(QMessageBox.Critical)
-            msg.setWindowTitle("Python Error")
-            msg.setText("{0}".format(err))
-            msg.setStandardButtons(QMessageBox.Ok)
-            msg.exec_()
-
+            self.showError(err)
+
+    def showError(self, err):
+        print("Python Error: {0}".format(err), file=sys.stderr)
+        msg = QMessageBox()
+        msg.setIcon(QMessageBox.Critical)
+        msg.setWindowTitle("Python Error")
+        msg.setText("{0}".format(err))
+        msg.setStandardButtons(QMessageBox.Ok)
+        msg.exec_()
+
+    def clickCancel(self):
+        if self.plot_generator != None:
+            self.label_progress.setText("Cancelling...")
+            self.plot_generator.runner.cancel()
+
+    # Check the configuration and start the worker; finishRun() takes over when it is done.
     def Run(self):
         # Set data
         self.__updateConfig()
@@ -494,42 +590,135 @@ class Ui_MainWindow(object):
         elif self.taskConfig['min_workers'] > self.taskConfig['max_workers']:
             raise RuntimeError("Minimum numbers of workers have to be smaller or equal to Maximum numbers of workers")
         else:
-
-            WORKING_DIR = os.getcwd()
-
-            generator = TasksetGenerator()
-            generator.setConfig(self.taskConfig)
-            generated_files = generator.makeLF(templateDir=f'{WORKING_DIR}/templates', outputDir=f'{WORKING_DIR}/.gui/src/', template_path=self.template_path)
-            print("Finished generating LF files!")
-            
-            plot_title = ''
-            if self.taskConfig['type'] == 'basic':
-                plot_title = f'{self.taskConfig["periodicity"].capitalize()} / Number of task: {self.taskConfig["num_tasks"]} / Utilization: {self.taskConfig["utilization"]}'
-                plot_title += f" / P(deadline) : {self.taskConfig['p_deadline']}"
-            elif self.taskConfig['type'] == 'dag':
-                plot_title = f'DAG / Seed: {self.taskConfig["seed"]}'
-                plot_title += f" / P(deadline) : {self.taskConfig['p_deadline']}"
-            elif self.taskConfig['type'] == 'custom':
-                plot_title = 'Custom'
-            
-            plot_generator = BasicPlot.PlotGenerator()
-            plot_generator.setConfig({
-                'title': plot_title,
-                'dataset': generated_files,
+            # Widgets are read here, on the GUI thread
+            self.runSettings = {
+                # Custom templates have no seed, so they are generated once
+                'num_tasksets': 1 if self.taskConfig['type'] == 'custom' else self.spinBox_numOfTasksets.value(),
                 'num_iteration': self.spinBox_numOfIterations.value(),
-            })
-
-            exe_times, deadline_misses = plot_generator.plot_graph()
-            result = {
-                'workers': [w for w in range(self.taskConfig['min_workers'], self.taskConfig['max_workers']+1)],
-                'exe_times': exe_times,
-                'deadline_misses': deadline_misses
+                'jobs': self.spinBox_jobs.value(),
             }
+            self.measured = None
+            self.plot_generator = BasicPlot.PlotGenerator()
+            self.worker = RunWorker(self.measure)
+            self.plot_generator.runner.events.subscribe(self.worker.event.emit)
+            self.worker.event.connect(self.handleEvent)
+            self.showLivePlot()
+            self.worker.failed.connect(self.showError)
+            self.worker.cancelled.connect(lambda: self.label_progress.setText("Cancelled"))
+            self.worker.finished.connect(self.finishRun)
+
+            self.progressBar.setValue(0)
+            self.label_progress.setText("Generating LF files...")
+            self.tableWidget_results.setRowCount(0)
+            self.run.setEnabled(False)
+            self.cancel.setEnabled(True)
+            self.worker.start()
+
+    # Runs on the worker thread: generate, build and run. Nothing here may touch widgets.
+    def measure(self):
+        WORKING_DIR = os.getcwd()
+
+        generator = TasksetGenerator()
+        generator.setConfig(self.taskConfig)
+        self.replicas = generator.makeReplicas(self.runSettings['num_tasksets'], templateDir=f'{WORKING_DIR}/templates', outputDir=f'{WORKING_DIR}/.gui', template_path=self.template_path)
+        print("Finished generating LF files!")
+
+        plot_title = ''
+        if self.taskConfig['type'] == 'basic':
+            plot_title = f'{self.taskConfig["periodicity"].capitalize()} / Number of task: {self.taskConfig["num_tasks"]} / Utilization: {self.taskConfig["utilization"]}'
+            plot_title += f" / P(deadline) : {self.taskConfig['p_deadline']}"
+        elif self.taskConfig['type'] == 'dag':
+            plot_title = f'DAG / Seed: {self.taskConfig["seed"]}'
+            plot_title += f" / P(deadline) : {self.taskConfig['p_deadline']}"
+        elif self.taskConfig['type'] == 'custom':
+            plot_title = 'Custom'
+
+        if not os.path.exists(f'{WORKING_DIR}/output'):
+            os.mkdir(f'{WORKING_DIR}/output')
+        self.store = ResultStore(f'{WORKING_DIR}/output/results.db')
+
+        self.plot_generator.setConfig({
+            'title': plot_title,
+            'dataset': [r['files'] for r in self.replicas],
+            'num_iteration': self.runSettings['num_iteration'],
+            'jobs': self.runSettings['jobs'],
+            'store': self.store,
+            'config_hash': [self.store.add_config(dict(self.taskConfig, seed=r['seed'], template_path=self.template_path)) for r in self.replicas],
+        })
+        try:
+            self.measured = self.plot_generator.measure()
+        finally:
+            self.store.close()
+
+    # Separate window with the running mean execution time of every scheduler
+    def showLivePlot(self):
+        if self.liveWindow != None:
+            self.liveWindow.close()
+        self.live_plot = LivePlot(canvas_class=FigureCanvasQTAgg)
+        self.liveWindow = QtWidgets.QWidget()
+        self.liveWindow.setWindowTitle('Live results')
+        layout = QtWidgets.QVBoxLayout(self.liveWindow)
+        layout.addWidget(self.live_plot.canvas)
+        self.liveWindow.resize(640, 480)
+        self.liveWindow.show()
+
+    def handleEvent(self, event):
+        if event.get('done') != None:
+            message = f"{event.type.replace('_', ' ')}: {os.path.basename(event['file'])}"
+            if event.type == 'run_finished':
+                message += f" #{event['iteration']}"
+            self.updateProgress(event['done'], event['total'], message)
+        if event.type == 'run_finished':
+            self.live_plot.update(event)
+            self.live_plot.blit()
+        elif event.type == 'point_aggregated':
+            self.addJobResult(event['result'])
+
+    def updateProgress(self, done, total, message):
+        self.progressBar.setMaximum(total)
+        self.progressBar.setValue(done)
+        self.label_progress.setText(f"{done}/{total}: {message}")
+
+    def addJobResult(self, job):
+        row = self.tableWidget_results.rowCount()
+        self.tableWidget_results.insertRow(row)
+        values = [job['k'], job['scheduler'], job['workers'], f"{job['exe_time'].mean():.3f}",
+                  f"{job['exe_time'].quantile(0.95):.3f}", f"{job['deadline_miss'].mean():.1f}", job['censored']]
+        for column, value in enumerate(values):
+            self.tableWidget_results.setItem(row, column, QtWidgets.QTableWidgetItem(str(value)))
+        self.tableWidget_results.scrollToBottom()
+
+    # Back on the GUI thread: show the graphs and save the results of a completed run.
+    def finishRun(self):
+        self.run.setEnabled(True)
+        self.cancel.setEnabled(False)
+        if not self.worker.succeeded or self.measured == None:
+            return
+        self.label_progress.setText("Finished")
+
+        exe_times, deadline_misses = self.measured
+        plot_generator = self.plot_generator
+        result = {
+            'workers': [w for w in range(self.taskConfig['min_workers'], self.taskConfig['max_workers']+1)],
+            'exe_times': exe_times,
+            'deadline_misses': deadline_misses,
+            'exe_time_stats': plot_generator.exe_time_stats,
+            'deadline_miss_stats': plot_generator.deadline_miss_stats,
+            'exe_time_replicas': plot_generator.exe_time_replicas,
+            'censored_runs': plot_generator.censored_runs,
+            'noisy_runs': plot_generator.noisy_runs,
+            'resources': plot_generator.resources,
+            'seeds': [r['seed'] for r in self.replicas]
+        }
 
-            self.saveResult(result)
+        self.saveResult(result)
+        plot_generator.show_graphs()
 
 
     def clickExit(self):
+        if self.worker != None and self.worker.isRunning():
+            self.plot_generator.runner.cancel()
+            self.worker.wait()
         app.quit()
 
     def __updateConfig(self):
@@ -603,21 +792,32 @@ class Ui_MainWindow(object):
 
 
         output_file = f'{output_dir}/{self.taskConfig["type"]}_{", ".join(self.taskConfig["schedulers"])}_{datetime.now().strftime("%Y%m%d%H%M%S%f")}.csv'
+        # Columnar copy for queries across runs (see results/ResultTable.py)
+        run_table(self.taskConfig, result, self.spinBox_numOfIterations.value()).save(output_file[:-len('.csv')] + '.npz')
         
         with open(output_file, 'w', encoding='UTF8', newline='') as f:
             writer = csv.writer(f)
 
             if self.taskConfig['type'] == 'basic' or self.taskConfig['type'] == 'dag':
-                writer.writerow(header)
-                writer.writerow(configs)
+                writer.writerow(header + ['number of task sets', 'task set seeds'])
+                writer.writerow(configs + [len(result['seeds']), ' '.join(str(seed) for seed in result['seeds'])])
 
 
-            outputs_header = ['scheduler', 'worker', 'physical execution time', 'deadline miss']
+            outputs_header = ['scheduler', 'worker', 'physical execution time', 'deadline miss',
+                              'execution time stdev', 'execution time p95', 'execution time p99', 'maximum deadline miss',
+                              'execution time stdev between task sets', 'execution time stdev within task sets', 'censored runs', 'noisy runs'] + RESOURCE_COLUMNS
             outputs = []
 
             for scheduler in self.taskConfig['schedulers']:
                 for i, worker in enumerate(result['workers']):
-                    output = [scheduler, worker, result['exe_times'][scheduler][i], result['deadline_misses'][scheduler][i]]
+                    exe_time_stats = result['exe_time_stats'][scheduler][i]
+                    output = [scheduler, worker, result['exe_times'][scheduler][i], result['deadline_misses'][scheduler][i],
+                              exe_time_stats.stdev(), exe_time_stats.quantile(0.95), exe_time_stats.quantile(0.99),
+                              result['deadline_miss_stats'][scheduler][i].stats.max,
+                              result['exe_time_replicas'][scheduler][i].between_variance() ** 0.5,
+                              result['exe_time_replicas'][scheduler][i].within_variance() ** 0.5,
+                              result['censored_runs'][scheduler][i], result['noisy_runs'][scheduler][i]]
+                    output += [result['resources'][metric][scheduler][i].mean() if metric in result['resources'] else '' for metric in RESOURCE_METRICS]
                     outputs.append(output.copy())
                     output.clear()
             
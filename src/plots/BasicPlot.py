@@ -7,8 +7,8 @@ import matplotlib.patches as mpatches
 import numpy as np
 
 import os
-import subprocess
-import statistics
+
+from runners.LFRunner import LFRunner
 
 class PlotGenerator(object):
     
@@ -18,9 +18,17 @@ class PlotGenerator(object):
             'x-axis': 'num_worker',
             'y-axis': 'physical_excution_time',
             'dataset': {},
-            'num_iteration': 1
+            'num_iteration': 1,
+            # Number of build/run jobs executed in parallel
+            'jobs': 1,
+            # Optional ResultStore; stored iterations of 'config_hash' are not run again
+            'store': None,
+            'config_hash': ''
         }
 
+        self.runner = LFRunner()
+        self.runner.setConfig({'compiler': 'lfc', 'verbose': True})
+
     def setConfig(self, config):
 
         for key, value in config.items():
@@ -28,45 +36,59 @@ class PlotGenerator(object):
                 self.config[key] = value
 
     def plot_graph(self):
-        
-        WORKING_DIR = os.getcwd()
+        if self.measure() == None:
+            return
+        self.show_graphs()
+        return self.exe_times, self.deadline_misses
+
+    # Build and run every task set. Safe to call off the GUI thread: nothing is drawn here,
+    # and the working directory is left alone (the runner passes LF_PATH to its subprocesses).
+    # Returns (exe_times, deadline_misses), or None if there is nothing to run.
+    def measure(self):
         LF_PATH = os.getenv("LF_PATH")
         if LF_PATH == None:
             raise RuntimeError("Set the environment variable LF_PATH to the path where Lingua Franca is installed")
-    
-        os.chdir(LF_PATH)
-        workers = self.config['dataset']['workers']
+
+        # One configuration may come as several independently seeded task sets
+        datasets = self.config['dataset'] if isinstance(self.config['dataset'], list) else [self.config['dataset']]
+        config_hashes = self.config['config_hash'] if isinstance(self.config['config_hash'], list) else [self.config['config_hash']] * len(datasets)
+        workers = datasets[0]['workers']
 
         target_schedulers = []
-        for scheduler in self.config['dataset']['schedulers'].keys():
-            if len(self.config['dataset']['schedulers'][scheduler]) > 0:
+        for scheduler in datasets[0]['schedulers'].keys():
+            if len(datasets[0]['schedulers'][scheduler]) > 0:
                 target_schedulers.append(scheduler)
 
         if len(target_schedulers) == 0:
             print("There is no LF file to plot")
-            return
+            return None
+        self.workers = workers
+        self.target_schedulers = target_schedulers
+
+        # Per scheduler and worker: aggregates of every task set (between/within-set variance)
+        self.runner.setConfig({'jobs': self.config['jobs']})
+        self.results = self.runner.run_datasets(datasets, self.config['num_iteration'], self.config['store'], config_hashes)
+        self.exe_time_replicas = self.results['exe_times']
+        self.deadline_miss_replicas = self.results['deadline_misses']
+        self.censored_runs = self.results['censored_runs']
+        self.noisy_runs = self.results['noisy_runs']
+        # Resource usage of the runs per metric: {metric: {scheduler: [ReplicatedStats per worker]}}
+        self.resources = self.results['resources']
+
+        self.exe_times = {s: [r.mean() for r in self.exe_time_replicas[s]] for s in target_schedulers}
+        self.deadline_misses = {s: [r.mean() for r in self.deadline_miss_replicas[s]] for s in target_schedulers}
+        # Streaming aggregates (mean/variance + quantile sketch) of all runs per scheduler and worker
+        self.exe_time_stats = {s: [r.pooled() for r in self.exe_time_replicas[s]] for s in target_schedulers}
+        self.deadline_miss_stats = {s: [r.pooled() for r in self.deadline_miss_replicas[s]] for s in target_schedulers}
+        return self.exe_times, self.deadline_misses
+
+    # Show the graphs of the last measure(); must run on the GUI thread.
+    def show_graphs(self):
+        workers = self.workers
+        target_schedulers = self.target_schedulers
+        exe_times = self.exe_times
+        deadline_misses = self.deadline_misses
 
-        exe_times = {}
-        deadline_misses = {}
-        for scheduler in target_schedulers:
-            exe_time = []
-            deadline_miss = []
-            for i, worker in enumerate(workers):
-                es = []
-                ds = []
-                for _ in range(int(self.config['num_iteration'])):
-                    e, d = self.__run_single_LF(self.config['dataset']['schedulers'][scheduler][i])
-                    es.append(e)
-                    ds.append(d)
-
-                exe_time.append(statistics.mean(es))
-                deadline_miss.append(statistics.mean(ds))
-                #exe_time.append(statistics.mean([self.__run_single_LF(self.config['dataset']['schedulers'][scheduler][i]) for _ in range(int(self.config['num_iteration']))]))
-            exe_times[scheduler] = exe_time.copy()
-            deadline_misses[scheduler] = deadline_miss.copy()
-            exe_time.clear()
-            deadline_miss.clear()
-        
         # Graph 1: Physical execution time
         fig, ax = plt.subplots()
         plt.axis([1, 25, 0.0, 5.0])        
@@ -76,12 +98,13 @@ class PlotGenerator(object):
         for i, scheduler in enumerate(target_schedulers):
            patches.append(mpatches.Patch(color=colors[i], label=scheduler))
            axes.append(ax.plot(workers, exe_times[scheduler], '--', color=colors[i]))
+           axes.append(ax.plot(workers, [a.quantile(0.95) for a in self.exe_time_stats[scheduler]], ':', color=colors[i]))
 
         ax.legend(handles=patches, loc='upper right')
-        plt.axis([min(workers)-1, max(workers)+1, min(min(exe_times[s]) for s in target_schedulers) * 0.8, max(max(exe_times[s]) for s in target_schedulers) * 1.2])
+        plt.axis([min(workers)-1, max(workers)+1, min(min(exe_times[s]) for s in target_schedulers) * 0.8, max(max(a.quantile(0.95) for a in self.exe_time_stats[s]) for s in target_schedulers) * 1.2])
         
         plt.xlabel('Number of Worker')
-        plt.ylabel('Physical Execution time')
+        plt.ylabel('Physical Execution time (dotted: p95)')
 
         plt.title(self.config['title'], fontsize= 10)
         plt.show()
@@ -107,51 +130,3 @@ class PlotGenerator(object):
 
         plt.title(self.config['title'], fontsize= 10)
         plt.show()
-
-        os.chdir(WORKING_DIR)
-
-        return exe_times, deadline_misses
-
-    def __run_single_LF(self, filepath):
-
-        LF_PATH = os.getenv("LF_PATH")
-        if LF_PATH == None:
-            raise RuntimeError("Set the environment variable LF_PATH to the path where Lingua Franca is installed")
-    
-        os.chdir(LF_PATH)
-
-        if not os.path.isfile(filepath):
-            raise RuntimeError("No LF file: " + filepath)
-        
-        filename = filename = filepath.split('/')[-1].split('.')[0]
-        binpath = f"{'/'.join(filepath.split('/')[:-3])}/bin/{filename}"
-
-        out = subprocess.run(['build/install/lf-cli/bin/lfc', filepath], capture_output=True)
-        built_success = False
-        
-        print(out.stdout.decode('utf-8'))
-        for line in reversed(out.stdout.decode("utf-8").split("\n")):
-            if line.startswith("Code generation finished"):
-                built_success = True
-                break
-        
-        if built_success:
-            print(f"Built Successfully: {filepath}")
-        else:
-            print("Failed to build")
-            print(out.stderr.decode("utf-8"))
-            exit(0)
-    
-        lf_out = subprocess.run([binpath], capture_output=True)
-
-        for line in reversed(lf_out.stdout.decode("utf-8").split("\n")):
-            if line.startswith("---- Elapsed physical"):
-                exe_time = line.split(' ')[-1]
-            if line.startswith("---- Deadline miss:"):
-                deadline_miss = int(line.split(' ')[-1])
-                break
-
-        exe_time = int(exe_time.replace(',','')) / 1000000000
-        print('Raw output: \n' + lf_out.stdout.decode("utf-8"))
-        print('Total physical execution time: ' + str(exe_time))
-        return exe_time, deadline_miss
@@ -0,0 +1,81 @@
+# Comparison Plot
+# Plots of a baseline/candidate comparison (see results/Comparison.py):
+#   ratio.png      median execution time ratio per number of workers, one color per scheduler,
+#                  regressed points filled
+#   volcano.png    log2 ratio against -log10 q, the most significant slowdowns labeled
+#   misses.png     mean deadline misses of the candidate against the baseline
+
+import math
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+class ComparisonPlot(object):
+
+    def __init__(self):
+        self.config = {
+            'title': '',
+            # Points labeled in the volcano plot
+            'labels': 5,
+        }
+        self.colors = ['#D81B60', '#1E88E5', '#FFC107', '#004D40', '#8794DD']
+
+    def setConfig(self, config):
+        for key, value in config.items():
+            if key in self.config.keys():
+                self.config[key] = value
+
+    def plot(self, rows, output_dir):
+        schedulers = sorted(set(row['scheduler'] for row in rows))
+        colors = {scheduler: self.colors[i % len(self.colors)] for i, scheduler in enumerate(schedulers)}
+        self.plot_ratio(rows, colors, f'{output_dir}/ratio.png')
+        self.plot_volcano(rows, colors, f'{output_dir}/volcano.png')
+        self.plot_misses(rows, colors, f'{output_dir}/misses.png')
+
+    def figure(self, title):
+        fig = Figure(figsize=(6.4, 4.8))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        ax.set_title(f'{self.config["title"]}\n{title}' if self.config['title'] else title, fontsize=10)
+        return fig, ax
+
+    def plot_ratio(self, rows, colors, output_file):
+        fig, ax = self.figure('Median execution time, candidate / baseline')
+        for scheduler, color in colors.items():
+            points = [row for row in rows if row['scheduler'] == scheduler]
+            ax.scatter([row['workers'] for row in points], [row['ratio'] for row in points], label=scheduler,
+                       edgecolors=color, facecolors=[color if row['slowdown'] or row['miss_regression'] else 'none' for row in points])
+        ax.axhline(1.0, color='gray', linewidth=0.8)
+        ax.set_xlabel('Number of Workers')
+        ax.set_ylabel('Ratio of medians (filled: regression)')
+        ax.legend(loc='upper right')
+        fig.savefig(output_file)
+
+    def plot_volcano(self, rows, colors, output_file):
+        fig, ax = self.figure('Execution time change and significance')
+        tested = [row for row in rows if row['tested'] and 0 < row['ratio'] < float('inf')]
+        for scheduler, color in colors.items():
+            points = [row for row in tested if row['scheduler'] == scheduler]
+            ax.scatter([math.log2(row['ratio']) for row in points], [-math.log10(max(row['q'], 1e-300)) for row in points],
+                       s=12, color=color, label=scheduler)
+        for row in sorted((row for row in tested if row['slowdown']), key=lambda row: row['q'])[:self.config['labels']]:
+            ax.annotate(f"{row['scheduler']} {row['workers']}w", (math.log2(row['ratio']), -math.log10(max(row['q'], 1e-300))), fontsize=7)
+        if len(tested) > 0:
+            ax.axhline(-math.log10(0.05), color='gray', linewidth=0.8, linestyle='--')
+        ax.axvline(0.0, color='gray', linewidth=0.8)
+        ax.set_xlabel('log2 ratio of medians')
+        ax.set_ylabel('-log10 q')
+        ax.legend(loc='upper left')
+        fig.savefig(output_file)
+
+    def plot_misses(self, rows, colors, output_file):
+        fig, ax = self.figure('Mean deadline misses')
+        for scheduler, color in colors.items():
+            points = [row for row in rows if row['scheduler'] == scheduler]
+            ax.scatter([row['miss_baseline'] for row in points], [row['miss_candidate'] for row in points], label=scheduler,
+                       edgecolors=color, facecolors=[color if row['miss_regression'] else 'none' for row in points])
+        limit = max([max(row['miss_baseline'], row['miss_candidate']) for row in rows] + [1])
+        ax.plot([0, limit], [0, limit], color='gray', linewidth=0.8)
+        ax.set_xlabel('Baseline')
+        ax.set_ylabel('Candidate (filled: regression)')
+        ax.legend(loc='upper left')
+        fig.savefig(output_file)
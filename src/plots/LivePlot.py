@@ -0,0 +1,119 @@
+# Live Plot
+# Mean physical execution time per scheduler and number of workers, updated from the
+# runner's 'run_finished' events while a sweep is going on (see runners/RunnerEvents.py).
+# The figure is drawn on any Agg canvas: a PNG refreshed every few seconds for cli.py,
+# or a Qt canvas in gui.py, where only the lines are redrawn (blitted) between layout changes.
+
+import time
+import threading
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from results.StreamingStats import RunningStats
+
+class LivePlot(object):
+
+    def __init__(self, canvas_class=FigureCanvasAgg):
+        self.config = {
+            'title': '',
+            # Minimum seconds between two PNG refreshes
+            'interval': 5.0,
+        }
+        self.colors = ['#D81B60', '#1E88E5', '#FFC107', '#004D40', '#8794DD']
+        self.lock = threading.Lock()
+        # Serializes drawing when events come from several job threads
+        self.draw_lock = threading.Lock()
+        # {scheduler: {workers: RunningStats of exe_time}}
+        self.points = {}
+        self.lines = {}
+        self.background = None
+        self.last_saved = 0.0
+
+        self.figure = Figure(figsize=(6.4, 4.8))
+        self.canvas = canvas_class(self.figure)
+        self.ax = self.figure.add_subplot()
+        self.ax.set_xlabel('Number of Workers')
+        self.ax.set_ylabel('Physical Execution time (running mean)')
+
+    def setConfig(self, config):
+        for key, value in config.items():
+            if key in self.config.keys():
+                self.config[key] = value
+        self.ax.set_title(self.config['title'], fontsize=10)
+
+    # Subscriber: record the runs; safe to call from the runner's job threads.
+    def update(self, event):
+        if event.type != 'run_finished':
+            return
+        with self.lock:
+            self.points.setdefault(event['scheduler'], {}).setdefault(event['workers'], RunningStats()).add(event['exe_time'])
+
+    # Move the lines to the current means. Returns True if the axes or legend changed,
+    # i.e. everything has to be drawn again instead of only the lines.
+    def refresh(self):
+        with self.lock:
+            data = {scheduler: sorted((w, stats.mean) for w, stats in points.items()) for scheduler, points in self.points.items()}
+
+        layout_changed = False
+        for scheduler, points in data.items():
+            if scheduler not in self.lines:
+                color = self.colors[len(self.lines) % len(self.colors)]
+                self.lines[scheduler], = self.ax.plot([], [], '--o', color=color, label=scheduler, animated=True)
+                layout_changed = True
+            self.lines[scheduler].set_data([w for w, _ in points], [m for _, m in points])
+        if layout_changed:
+            self.ax.legend(loc='upper right')
+
+        xs = [w for points in data.values() for w, _ in points]
+        ys = [m for points in data.values() for _, m in points]
+        if len(xs) > 0:
+            (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+            if layout_changed or min(xs) < x0 + 0.5 or max(xs) > x1 - 0.5 or min(ys) < y0 or max(ys) > y1:
+                # Leave headroom so that most new points fit without a full redraw
+                self.ax.set_xlim(min(xs) - 1, max(xs) + 1)
+                self.ax.set_ylim(min(ys) * 0.8, max(ys) * 1.2 + 1e-9)
+                layout_changed = True
+        return layout_changed
+
+    # Full redraw: the axes are drawn without the (animated) lines and kept as background.
+    def draw(self):
+        self.refresh()
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        for line in self.lines.values():
+            self.ax.draw_artist(line)
+
+    # Redraw only the lines over the saved background, unless the layout changed.
+    def blit(self):
+        if self.refresh() or self.background == None:
+            self.draw()
+        else:
+            self.canvas.restore_region(self.background)
+            for line in self.lines.values():
+                self.ax.draw_artist(line)
+        self.canvas.blit(self.figure.bbox)
+
+    def save(self, output_file):
+        with self.lock:
+            self.last_saved = time.monotonic()
+        with self.draw_lock:
+            self.refresh()
+            # Animated artists are left out of full draws, so the lines are plain ones while saving
+            for line in self.lines.values():
+                line.set_animated(False)
+            try:
+                self.figure.savefig(output_file)
+            finally:
+                for line in self.lines.values():
+                    line.set_animated(True)
+
+    # Subscriber for cli.py: rewrite output_file at most every config['interval'] seconds
+    # and once more when the measurement is over.
+    def png_subscriber(self, output_file):
+        def on_event(event):
+            self.update(event)
+            with self.lock:
+                due = time.monotonic() - self.last_saved >= self.config['interval']
+            if (event.type == 'run_finished' and due) or event.type == 'measure_finished':
+                self.save(output_file)
+        return on_event
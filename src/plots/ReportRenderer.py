@@ -0,0 +1,181 @@
+# Report Renderer
+# Renders the graphs of a study without pyplot, with matplotlib's object-oriented Agg API,
+# spread over a process pool, and writes them with an index.html into one report directory.
+# A graph is a plain dict, so that it can be sent to the worker processes:
+#   {'name': file name without .png (may contain directories), 'kind', 'title', 'xlabel', 'ylabel',
+#    'caption' (index.html, default: the title), ...}
+#   kind 'lines'    x, series {label: [y]}; optional upper {label: [y]} drawn dotted (e.g. p95)
+#                   and band {label: ([low], [high])} shaded (e.g. confidence interval of the mean)
+#   kind 'heatmap'  x, y (axis values), z (one row per y value), zlabel (colorbar)
+# Axis values that are not all numbers (e.g. '100 msec') are placed at equal distances, in
+# the given order; numeric heatmap axes are sorted (with the rows and columns of z).
+# Every worker process draws all of its graphs on one figure, cleared in between.
+
+import os
+import html
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from profiling.Profiler import PROFILER
+
+COLORS = ['#D81B60', '#1E88E5', '#FFC107', '#004D40', '#8794DD']
+
+# Figure reused by every graph rendered in this process
+_FIGURE = None
+
+def figure():
+    global _FIGURE
+    if _FIGURE == None:
+        _FIGURE = Figure(figsize=(6.4, 4.8))
+        FigureCanvasAgg(_FIGURE)
+    _FIGURE.clf()
+    return _FIGURE
+
+def numeric(values):
+    return all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values)
+
+# None (not measured) as NaN, which is left out of lines and heatmaps
+def missing(values):
+    return [math.nan if v == None else v for v in values]
+
+# Positions and tick labels of axis values
+def positions(values):
+    if numeric(values):
+        return list(values), None
+    return list(range(len(values))), [str(v) for v in values]
+
+# Order of axis values that puts numbers in ascending order (others keep theirs)
+def axis_order(values):
+    if numeric(values):
+        return sorted(range(len(values)), key=lambda i: values[i])
+    return list(range(len(values)))
+
+def render_graph(graph, output_file):
+    fig = figure()
+    ax = fig.add_subplot()
+    ax.set_title(graph.get('title', ''), fontsize=10)
+
+    if graph['kind'] == 'lines':
+        x, labels = positions(graph['x'])
+        for i, (label, y) in enumerate(graph['series'].items()):
+            color = COLORS[i % len(COLORS)]
+            ax.plot(x, missing(y), '--', color=color, label=label)
+            if label in graph.get('upper', {}):
+                ax.plot(x, missing(graph['upper'][label]), ':', color=color)
+            if label in graph.get('band', {}):
+                low, high = graph['band'][label]
+                ax.fill_between(x, missing(low), missing(high), color=color, alpha=0.2, linewidth=0)
+        if labels != None:
+            ax.set_xticks(x, labels)
+        ax.set_ylim(bottom=0)
+        ax.legend(loc='upper right')
+
+    elif graph['kind'] == 'heatmap':
+        # Cell edges lie between neighbouring positions, which must ascend
+        xorder, yorder = axis_order(graph['x']), axis_order(graph['y'])
+        x, xlabels = positions([graph['x'][i] for i in xorder])
+        y, ylabels = positions([graph['y'][j] for j in yorder])
+        z = [[missing(graph['z'][j])[i] for i in xorder] for j in yorder]
+        mesh = ax.pcolormesh(*edges(x, y), z, cmap='viridis', shading='flat')
+        fig.colorbar(mesh, ax=ax, label=graph.get('zlabel', ''))
+        for j, row in enumerate(z):
+            for i, v in enumerate(row):
+                if not math.isnan(v):
+                    ax.annotate(f'{v:.3g}', (x[i], y[j]), ha='center', va='center', fontsize=7, color='white')
+        ax.set_xticks(x, xlabels if xlabels != None else [str(v) for v in x])
+        ax.set_yticks(y, ylabels if ylabels != None else [str(v) for v in y])
+
+    else:
+        raise RuntimeError("Unknown graph kind: " + str(graph['kind']))
+
+    ax.set_xlabel(graph.get('xlabel', ''))
+    ax.set_ylabel(graph.get('ylabel', ''))
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    fig.savefig(output_file)
+    return output_file
+
+def caption(graph):
+    return graph.get('caption') or graph.get('title') or graph['name']
+
+# Cell edges of a heatmap: halfway between neighbouring positions
+def edges(x, y):
+    def cell_edges(values):
+        if len(values) == 1:
+            return [values[0] - 0.5, values[0] + 0.5]
+        middles = [(a + b) / 2 for a, b in zip(values, values[1:])]
+        return [2 * values[0] - middles[0]] + middles + [2 * values[-1] - middles[-1]]
+    return cell_edges(x), cell_edges(y)
+
+# Line graph of a ResultTable (see results/ResultTable.py): y over the values of x, one line
+# per value of series. Aggregate first when several rows share x and series; the last one is drawn.
+def table_graph(table, x, y, series=None, name=None, **options):
+    xs = np.unique(table[x]).tolist()
+    lines = {}
+    for label in (np.unique(table[series]).tolist() if series != None else [y]):
+        rows = table.where(**{series: label}) if series != None else table
+        by_x = dict(zip(rows[x].tolist(), rows[y].tolist()))
+        lines[str(label)] = [by_x.get(v) for v in xs]
+    graph = {'name': name or f'{y}-{x}', 'kind': 'lines', 'xlabel': x, 'ylabel': y, 'x': xs, 'series': lines}
+    graph.update(options)
+    return graph
+
+class ReportRenderer(object):
+
+    def __init__(self):
+        self.config = {
+            'title': '',
+            # Rows (label, value) of the table at the top of index.html
+            'description': [],
+            # Worker processes; 1 renders in this process
+            'processes': os.cpu_count() or 1,
+        }
+        self.graphs = []
+
+    def setConfig(self, config):
+        for key, value in config.items():
+            if key in self.config.keys():
+                self.config[key] = value
+
+    def add(self, graph):
+        self.graphs.append(graph)
+
+    # Render every graph to output_dir/<name>.png and write output_dir/index.html; returns the PNG paths.
+    def render(self, output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+        files = [os.path.join(output_dir, graph['name'] + '.png') for graph in self.graphs]
+        processes = min(self.config['processes'], len(self.graphs))
+        with PROFILER.stage('savefig', graphs=len(self.graphs), processes=processes):
+            if processes <= 1:
+                for graph, output_file in zip(self.graphs, files):
+                    render_graph(graph, output_file)
+            else:
+                with ProcessPoolExecutor(max_workers=processes) as pool:
+                    list(pool.map(render_graph, self.graphs, files))
+        self.write_index(output_dir)
+        return files
+
+    def write_index(self, output_dir):
+        title = html.escape(self.config['title'] or 'Report')
+        lines = ['<!DOCTYPE html>', '<html>', '<head>', '<meta charset="utf-8">', f'<title>{title}</title>',
+                 '<style>body {font-family: sans-serif} figure {display: inline-block; margin: 8px} td {padding: 2px 8px}</style>',
+                 '</head>', '<body>', f'<h1>{title}</h1>']
+        if len(self.config['description']) > 0:
+            lines.append('<table>')
+            for label, value in self.config['description']:
+                lines.append(f'<tr><td>{html.escape(str(label))}</td><td>{html.escape(str(value))}</td></tr>')
+            lines.append('</table>')
+        lines.append('<ul>')
+        for graph in self.graphs:
+            lines.append(f'<li><a href="#{html.escape(graph["name"])}">{html.escape(caption(graph))}</a></li>')
+        lines.append('</ul>')
+        for graph in self.graphs:
+            source = html.escape(graph['name'] + '.png')
+            lines.append(f'<figure id="{html.escape(graph["name"])}"><a href="{source}"><img src="{source}" width="640"></a>'
+                         f'<figcaption>{html.escape(caption(graph))}</figcaption></figure>')
+        lines += ['</body>', '</html>']
+        with open(os.path.join(output_dir, 'index.html'), 'w', encoding='UTF8') as f:
+            f.write('\n'.join(lines) + '\n')
@@ -1,14 +1,12 @@
 # Save Plot
 # x axis: number of workers
-# y axis: physical execution time
-
-from datetime import datetime
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
+# y axis: physical execution time, deadline misses, CPU time, involuntary context switches
+# The graphs are rendered as one report (plots/ReportRenderer.py) with an index.html.
 
 import os
-import subprocess
-import statistics
+
+from runners.LFRunner import LFRunner
+from plots.ReportRenderer import ReportRenderer
 
 class PlotGenerator(object):
     
@@ -19,35 +17,49 @@ class PlotGenerator(object):
             'y-axis': 'physical_excution_time',
             'dataset': {},
             'num_iteration': 1,
-            'save_name': ''
+            # Number of build/run jobs executed in parallel
+            'jobs': 1,
+            # Optional ResultStore; stored iterations of 'config_hash' are not run again.
+            # 'dataset' and 'config_hash' may also be lists, one entry per replicated task set.
+            'store': None,
+            'config_hash': '',
+            # Graphs are <save_name>-exe_time.png, -deadline_miss.png, ... in the output directory
+            'save_name': '',
+            # Processes rendering the graphs
+            'processes': os.cpu_count() or 1
         }
 
         # basic path
         self.basicPath = "./graph"
-        if os.path.exists(self.basicPath):
+        if not os.path.exists(self.basicPath):
             os.mkdir(self.basicPath)
 
+        self.runner = LFRunner()
+        self.runner.setConfig({'compiler': 'gradlew', 'verbose': False})
+
     def setConfig(self, config):
         for key, value in config.items():
             if key in self.config.keys():
                 self.config[key] = value
 
-    def save_graph(self, axis, colors, graph_axis, xlabel, ylabel, output_dir):
-        _, ax = plt.subplots()
-        plt.axis(axis)
-        patches = []
-        axes = []
-        for i, scheduler in enumerate(self.target_schedulers):
-           patches.append(mpatches.Patch(color=colors[i], label=scheduler))
-           axes.append(ax.plot(self.workers, graph_axis[scheduler], '--', color=colors[i]))
-
-        ax.legend(handles=patches, loc='upper right')
-        plt.axis([min(self.workers)-1, max(self.workers)+1, max(min(min(graph_axis[s]) for s in self.target_schedulers)-1, 0), max(max(graph_axis[s]) for s in self.target_schedulers) + 1])
-        plt.xlabel(xlabel)
-        plt.ylabel(ylabel)
-
-        plt.title(self.config['title'], fontsize= 10)
-        plt.savefig(os.path.join(output_dir, "%s.png"%(self.config['save_name'])))
+    # Line graph over the number of workers for the report; upper: optional tail values
+    # (e.g. p95) drawn as dotted lines above the means, band: optional (low, high) per scheduler
+    def graph(self, graph_axis, ylabel, suffix, upper=None, band=None):
+        graph = {
+            'name': self.config['save_name'] + suffix,
+            'kind': 'lines',
+            'title': self.config['title'],
+            'caption': ylabel,
+            'xlabel': 'Number of Workers',
+            'ylabel': ylabel,
+            'x': list(self.workers),
+            'series': {s: graph_axis[s] for s in self.target_schedulers},
+        }
+        if upper != None:
+            graph['upper'] = {s: upper[s] for s in self.target_schedulers}
+        if band != None:
+            graph['band'] = {s: band[s] for s in self.target_schedulers}
+        return graph
 
     def plot_graph(self, output_dir):
         WORKING_DIR = os.getcwd()
@@ -56,98 +68,59 @@ class PlotGenerator(object):
             raise RuntimeError("Set the environment variable LF_PATH to the path where Lingua Franca is installed")
     
         os.chdir(LF_PATH)
-        workers = self.config['dataset']['workers']
+        # One configuration may come as several independently seeded task sets
+        datasets = self.config['dataset'] if isinstance(self.config['dataset'], list) else [self.config['dataset']]
+        config_hashes = self.config['config_hash'] if isinstance(self.config['config_hash'], list) else [self.config['config_hash']] * len(datasets)
+        workers = datasets[0]['workers']
 
         target_schedulers = []
-        for scheduler in self.config['dataset']['schedulers'].keys():
-            if len(self.config['dataset']['schedulers'][scheduler]) > 0:
+        for scheduler in datasets[0]['schedulers'].keys():
+            if len(datasets[0]['schedulers'][scheduler]) > 0:
                 target_schedulers.append(scheduler)
 
         if len(target_schedulers) == 0:
             print("There is no LF file to plot")
             return
 
-        exe_times = {}
-        deadline_misses = {}
-        for scheduler in target_schedulers:
-            exe_time = []
-            deadline_miss = []
-            for i, _ in enumerate(workers):
-                es = []
-                ds = []
-                for _ in range(int(self.config['num_iteration'])):
-                    e, d = self.__run_single_LF(self.config['dataset']['schedulers'][scheduler][i])
-                    es.append(e)
-                    ds.append(d)
-
-                exe_time.append(statistics.mean(es))
-                deadline_miss.append(statistics.mean(ds))
-            exe_times[scheduler] = exe_time.copy()
-            deadline_misses[scheduler] = deadline_miss.copy()
-            exe_time.clear()
-            deadline_miss.clear()
+        # Per scheduler and worker: aggregates of every task set (between/within-set variance)
+        self.runner.setConfig({'jobs': self.config['jobs']})
+        self.results = self.runner.run_datasets(datasets, self.config['num_iteration'], self.config['store'], config_hashes)
+        self.exe_time_replicas = self.results['exe_times']
+        self.deadline_miss_replicas = self.results['deadline_misses']
+        self.censored_runs = self.results['censored_runs']
+        self.noisy_runs = self.results['noisy_runs']
+        # Resource usage of the runs per metric: {metric: {scheduler: [ReplicatedStats per worker]}}
+        self.resources = self.results['resources']
+
+        exe_times = {s: [r.mean() for r in self.exe_time_replicas[s]] for s in target_schedulers}
+        deadline_misses = {s: [r.mean() for r in self.deadline_miss_replicas[s]] for s in target_schedulers}
+        # Streaming aggregates (mean/variance + quantile sketch) of all runs per scheduler and worker
+        self.exe_time_stats = {s: [r.pooled() for r in self.exe_time_replicas[s]] for s in target_schedulers}
+        self.deadline_miss_stats = {s: [r.pooled() for r in self.deadline_miss_replicas[s]] for s in target_schedulers}
         
         self.target_schedulers = target_schedulers
         self.workers = workers
 
-        # Graph 1: Physical execution time
-        PlotGenerator.save_graph(self, axis= [1, 25, 0.0, 5.0],
-                                colors=['#D81B60', '#1E88E5', '#FFC107', '#004D40', '#8794DD'],
-                                graph_axis=exe_times,
-                                xlabel="Number of Workers",
-                                ylabel="Physical Execution times",
-                                output_dir=output_dir)
+        # All graphs go to one report (index.html in output_dir), rendered in parallel
+        report = ReportRenderer()
+        report.setConfig({'title': self.config['title'], 'processes': self.config['processes']})
+
+        # Graph 1: Physical execution time, with the 95% confidence interval of the mean
+        intervals = {s: [r.confidence_interval() for r in self.exe_time_replicas[s]] for s in target_schedulers}
+        report.add(self.graph(exe_times, "Physical Execution times (dotted: p95, band: 95% CI)", '-exe_time',
+                              upper={s: [a.quantile(0.95) for a in self.exe_time_stats[s]] for s in target_schedulers},
+                              band={s: ([low for low, _ in intervals[s]], [high for _, high in intervals[s]]) for s in target_schedulers}))
 
         # Graph 2: Deadline misses
-        PlotGenerator.save_graph(self, axis= [1, 25, 0.0, 5.0],
-                                colors=['#D81B60', '#1E88E5', '#FFC107', '#004D40', '#8794DD'],
-                                graph_axis=deadline_misses,
-                                xlabel="Number of Workers",
-                                ylabel="Deadline Misses",
-                                output_dir=output_dir)
+        report.add(self.graph(deadline_misses, "Deadline Misses", '-deadline_miss'))
+
+        # Graph 3, 4: CPU time and involuntary context switches of the runs
+        for metric, ylabel in [('cpu_time', 'CPU time (user + system)'), ('involuntary_switches', 'Involuntary Context Switches')]:
+            if metric in self.resources:
+                report.add(self.graph({s: [r.mean() for r in self.resources[metric][s]] for s in target_schedulers},
+                                      ylabel, f'-{metric}'))
 
         os.chdir(WORKING_DIR)
+        report.render(output_dir)
 
         return exe_times, deadline_misses
-
-    def __run_single_LF(self, filepath):
-
-        LF_PATH = os.getenv("LF_PATH")
-        if LF_PATH == None:
-            raise RuntimeError("Set the environment variable LF_PATH to the path where Lingua Franca is installed")
-    
-        os.chdir(LF_PATH)
-
-        if not os.path.isfile(filepath):
-            raise RuntimeError("No LF file: " + filepath)
-        
-        filename = filename = filepath.split('/')[-1].split('.')[0]
-        binpath = f"{'/'.join(filepath.split('/')[:-3])}/bin/{filename}"
-
-        out = subprocess.run([f'./gradlew', 'runLfc', '--args', filepath], capture_output=True)
-        built_success = False
-        for line in reversed(out.stdout.decode("utf-8").split("\n")):
-            if line.startswith("BUILD SUCCESSFUL"):
-                built_success = True
-                break
-        
-        if built_success:
-            print(f"Built Successfully: {filepath}")
-        else:
-            print("Failed to build")
-            print(out.stderr.decode("utf-8"))
-            exit(0)
-    
-        lf_out = subprocess.run([binpath], capture_output=True)
-
-        for line in reversed(lf_out.stdout.decode("utf-8").split("\n")):
-            if line.startswith("---- Elapsed physical"):
-                exe_time = line.split(' ')[-1]
-            if line.startswith("---- Deadline miss:"):
-                deadline_miss = int(line.split(' ')[-1])
-                break
-
-        exe_time = int(exe_time.replace(',','')) / 1000000000
-        print('Total physical execution time: ' + str(exe_time))
-
-        return exe_time, deadline_miss
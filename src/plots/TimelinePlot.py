@@ -0,0 +1,75 @@
+# Timeline Plot
+# Per-worker Gantt chart of reaction executions (and waits) from an LF trace,
+# with the busy fraction of every worker over time below it.
+
+import os
+import numpy as np
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from tracing.LFTrace import read_trace
+
+class TimelinePlot(object):
+
+    def __init__(self):
+        self.config = {
+            'title': '',
+            # Number of time slices of the utilization plot
+            'bins': 100,
+            # Draw worker_wait intervals under the reactions
+            'show_waits': True,
+        }
+
+    def setConfig(self, config):
+        for key, value in config.items():
+            if key in self.config.keys():
+                self.config[key] = value
+
+    def plot_trace(self, trace, output_file):
+        reactions = trace.intervals('reaction')
+        waits = trace.intervals('worker_wait') if self.config['show_waits'] else {}
+        edges, utilization = trace.utilization(self.config['bins'])
+
+        fig = Figure(figsize=(12, 7))
+        FigureCanvasAgg(fig)
+        gantt, util = fig.subplots(2, 1, sharex=True, gridspec_kw={'height_ratios': [3, 1]})
+
+        # Color reactions by their reactor so that tasks are told apart
+        reactors = sorted(set(int(p) for _, _, pointers in reactions.values() for p in np.unique(pointers)))
+        colors = {p: matplotlib.colormaps['tab20'](i % 20) for i, p in enumerate(reactors)}
+        for worker in sorted(set(reactions.keys()) | set(waits.keys())):
+            if worker in waits:
+                starts, ends, _ = waits[worker]
+                gantt.broken_barh(list(zip(starts / 1e6, (ends - starts) / 1e6)), (worker - 0.1, 0.2), facecolors='lightgray')
+            if worker in reactions:
+                starts, ends, pointers = reactions[worker]
+                gantt.broken_barh(list(zip(starts / 1e6, (ends - starts) / 1e6)), (worker - 0.4, 0.8),
+                                  facecolors=[colors[int(p)] for p in pointers])
+        gantt.set_ylabel('worker')
+        gantt.set_yticks(sorted(reactions.keys()))
+        gantt.set_title(self.config['title'])
+
+        centers = (edges[:-1] + edges[1:]) / 2 / 1e6
+        for worker, fractions in sorted(utilization.items()):
+            util.plot(centers, fractions, label=f'worker {worker}')
+        util.set_ylim(0, 1.05)
+        util.set_xlabel('physical time (msec)')
+        util.set_ylabel('busy fraction')
+        util.legend(loc='upper right', fontsize='small')
+
+        fig.savefig(output_file)
+
+    # Render every <name>_<iteration>.lft of trace_dir to <output_dir>/<name>_<iteration>.png.
+    def plot_traces(self, trace_dir, output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+        saved = []
+        for filename in sorted(os.listdir(trace_dir)):
+            if not filename.endswith('.lft'):
+                continue
+            name = filename[:-len('.lft')]
+            output_file = os.path.join(output_dir, name + '.png')
+            self.setConfig({'title': name})
+            self.plot_trace(read_trace(os.path.join(trace_dir, filename)), output_file)
+            saved.append(output_file)
+        return saved
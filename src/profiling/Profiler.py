@@ -0,0 +1,91 @@
+# Profiler
+# Wall-clock timing of the pipeline stages (generate, render, write, build, run, parse, savefig).
+# Every stage is one (name, start, duration, thread, args) tuple appended to a list, so it is
+# cheap enough to stay on in full sweeps. The spans are exported as Chrome trace events
+# (chrome://tracing, ui.perfetto.dev) and summarized per stage.
+# Stages nest (e.g. 'parse' inside 'run'), so the shares of the summary do not add up to 100%.
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+
+class Profiler(object):
+
+    def __init__(self):
+        self.enabled = False
+        self.spans = []
+        self.thread_names = {}
+        self.start_ns = time.perf_counter_ns()
+
+    # Start recording (again) from scratch.
+    def enable(self):
+        self.spans = []
+        self.thread_names = {}
+        self.start_ns = time.perf_counter_ns()
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    # with PROFILER.stage('build', file=filepath): ...
+    def stage(self, name, **args):
+        if not self.enabled:
+            return nullcontext()
+        return self.span(name, args)
+
+    @contextmanager
+    def span(self, name, args):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            thread = threading.current_thread()
+            self.thread_names.setdefault(thread.ident, thread.name)
+            # list.append is atomic, so pool threads need no lock
+            self.spans.append((name, start - self.start_ns, time.perf_counter_ns() - start, thread.ident, args))
+
+    def chrome_trace(self):
+        pid = os.getpid()
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                  for tid, name in self.thread_names.items()]
+        for name, start, duration, tid, args in self.spans:
+            events.append({
+                'name': name,
+                'cat': 'pipeline',
+                'ph': 'X',
+                'ts': start / 1000,
+                'dur': duration / 1000,
+                'pid': pid,
+                'tid': tid,
+                'args': {k: str(v) for k, v in args.items()},
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save(self, output_file):
+        with open(output_file, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+    # {stage: {'count', 'total', 'mean', 'max'}} in seconds
+    def summary(self):
+        stages = {}
+        for name, _, duration, _, _ in self.spans:
+            stage = stages.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0})
+            stage['count'] += 1
+            stage['total'] += duration / 1e9
+            stage['max'] = max(stage['max'], duration / 1e9)
+        for stage in stages.values():
+            stage['mean'] = stage['total'] / stage['count']
+        return stages
+
+    def print_summary(self):
+        wall = (time.perf_counter_ns() - self.start_ns) / 1e9
+        print(f"{'stage':<10} {'count':>7} {'total (s)':>11} {'mean (ms)':>11} {'max (ms)':>11} {'of wall':>8}")
+        for name, stage in sorted(self.summary().items(), key=lambda item: -item[1]['total']):
+            print(f"{name:<10} {stage['count']:>7} {stage['total']:>11.3f} {stage['mean'] * 1000:>11.3f} "
+                  f"{stage['max'] * 1000:>11.3f} {stage['total'] / wall if wall > 0 else 0:>8.1%}")
+        print(f"wall clock: {wall:.3f} s (stages run in parallel with -J and nest, so shares can exceed 100%)")
+
+# Shared by every stage of the pipeline; disabled until enable() is called.
+PROFILER = Profiler()
@@ -0,0 +1,90 @@
+# Query across result tables. (Command line interface version.)
+# Loads the columnar tables of many runs (results.npz of every cli.py output directory, GUI
+# .npz files, .feather/.arrow tables) or a result store, filters, groups and aggregates them
+# (see results/ResultTable.py), prints the result and can save and plot it.
+
+import os
+import argparse
+from datetime import datetime
+
+from results.ResultTable import ResultTable
+from plots.ReportRenderer import ReportRenderer, table_graph
+
+class QueryCLI(object):
+    def __init__(self):
+        parser = argparse.ArgumentParser(description="Filter, group and aggregate result tables of many runs.")
+        parser.add_argument("paths", nargs='+', type=str,
+                            help="Set the tables (.npz, .feather, .arrow), result stores (.db) or directories of tables")
+        parser.add_argument("-W", "--where", nargs='+', type=str, default=[],
+                            help="Set the filters: column=value or column=value1,value2 (ex. -W type=basic scheduler=NP,GEDF_NP)")
+        parser.add_argument("-G", "--group_by", nargs='+', type=str, default=[],
+                            help="Set the columns to group by (ex. -G utilization scheduler)")
+        parser.add_argument("-A", "--aggregate", nargs='+', type=str, default=['exe_time:mean', 'deadline_miss:mean'],
+                            help="Set the aggregations column:fn, fn in count, sum, mean, std, min, max, p<q> (ex. -A exe_time:p95)")
+        parser.add_argument("-C", "--columns", nargs='+', type=str,
+                            help="Set the columns printed without --group_by (default: all)")
+        parser.add_argument("-O", "--output", type=str,
+                            help="Save the result as a table (.npz, .feather, .arrow)")
+        parser.add_argument("--plot", nargs='+', type=str,
+                            help="Plot a line graph of the result: x y [series] (ex. --plot utilization exe_time_mean scheduler)")
+        parser.add_argument("--columns_only", action='store_true',
+                            help="Only list the columns of the loaded tables")
+
+        self.args = parser.parse_args()
+
+    def Run(self):
+        table = ResultTable.load(self.args.paths[0]) if len(self.args.paths) == 1 else ResultTable.load_many(self.args.paths)
+        if self.args.columns_only:
+            for name in table.names():
+                print(f'{name:<40} {table[name].dtype}')
+            return
+
+        conditions = {}
+        for condition in self.args.where:
+            if '=' not in condition:
+                raise RuntimeError("Filters are column=value: " + condition)
+            name, value = condition.split('=', 1)
+            conditions[name] = value.split(',')
+        table = table.where(**conditions)
+
+        if len(self.args.group_by) > 0:
+            aggregations = {}
+            for aggregation in self.args.aggregate:
+                column, fn = aggregation.rsplit(':', 1)
+                aggregations[f'{column}_{fn}'] = (column, fn)
+            table = table.aggregate(self.args.group_by, **aggregations)
+        elif self.args.columns != None:
+            table = ResultTable({name: table[name] for name in self.args.columns})
+
+        self.print_table(table)
+
+        if self.args.output != None:
+            table.save(self.args.output)
+            print(f"Saved {len(table)} rows to {self.args.output}")
+
+        if self.args.plot != None:
+            if len(self.args.plot) not in [2, 3]:
+                raise RuntimeError("--plot takes x y [series]")
+            output_dir = f'{os.getcwd()}/output/query_{int(round(datetime.now().timestamp()))}'
+            report = ReportRenderer()
+            report.setConfig({'title': 'Query', 'processes': 1,
+                              'description': [('paths', ' '.join(self.args.paths)), ('where', ' '.join(self.args.where)),
+                                              ('group by', ' '.join(self.args.group_by))]})
+            report.add(table_graph(table, *self.args.plot))
+            report.render(output_dir)
+            print(f"Saved the graph (index.html) to {output_dir}")
+
+    @staticmethod
+    def print_table(table):
+        names = table.names()
+        rows = [[f'{v:.6g}' if isinstance(v, float) else str(v) for v in row.values()] for row in table.to_rows()]
+        widths = [max([len(name)] + [len(row[i]) for row in rows]) for i, name in enumerate(names)]
+        print('  '.join(f'{name:>{width}}' for name, width in zip(names, widths)))
+        for row in rows:
+            print('  '.join(f'{value:>{width}}' for value, width in zip(row, widths)))
+        print(f"({len(rows)} rows)")
+
+
+if __name__ == "__main__":
+    cli = QueryCLI()
+    cli.Run()
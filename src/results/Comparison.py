@@ -0,0 +1,189 @@
+# Result Comparison
+# Compares a baseline and a candidate result set point by point, e.g. before and after a
+# Lingua Franca runtime upgrade. A result set is either
+#   a result store (.db): points are (config hash, scheduler, workers)
+#   an output directory of cli.py (or its events.ndjson): points are (task set k, scheduler,
+#   workers), so both runs must come from the same command and --seed
+# Per point, the execution times and the deadline misses of the two sets are compared with a
+# two-sided Mann-Whitney U test, Cliff's delta as effect size (> 0: the candidate is larger)
+# and the ratio of medians. p-values are adjusted over all points (Benjamini-Hochberg), and
+# a point regresses when it is significant, the effect is large enough and the candidate is
+# worse. Censored runs are lower bounds; they are counted and their execution times left out
+# (their deadline misses are still compared).
+
+import os
+import csv
+import math
+import json
+import sqlite3
+import statistics
+
+from scipy.stats import mannwhitneyu
+
+def load_result_set(path):
+    if os.path.isdir(path):
+        path = os.path.join(path, 'events.ndjson')
+    if not os.path.isfile(path):
+        raise RuntimeError("No result store or events.ndjson: " + path)
+
+    # {(config, scheduler, workers): {'exe_time': [...], 'deadline_miss': [...], 'censored': n}}
+    points = {}
+    def add(config, scheduler, workers, exe_time, deadline_miss, censored):
+        point = points.setdefault((config, scheduler, int(workers)), {'exe_time': [], 'deadline_miss': [], 'censored': 0})
+        # The wall time of a censored run is only a lower bound
+        if not censored:
+            point['exe_time'].append(exe_time)
+        point['deadline_miss'].append(deadline_miss)
+        point['censored'] += int(censored)
+
+    # Description of every config
+    configs = {}
+    if path.endswith('.ndjson'):
+        with open(path) as f:
+            for line in f:
+                event = json.loads(line)
+                if event['type'] == 'run_finished':
+                    config = f'taskset_{event["k"]}'
+                    configs[config] = config
+                    add(config, event['scheduler'], event['workers'], event['exe_time'], event['deadline_miss'], event['censored'])
+    else:
+        connection = sqlite3.connect(path)
+        for config_hash, scheduler, workers, exe_time, deadline_miss, censored in connection.execute(
+                'SELECT config_hash, scheduler, workers, exe_time, deadline_miss, censored FROM measurements ORDER BY iteration'):
+            add(config_hash, scheduler, workers, exe_time, deadline_miss, censored)
+        configs = {config_hash: config for config_hash, config in connection.execute('SELECT config_hash, config FROM configs')}
+        connection.close()
+    return {'path': path, 'points': points, 'configs': configs}
+
+# Benjamini-Hochberg adjusted p-values (q-values), in the order of p_values
+def adjust_p_values(p_values):
+    order = sorted(range(len(p_values)), key=lambda i: p_values[i])
+    q_values = [1.0] * len(p_values)
+    running = 1.0
+    for rank in reversed(range(len(order))):
+        i = order[rank]
+        running = min(running, p_values[i] * len(p_values) / (rank + 1))
+        q_values[i] = running
+    return q_values
+
+def median(values):
+    return statistics.median(values) if len(values) > 0 else math.nan
+
+# Smallest two-sided p-value of the exact Mann-Whitney U test with n and m samples
+def min_p_value(n, m):
+    return min(1.0, 2 / math.comb(n + m, n)) if n > 0 and m > 0 else 1.0
+
+# (p-value, Cliff's delta of candidate over baseline)
+def mann_whitney(baseline, candidate):
+    if len(set(baseline) | set(candidate)) == 1:
+        return 1.0, 0.0
+    u, p = mannwhitneyu(candidate, baseline, alternative='two-sided')
+    return float(p), 2 * float(u) / (len(baseline) * len(candidate)) - 1
+
+class RegressionComparison(object):
+
+    def __init__(self):
+        self.config = {
+            # False discovery rate of the adjusted p-values
+            'alpha': 0.05,
+            # Minimum |Cliff's delta| (0.33: medium, 0.47: large)
+            'min_effect': 0.33,
+            # Minimum slowdown of the median execution time (0.05: 5% slower)
+            'min_slowdown': 0.05,
+            # Points with fewer samples on either side are not tested; below 4, no p-value of
+            # the exact test can be under 0.05 (see min_p_value)
+            'min_samples': 4,
+        }
+
+    def setConfig(self, config):
+        for key, value in config.items():
+            if key in self.config.keys():
+                self.config[key] = value
+
+    # One row per point of both sets; unmatched points are counted in self.unmatched.
+    def compare(self, baseline, candidate):
+        keys = sorted(set(baseline['points']) & set(candidate['points']))
+        self.unmatched = {
+            'baseline': len(set(baseline['points']) - set(candidate['points'])),
+            'candidate': len(set(candidate['points']) - set(baseline['points'])),
+        }
+
+        rows = []
+        for config, scheduler, workers in keys:
+            base, cand = baseline['points'][(config, scheduler, workers)], candidate['points'][(config, scheduler, workers)]
+            row = {
+                'config': config,
+                'description': candidate['configs'].get(config, baseline['configs'].get(config, config)),
+                'scheduler': scheduler,
+                'workers': workers,
+                'n_baseline': len(base['exe_time']),
+                'n_candidate': len(cand['exe_time']),
+                'median_baseline': median(base['exe_time']),
+                'median_candidate': median(cand['exe_time']),
+                'miss_baseline': statistics.mean(base['deadline_miss']),
+                'miss_candidate': statistics.mean(cand['deadline_miss']),
+                'censored_baseline': base['censored'],
+                'censored_candidate': cand['censored'],
+            }
+            row['ratio'] = row['median_candidate'] / row['median_baseline'] if row['median_baseline'] > 0 else (math.nan if math.isnan(row['median_baseline']) else float('inf'))
+            row['tested'] = min(row['n_baseline'], row['n_candidate']) >= self.config['min_samples']
+            if row['tested']:
+                row['p'], row['delta'] = mann_whitney(base['exe_time'], cand['exe_time'])
+                row['miss_p'], row['miss_delta'] = mann_whitney(base['deadline_miss'], cand['deadline_miss'])
+            else:
+                row['p'], row['delta'], row['miss_p'], row['miss_delta'] = 1.0, 0.0, 1.0, 0.0
+            rows.append(row)
+
+        for p, q in [('p', 'q'), ('miss_p', 'miss_q')]:
+            for row, q_value in zip(rows, adjust_p_values([row[p] for row in rows])):
+                row[q] = q_value
+
+        for row in rows:
+            significant = row['tested'] and row['q'] < self.config['alpha'] and abs(row['delta']) >= self.config['min_effect']
+            row['slowdown'] = significant and row['delta'] > 0 and row['ratio'] >= 1 + self.config['min_slowdown']
+            row['speedup'] = significant and row['delta'] < 0 and row['ratio'] <= 1 - self.config['min_slowdown']
+            row['miss_regression'] = (row['tested'] and row['miss_q'] < self.config['alpha'] and
+                                      row['miss_delta'] >= self.config['min_effect'] and row['miss_candidate'] > row['miss_baseline'])
+        return rows
+
+    # Regressed points, largest effect first
+    @staticmethod
+    def ranked(rows):
+        regressed = [row for row in rows if row['slowdown'] or row['miss_regression']]
+        return sorted(regressed, key=lambda row: (-max(row['delta'] if row['slowdown'] else 0, row['miss_delta'] if row['miss_regression'] else 0), -row['ratio']))
+
+    def report(self, rows, baseline, candidate, top=20):
+        ranked = self.ranked(rows)
+        lines = [
+            f"Baseline:  {baseline['path']}",
+            f"Candidate: {candidate['path']}",
+            f"{len(rows)} points compared ({self.unmatched['baseline']} only in the baseline, {self.unmatched['candidate']} only in the candidate), "
+            f"{sum(1 for row in rows if not row['tested'])} with fewer than {self.config['min_samples']} samples",
+            f"{sum(1 for row in rows if row['slowdown'])} slowdowns, {sum(1 for row in rows if row['speedup'])} speedups, "
+            f"{sum(1 for row in rows if row['miss_regression'])} deadline miss regressions "
+            f"(q < {self.config['alpha']}, |delta| >= {self.config['min_effect']}, slowdown >= {self.config['min_slowdown']:.0%})",
+        ]
+        smallest = min_p_value(self.config['min_samples'], self.config['min_samples'])
+        if smallest >= self.config['alpha']:
+            lines.append(f"Warning: with {self.config['min_samples']} samples per side the smallest p-value is {smallest:.3g}, "
+                         f"so no point can be significant at alpha {self.config['alpha']}; raise --min_samples")
+        if len(ranked) > 0:
+            lines.append('')
+            lines.append(f"{'scheduler':<12} {'workers':>7} {'median':>10} {'ratio':>7} {'delta':>6} {'q':>9} {'misses':>15} {'miss q':>9}  config")
+            for row in ranked[:top]:
+                lines.append(f"{row['scheduler']:<12} {row['workers']:>7} {row['median_candidate']:>10.4f} {row['ratio']:>7.3f} {row['delta']:>6.2f} {row['q']:>9.2g} "
+                             f"{row['miss_baseline']:>7.1f} -> {row['miss_candidate']:<5.1f} {row['miss_q']:>9.2g}  {row['description']}")
+            if len(ranked) > top:
+                lines.append(f"... {len(ranked) - top} more in the CSV")
+        return '\n'.join(lines)
+
+    @staticmethod
+    def save_csv(rows, output_file):
+        columns = ['config', 'description', 'scheduler', 'workers', 'n_baseline', 'n_candidate', 'median_baseline', 'median_candidate',
+                   'ratio', 'delta', 'p', 'q', 'slowdown', 'speedup', 'miss_baseline', 'miss_candidate', 'miss_delta', 'miss_p', 'miss_q',
+                   'miss_regression', 'censored_baseline', 'censored_candidate']
+        with open(output_file, 'w', encoding='UTF8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow([row[column] for column in columns])
@@ -0,0 +1,126 @@
+# Result Store
+# SQLite-backed store of measurements keyed by (config hash, scheduler, workers, iteration).
+# Every measurement is committed as soon as it completes, so an interrupted sweep keeps
+# what it has measured and a restarted sweep with the same config skips it.
+
+import csv
+import json
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+
+# Keys that select rows inside one configuration rather than define it
+NON_FINGERPRINT_KEYS = ['schedulers', 'min_workers', 'max_workers']
+
+class ResultStore(object):
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS configs (
+                config_hash TEXT PRIMARY KEY,
+                config TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS measurements (
+                config_hash TEXT NOT NULL,
+                scheduler TEXT NOT NULL,
+                workers INTEGER NOT NULL,
+                iteration INTEGER NOT NULL,
+                exe_time REAL NOT NULL,
+                deadline_miss INTEGER NOT NULL,
+                recorded_at TEXT NOT NULL,
+                censored INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (config_hash, scheduler, workers, iteration)
+            );
+            CREATE TABLE IF NOT EXISTS resources (
+                config_hash TEXT NOT NULL,
+                scheduler TEXT NOT NULL,
+                workers INTEGER NOT NULL,
+                iteration INTEGER NOT NULL,
+                phase TEXT NOT NULL,
+                metric TEXT NOT NULL,
+                value REAL NOT NULL,
+                PRIMARY KEY (config_hash, scheduler, workers, iteration, phase, metric)
+            );
+        ''')
+        # Stores created before early termination existed have no 'censored' column
+        columns = [row[1] for row in self.connection.execute('PRAGMA table_info(measurements)')]
+        if 'censored' not in columns:
+            self.connection.execute('ALTER TABLE measurements ADD COLUMN censored INTEGER NOT NULL DEFAULT 0')
+        self.connection.executescript('''
+            DROP VIEW IF EXISTS results;
+            CREATE VIEW results AS
+                SELECT config_hash, scheduler, workers, COUNT(*) AS iterations,
+                       AVG(CASE WHEN censored = 0 THEN exe_time END) AS exe_time, AVG(deadline_miss) AS deadline_miss,
+                       SUM(censored) AS censored
+                FROM measurements GROUP BY config_hash, scheduler, workers;
+        ''')
+        self.connection.commit()
+
+    @staticmethod
+    def fingerprint(config):
+        key = {k: v for k, v in config.items() if k not in NON_FINGERPRINT_KEYS}
+        return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+    # Register a configuration and return its hash.
+    def add_config(self, config):
+        config_hash = ResultStore.fingerprint(config)
+        with self.lock:
+            self.connection.execute('INSERT OR IGNORE INTO configs VALUES (?, ?)',
+                                    (config_hash, json.dumps(config, sort_keys=True, default=str)))
+            self.connection.commit()
+        return config_hash
+
+    # A censored measurement was stopped early; its values are lower bounds.
+    def record(self, config_hash, scheduler, workers, iteration, exe_time, deadline_miss, censored=False):
+        with self.lock:
+            self.connection.execute('INSERT OR REPLACE INTO measurements (config_hash, scheduler, workers, iteration, exe_time, deadline_miss, recorded_at, censored) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                    (config_hash, scheduler, workers, iteration, exe_time, deadline_miss, datetime.now().isoformat(), int(censored)))
+            self.connection.commit()
+
+    # Stored (exe_time, deadline_miss, censored) of one iteration, or None if it was not measured yet.
+    def get(self, config_hash, scheduler, workers, iteration):
+        with self.lock:
+            row = self.connection.execute('SELECT exe_time, deadline_miss, censored FROM measurements WHERE config_hash = ? AND scheduler = ? AND workers = ? AND iteration = ?',
+                                          (config_hash, scheduler, workers, iteration)).fetchone()
+        return None if row == None else (row[0], row[1], bool(row[2]))
+
+    # Resource usage (see runners/ResourceUsage.py) of a 'build' or 'run' phase.
+    def record_resources(self, config_hash, scheduler, workers, iteration, phase, metrics):
+        with self.lock:
+            self.connection.executemany('INSERT OR REPLACE INTO resources VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                        [(config_hash, scheduler, workers, iteration, phase, metric, value) for metric, value in metrics.items()])
+            self.connection.commit()
+
+    def get_resources(self, config_hash, scheduler, workers, iteration, phase):
+        with self.lock:
+            rows = self.connection.execute('SELECT metric, value FROM resources WHERE config_hash = ? AND scheduler = ? AND workers = ? AND iteration = ? AND phase = ?',
+                                           (config_hash, scheduler, workers, iteration, phase)).fetchall()
+        return {metric: value for metric, value in rows}
+
+    def samples(self, config_hash, scheduler, workers):
+        with self.lock:
+            return self.connection.execute('SELECT exe_time, deadline_miss, censored FROM measurements WHERE config_hash = ? AND scheduler = ? AND workers = ? ORDER BY iteration',
+                                           (config_hash, scheduler, workers)).fetchall()
+
+    # Export the aggregated `results` view; all configurations when config_hash is None.
+    def export_csv(self, output_file, config_hash=None):
+        query = 'SELECT r.config_hash, c.config, r.scheduler, r.workers, r.iterations, r.exe_time, r.deadline_miss, r.censored FROM results r JOIN configs c USING (config_hash)'
+        params = ()
+        if config_hash != None:
+            query += ' WHERE r.config_hash = ?'
+            params = (config_hash,)
+        with self.lock:
+            rows = self.connection.execute(query + ' ORDER BY r.config_hash, r.scheduler, r.workers', params).fetchall()
+
+        with open(output_file, 'w', encoding='UTF8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['config hash', 'config', 'scheduler', 'worker', 'number of iterations', 'physical execution time', 'deadline miss', 'censored runs'])
+            writer.writerows(rows)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
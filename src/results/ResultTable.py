@@ -0,0 +1,292 @@
+# Result Table
+# Columnar results: one NumPy array per column, with the configuration flattened into
+# columns ('utilization', 'period.value', ...), so that thousands of runs can be filtered,
+# grouped and aggregated with vectorized operations instead of parsing one CSV per run.
+# Tables are saved as NumPy .npz (no pickling) or, when pyarrow is installed, Arrow/Feather
+# (.feather, .arrow). Sources:
+#   run_table()     the summary of one cli.py / GUI run, one row per (scheduler, workers);
+#                   saved next to its CSV as results.npz
+#   from_store()    every measurement of a result store (.db), one row per iteration
+#   load()          a saved table, a result store, or every run table under a directory
+#
+#   table = ResultTable.load('output')
+#   table.where(type='basic', scheduler=['NP', 'GEDF_NP']).select(table['workers'] > 2)
+#   table.aggregate(['utilization', 'scheduler'], exe_time=('exe_time', 'mean'), p95=('exe_time', 'p95'))
+
+import os
+import json
+import sqlite3
+
+import numpy as np
+
+# Aggregations of ResultTable.aggregate, besides percentiles 'p<q>' (e.g. 'p95')
+AGGREGATIONS = ['count', 'sum', 'mean', 'std', 'min', 'max']
+# File name of the table saved with each run
+RUN_TABLE = 'results.npz'
+
+# Nested settings become dotted columns ({'period': {'value': 1}} -> 'period.value'),
+# lists become space-separated strings.
+def flatten(config, prefix=''):
+    columns = {}
+    for key, value in config.items():
+        if isinstance(value, dict):
+            columns.update(flatten(value, f'{prefix}{key}.'))
+        elif isinstance(value, (list, tuple)):
+            columns[prefix + key] = ' '.join(str(v) for v in value)
+        else:
+            columns[prefix + key] = value
+    return columns
+
+def is_number(value):
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_))
+
+# Numbers (None: NaN) become int64 or float64 columns, anything else str
+def to_column(values):
+    present = [v for v in values if v != None]
+    if len(present) > 0 and all(is_number(v) for v in present):
+        if len(present) == len(values) and all(isinstance(v, (int, np.integer)) for v in present):
+            return np.array(values, dtype=np.int64)
+        return np.array([np.nan if v == None else v for v in values], dtype=np.float64)
+    return np.array(['' if v == None else str(v) for v in values], dtype=str)
+
+# Value of a column that is missing in a table, for concatenation
+def empty_column(dtype, length):
+    if dtype.kind in 'iuf':
+        return np.full(length, np.nan)
+    return np.full(length, '', dtype=str)
+
+def reduce(fn, values, group, size):
+    if fn == 'count' and values.dtype.kind not in 'iuf':
+        return np.bincount(group, minlength=size)
+    values = values.astype(np.float64)
+    valid = ~np.isnan(values)
+    group, values = group[valid], values[valid]
+    counts = np.bincount(group, minlength=size)
+    if fn == 'count':
+        return counts
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sums = np.bincount(group, weights=values, minlength=size)
+        if fn == 'sum':
+            return sums
+        means = sums / counts
+        if fn == 'mean':
+            return means
+        if fn == 'std':
+            squares = np.bincount(group, weights=(values - means[group]) ** 2, minlength=size)
+            return np.where(counts > 1, np.sqrt(squares / np.maximum(counts - 1, 1)), np.nan)
+
+    # Order statistics on the values sorted within each group
+    if fn not in ['min', 'max'] and not (fn.startswith('p') and fn[1:].replace('.', '', 1).isdigit()):
+        raise RuntimeError(f"Unknown aggregation '{fn}' (use {', '.join(AGGREGATIONS)} or p<q>, e.g. p95)")
+    values = values[np.lexsort((values, group))]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    last = np.maximum(starts + counts - 1, 0)
+    if len(values) == 0:
+        return np.full(size, np.nan)
+    if fn == 'min':
+        result = values[np.minimum(starts, len(values) - 1)]
+    elif fn == 'max':
+        result = values[np.minimum(last, len(values) - 1)]
+    else:
+        position = starts + float(fn[1:]) / 100 * np.maximum(counts - 1, 0)
+        low = np.minimum(np.floor(position).astype(np.int64), len(values) - 1)
+        high = np.minimum(np.ceil(position).astype(np.int64), len(values) - 1)
+        result = values[low] + (values[high] - values[low]) * (position - np.floor(position))
+    return np.where(counts > 0, result, np.nan)
+
+class ResultTable(object):
+
+    def __init__(self, columns=None):
+        # {name: np.ndarray}, all of the same length
+        self.columns = dict(columns or {})
+        lengths = set(len(column) for column in self.columns.values())
+        if len(lengths) > 1:
+            raise RuntimeError("The columns of a result table have different lengths: " + str(sorted(lengths)))
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if len(self.columns) > 0 else 0
+
+    def __getitem__(self, name):
+        if name not in self.columns:
+            raise RuntimeError(f"No column '{name}' (columns: {', '.join(self.names())})")
+        return self.columns[name]
+
+    def names(self):
+        return list(self.columns.keys())
+
+    @staticmethod
+    def from_rows(rows):
+        names = []
+        for row in rows:
+            names += [name for name in row.keys() if name not in names]
+        return ResultTable({name: to_column([row.get(name) for row in rows]) for name in names})
+
+    def to_rows(self):
+        return [{name: column[i].item() for name, column in self.columns.items()} for i in range(len(self))]
+
+    # Rows of every table; columns missing in some of them are NaN or ''.
+    @staticmethod
+    def concat(tables):
+        tables = [table for table in tables if len(table.columns) > 0]
+        names, dtypes = [], {}
+        for table in tables:
+            for name, column in table.columns.items():
+                if name not in names:
+                    names.append(name)
+                dtypes.setdefault(name, []).append(column.dtype)
+
+        columns = {}
+        for name in names:
+            # Mixed kinds (e.g. a seed column numeric in one table, text in another) become text
+            text = any(dtype.kind not in 'iuf' for dtype in dtypes[name])
+            parts = []
+            for table in tables:
+                if name in table.columns:
+                    column = table.columns[name]
+                else:
+                    column = empty_column(np.dtype(str) if text else np.dtype(np.float64), len(table))
+                parts.append(column.astype(str) if text else column)
+            columns[name] = np.concatenate(parts)
+        return ResultTable(columns)
+
+    def select(self, mask):
+        return ResultTable({name: column[mask] for name, column in self.columns.items()})
+
+    # Rows whose columns equal the given values (a list matches any of its values).
+    # Values are converted to the column's type, so '4' matches the number 4.
+    def where(self, **conditions):
+        mask = np.ones(len(self), dtype=bool)
+        for name, values in conditions.items():
+            column = self[name]
+            values = np.asarray(values if isinstance(values, (list, tuple)) else [values])
+            if column.dtype.kind in 'iuf':
+                try:
+                    values = values.astype(np.float64)
+                except ValueError:
+                    raise RuntimeError(f"Numeric column '{name}' compared with a non-numeric value: {values.tolist()}")
+            else:
+                values = values.astype(str)
+            mask &= np.isin(column, values)
+        return self.select(mask)
+
+    def sort(self, keys):
+        order = np.lexsort([self[key] for key in reversed(keys)])
+        return self.select(order)
+
+    # One row per distinct combination of keys, in sorted order, with the named aggregations
+    # {name: (column, fn)}, fn in AGGREGATIONS or a percentile 'p<q>'. NaNs are left out.
+    def aggregate(self, keys, **aggregations):
+        if len(self) == 0:
+            return ResultTable({name: np.array([]) for name in list(keys) + list(aggregations.keys())})
+        group = np.zeros(len(self), dtype=np.int64)
+        for key in keys:
+            values, inverse = np.unique(self[key], return_inverse=True)
+            group = group * len(values) + inverse.reshape(-1)
+        _, first, group = np.unique(group, return_index=True, return_inverse=True)
+        group = group.reshape(-1)
+
+        columns = {key: self[key][first] for key in keys}
+        for name, (column, fn) in aggregations.items():
+            columns[name] = reduce(fn, self[column], group, len(first))
+        return ResultTable(columns)
+
+    def save(self, path):
+        extension = os.path.splitext(path)[1].lower()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if extension == '.npz':
+            np.savez_compressed(path, **self.columns)
+        elif extension in ['.feather', '.arrow']:
+            feather = import_feather(path)
+            import pyarrow
+            feather.write_feather(pyarrow.table(self.columns), path)
+        else:
+            raise RuntimeError("Unknown result table format (use .npz, .feather or .arrow): " + path)
+
+    # A table (.npz, .feather, .arrow), a result store (.db) or a directory, whose tables are
+    # all loaded (stores are not: their rows are iterations, not summaries); tables of several
+    # files get a 'source' column.
+    @staticmethod
+    def load(path):
+        if os.path.isdir(path):
+            files = []
+            for root, _, names in os.walk(path):
+                files += [os.path.join(root, name) for name in sorted(names) if os.path.splitext(name)[1].lower() in ['.npz', '.feather', '.arrow']]
+            return ResultTable.load_many(sorted(files))
+
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.npz':
+            with np.load(path, allow_pickle=False) as archive:
+                return ResultTable({name: archive[name] for name in archive.files})
+        elif extension in ['.feather', '.arrow']:
+            table = import_feather(path).read_table(path)
+            return ResultTable({name: table.column(name).to_numpy() for name in table.column_names})
+        elif extension == '.db':
+            return ResultTable.from_store(path)
+        raise RuntimeError("Unknown result table format (use .npz, .feather, .arrow or .db): " + path)
+
+    @staticmethod
+    def load_many(paths):
+        tables = []
+        for path in paths:
+            table = ResultTable.load(path)
+            table.columns['source'] = np.array([path] * len(table), dtype=str)
+            tables.append(table)
+        return ResultTable.concat(tables)
+
+    # Every measurement of a result store: config_hash, scheduler, workers, iteration, exe_time,
+    # deadline_miss, censored and the flattened config of its configuration.
+    @staticmethod
+    def from_store(path):
+        if not os.path.isfile(path):
+            raise RuntimeError("No result store: " + path)
+        connection = sqlite3.connect(path)
+        configs = {config_hash: flatten(json.loads(config)) for config_hash, config in connection.execute('SELECT config_hash, config FROM configs')}
+        rows = []
+        for config_hash, scheduler, workers, iteration, exe_time, deadline_miss, censored in connection.execute(
+                'SELECT config_hash, scheduler, workers, iteration, exe_time, deadline_miss, censored FROM measurements ORDER BY config_hash, scheduler, workers, iteration'):
+            row = dict(configs.get(config_hash, {}))
+            row.update({'config_hash': config_hash, 'scheduler': scheduler, 'workers': workers, 'iteration': iteration,
+                        'exe_time': exe_time, 'deadline_miss': deadline_miss, 'censored': censored})
+            rows.append(row)
+        connection.close()
+        return ResultTable.from_rows(rows)
+
+def import_feather(path):
+    try:
+        from pyarrow import feather
+    except ImportError:
+        raise RuntimeError("Install pyarrow to read and write Arrow/Feather result tables: " + path)
+    return feather
+
+# Summary of a cli.py or GUI run (the rows of its CSV): one row per scheduler and number of
+# workers, with the task set config, the number of iterations and the task set seeds as columns.
+def run_table(config, result, num_iteration):
+    from runners.ResourceUsage import RESOURCE_METRICS
+
+    settings = flatten(config)
+    settings.update({'num_iteration': num_iteration, 'num_tasksets': len(result['seeds']),
+                     'seeds': ' '.join(str(seed) for seed in result['seeds'])})
+    rows = []
+    for scheduler in config['schedulers']:
+        for i, worker in enumerate(result['workers']):
+            exe_time_stats = result['exe_time_stats'][scheduler][i]
+            row = dict(settings)
+            row.update({
+                'scheduler': scheduler,
+                'workers': worker,
+                'exe_time': result['exe_times'][scheduler][i],
+                'deadline_miss': result['deadline_misses'][scheduler][i],
+                'exe_time_stdev': exe_time_stats.stdev(),
+                'exe_time_p95': exe_time_stats.quantile(0.95),
+                'exe_time_p99': exe_time_stats.quantile(0.99),
+                'max_deadline_miss': result['deadline_miss_stats'][scheduler][i].stats.max,
+                'exe_time_between_stdev': result['exe_time_replicas'][scheduler][i].between_variance() ** 0.5,
+                'exe_time_within_stdev': result['exe_time_replicas'][scheduler][i].within_variance() ** 0.5,
+                'censored': result['censored_runs'][scheduler][i],
+                'noisy': result['noisy_runs'][scheduler][i],
+            })
+            for metric in RESOURCE_METRICS:
+                row[metric] = result['resources'][metric][scheduler][i].mean() if metric in result['resources'] else None
+            rows.append(row)
+    return ResultTable.from_rows(rows)
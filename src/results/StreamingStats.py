@@ -0,0 +1,213 @@
+# Streaming Statistics
+# Constant-memory aggregation of measurements: Welford mean/variance plus a
+# mergeable quantile sketch, so that tail behaviour (p95/p99, worst case) can be
+# tracked over thousands of iterations and combined across workers and nodes.
+
+import math
+
+# Welford's online mean/variance, merged with Chan et al.'s parallel formula.
+class RunningStats(object):
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def stdev(self):
+        return math.sqrt(self.variance())
+
+    def to_dict(self):
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2, 'min': self.min, 'max': self.max}
+
+    @staticmethod
+    def from_dict(d):
+        stats = RunningStats()
+        stats.count, stats.mean, stats.m2, stats.min, stats.max = d['count'], d['mean'], d['m2'], d['min'], d['max']
+        return stats
+
+# Log-bucketed quantile sketch (DDSketch) with relative accuracy `alpha`.
+# Buckets are plain counts, so two sketches with the same alpha merge by addition.
+class QuantileSketch(object):
+
+    def __init__(self, alpha=0.01):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        # Values <= 0 (e.g. zero deadline misses) are counted separately
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, x):
+        self.count += 1
+        if x <= 0:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(x) / self.log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other):
+        if other.alpha != self.alpha:
+            raise RuntimeError("Cannot merge quantile sketches with different accuracy")
+        for index, n in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+        return self
+
+    def quantile(self, q):
+        if self.count == 0:
+            return math.nan
+        # Nearest-rank: the smallest value whose cumulative count reaches q * count
+        rank = max(q * self.count, 1)
+        if self.zero_count >= rank:
+            return 0.0
+        seen = self.zero_count
+        for index in sorted(self.buckets.keys()):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets.keys()) / (self.gamma + 1)
+
+    def to_dict(self):
+        return {'alpha': self.alpha, 'zero_count': self.zero_count, 'count': self.count,
+                'buckets': {str(k): v for k, v in self.buckets.items()}}
+
+    @staticmethod
+    def from_dict(d):
+        sketch = QuantileSketch(d['alpha'])
+        sketch.zero_count, sketch.count = d['zero_count'], d['count']
+        sketch.buckets = {int(k): v for k, v in d['buckets'].items()}
+        return sketch
+
+# Mean/variance and quantiles of one measured quantity.
+class StreamAggregator(object):
+
+    def __init__(self, alpha=0.01):
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch(alpha)
+
+    def add(self, x):
+        self.stats.add(x)
+        self.sketch.add(x)
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def mean(self):
+        return self.stats.mean
+
+    def stdev(self):
+        return self.stats.stdev()
+
+    def quantile(self, q):
+        # The sketch is accurate relative to the value; the exact extremes bound it.
+        if self.stats.count == 0:
+            return math.nan
+        return min(max(self.sketch.quantile(q), self.stats.min), self.stats.max)
+
+    def summary(self):
+        return {
+            'count': self.stats.count,
+            'mean': self.stats.mean,
+            'stdev': self.stats.stdev(),
+            'min': self.stats.min,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'max': self.stats.max,
+        }
+
+    def to_dict(self):
+        return {'stats': self.stats.to_dict(), 'sketch': self.sketch.to_dict()}
+
+    @staticmethod
+    def from_dict(d):
+        aggregator = StreamAggregator(d['sketch']['alpha'])
+        aggregator.stats = RunningStats.from_dict(d['stats'])
+        aggregator.sketch = QuantileSketch.from_dict(d['sketch'])
+        return aggregator
+
+# Aggregates of K independently seeded task sets of one configuration.
+# The variance is split into a between-set part (spread of the set means) and a
+# within-set part (pooled run-to-run variance), as in a one-way random effects model.
+class ReplicatedStats(object):
+
+    def __init__(self):
+        self.sets = []
+
+    # Sets without samples (e.g. every run of them was censored) are left out
+    def add_set(self, aggregator):
+        if aggregator.stats.count > 0:
+            self.sets.append(aggregator)
+
+    def num_sets(self):
+        return len(self.sets)
+
+    # All samples of every set merged into one aggregator
+    def pooled(self):
+        pooled = StreamAggregator(self.sets[0].sketch.alpha) if len(self.sets) > 0 else StreamAggregator()
+        for aggregator in self.sets:
+            pooled.merge(aggregator)
+        return pooled
+
+    # Every task set weighs the same, regardless of its number of iterations
+    def mean(self):
+        if len(self.sets) == 0:
+            return math.nan
+        return sum(a.mean() for a in self.sets) / len(self.sets)
+
+    def between_variance(self):
+        if len(self.sets) < 2:
+            return 0.0
+        mean = self.mean()
+        return sum((a.mean() - mean) ** 2 for a in self.sets) / (len(self.sets) - 1)
+
+    def within_variance(self):
+        dof = sum(a.stats.count - 1 for a in self.sets if a.stats.count > 1)
+        return sum(a.stats.m2 for a in self.sets) / dof if dof > 0 else 0.0
+
+    def quantile(self, q):
+        return self.pooled().quantile(q)
+
+    # Confidence interval (low, high) of the mean: over the task set means when there are
+    # several task sets, otherwise over the runs of the one set (Student's t).
+    def confidence_interval(self, level=0.95):
+        from scipy.stats import t
+
+        mean = self.mean()
+        if self.num_sets() > 1:
+            n, variance = self.num_sets(), self.between_variance()
+        else:
+            n, variance = self.pooled().stats.count, self.within_variance()
+        if n < 2 or math.isnan(mean):
+            return mean, mean
+        half = t.ppf(0.5 + level / 2, n - 1) * math.sqrt(variance / n)
+        return mean - half, mean + half
@@ -0,0 +1,116 @@
+# Agent
+# Worker agent of a distributed sweep (see runners/Coordinator.py): connects to the
+# coordinator, advertises its cores, and for every job generates the LF file of one
+# (config, seed, scheduler, workers), builds it and runs it, uploading the samples.
+# Binaries are cached per agent by a hash of the program, so a job retried or repeated
+# on the same agent is not built again (concurrent jobs of one program wait for the first
+# build instead of building into the same directory). Heartbeats are sent from their own thread.
+
+import os
+import socket
+import shutil
+import hashlib
+import threading
+
+from TasksetGenerator import TasksetGenerator
+from runners.LFRunner import LFRunner
+from runners.Coordinator import send_message, receive_message
+
+class Agent(object):
+
+    def __init__(self):
+        self.config = {
+            'host': '127.0.0.1',
+            'port': 7000,
+            'name': f'{socket.gethostname()}-{os.getpid()}',
+            'cores': os.cpu_count() or 1,
+            # Seconds between two heartbeats
+            'heartbeat': 2.0,
+            'templateDir': 'templates',
+            'workDir': '.agent',
+        }
+        self.runner = LFRunner()
+        self.stopped = threading.Event()
+        # {program hash: Lock} guarding the build of each cached program
+        self.build_locks = {}
+        self.lock = threading.Lock()
+
+    def setConfig(self, config):
+        for key, value in config.items():
+            if key in self.config.keys():
+                self.config[key] = value
+
+    # Serve jobs until the coordinator shuts the agent down or the connection drops.
+    def run(self):
+        connection = socket.create_connection((self.config['host'], self.config['port']))
+        rfile = connection.makefile('rb')
+        self.wfile = connection.makefile('wb')
+        self.send_lock = threading.Lock()
+        send_message(self.wfile, self.send_lock, {'type': 'hello', 'name': self.config['name'], 'cores': self.config['cores']})
+        print(f"Agent {self.config['name']} connected to {self.config['host']}:{self.config['port']} with {self.config['cores']} cores")
+
+        threading.Thread(target=self.heartbeat, daemon=True).start()
+        try:
+            while True:
+                message = receive_message(rfile)
+                if message == None or message['type'] == 'shutdown':
+                    break
+                if message['type'] == 'job':
+                    threading.Thread(target=self.serve_job, args=(message['job'], message['payload']), daemon=True).start()
+        except (OSError, ValueError) as err:
+            print(f"Lost the coordinator: {err}")
+        finally:
+            self.stopped.set()
+            self.runner.cancel()
+            connection.close()
+
+    def heartbeat(self):
+        while not self.stopped.wait(self.config['heartbeat']):
+            try:
+                send_message(self.wfile, self.send_lock, {'type': 'heartbeat'})
+            except OSError:
+                return
+
+    def serve_job(self, id, payload):
+        try:
+            message = dict(self.execute(payload), type='result', job=id)
+        except Exception as err:
+            message = {'type': 'result', 'job': id, 'error': f'{type(err).__name__}: {err}'}
+        try:
+            send_message(self.wfile, self.send_lock, message)
+        except OSError:
+            pass
+
+    # payload: {'config', 'template', 'scheduler', 'workers', 'num_iteration'} (other keys are ignored)
+    def execute(self, payload):
+        generator = TasksetGenerator()
+        generator.setConfig(payload['config'])
+        # Only the file of this job: same name and contents as in the full task set
+        generator.setConfig({'schedulers': [payload['scheduler']], 'min_workers': payload['workers'], 'max_workers': payload['workers']})
+        # LFRunner builds and runs in LF_PATH, so the sources and binaries need absolute paths
+        workDir = os.path.abspath(self.config['workDir'])
+        outputDir = os.path.join(workDir, self.config['name'], 'generated', str(threading.get_ident()), 'src')
+        dataset = generator.makeLF(templateDir=self.config['templateDir'], outputDir=outputDir, template_path=payload['template'])
+        filepath = dataset['schedulers'][payload['scheduler']][0]
+
+        with open(filepath, 'rb') as f:
+            contents = f.read()
+        name = os.path.basename(filepath)
+        program = hashlib.sha256(name.encode('utf-8') + b'\0' + contents).hexdigest()[:16]
+
+        source = os.path.join(workDir, self.config['name'], 'builds', program, 'src', name)
+        binpath = self.runner.binary_path(source)
+        usage = {}
+        with self.lock:
+            build_lock = self.build_locks.setdefault(program, threading.Lock())
+        with build_lock:
+            if not os.path.isfile(binpath):
+                os.makedirs(os.path.dirname(source), exist_ok=True)
+                shutil.copyfile(filepath, source)
+                binpath, usage = self.runner.build(source)
+
+        samples = []
+        for _ in range(payload['num_iteration']):
+            exe_time, deadline_miss, censored, _ = self.runner.run(binpath)
+            samples.append([exe_time, deadline_miss, censored])
+        return {'program': program, 'samples': samples, 'build_usage': usage}
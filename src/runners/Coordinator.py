@@ -0,0 +1,238 @@
+# Coordinator
+# Hands measurement jobs to worker agents (runners/Agent.py) on other machines over TCP.
+# A job is one (task set config, seed, scheduler, workers): the agent generates that LF file,
+# builds it and runs it num_iteration times, then uploads the samples.
+# Messages are JSON objects, one per line:
+#   agent -> coordinator: hello {name, cores}, heartbeat, result {job, program, samples, build_usage} or {job, error}
+#   coordinator -> agent: job {job, payload}, shutdown
+# Agents advertise their cores; a job takes as many cores as it has LF workers (all the
+# agent's cores if it has fewer), so worker-count scans get their cores to themselves,
+# and the largest jobs are placed first, on the idlest agent. Jobs of agents that fail or
+# stop sending heartbeats are retried elsewhere, up to 'max_retries' times.
+
+import json
+import time
+import socket
+import threading
+import socketserver
+
+def send_message(file, lock, message):
+    data = (json.dumps(message) + '\n').encode('utf-8')
+    with lock:
+        file.write(data)
+        file.flush()
+
+# Next message, or None once the connection is closed
+def receive_message(file):
+    line = file.readline()
+    if not line:
+        return None
+    return json.loads(line.decode('utf-8'))
+
+class AgentConnection(object):
+
+    def __init__(self, name, cores, connection, wfile):
+        self.name = name
+        self.cores = cores
+        self.busy = 0
+        # Running job ids
+        self.jobs = set()
+        self.connection = connection
+        self.wfile = wfile
+        self.send_lock = threading.Lock()
+        self.last_seen = time.monotonic()
+        self.alive = True
+
+    def free(self):
+        return self.cores - self.busy
+
+class AgentHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        coordinator = self.server.coordinator
+        hello = receive_message(self.rfile)
+        if hello == None or hello.get('type') != 'hello':
+            return
+        agent = coordinator.register(hello['name'], int(hello['cores']), self.connection, self.wfile)
+        try:
+            while True:
+                message = receive_message(self.rfile)
+                if message == None:
+                    break
+                agent.last_seen = time.monotonic()
+                if message['type'] == 'result':
+                    coordinator.finish(agent, message)
+        except (OSError, ValueError) as err:
+            print(f"Lost agent {agent.name}: {err}")
+        finally:
+            coordinator.drop(agent)
+
+class CoordinatorServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class Coordinator(object):
+
+    def __init__(self):
+        self.config = {
+            'host': '127.0.0.1',
+            # 0: any free port (see self.port after start())
+            'port': 0,
+            # Seconds without a message before an agent is considered lost
+            'heartbeat_timeout': 10.0,
+            # Times a job is retried after a failure or a lost agent
+            'max_retries': 2,
+        }
+        self.lock = threading.Condition()
+        # {id: {'id', 'payload', 'cores', 'attempts', 'state', 'agent', 'result', 'error'}}
+        self.jobs = {}
+        self.pending = []
+        self.agents = {}
+        self.server = None
+        self.port = None
+        # fn(job) called, outside the lock, with every job that finished successfully;
+        # the job fails if it raises
+        self.on_result = None
+
+    def setConfig(self, config):
+        for key, value in config.items():
+            if key in self.config.keys():
+                self.config[key] = value
+
+    # payload is sent to the agent as is; returns the job id.
+    def add_job(self, payload, cores):
+        with self.lock:
+            id = len(self.jobs)
+            self.jobs[id] = {'id': id, 'payload': payload, 'cores': max(int(cores), 1), 'attempts': 0,
+                             'state': 'pending', 'agent': None, 'result': None, 'error': None}
+            self.pending.append(id)
+            self.dispatch()
+        return id
+
+    def start(self):
+        self.server = CoordinatorServer((self.config['host'], self.config['port']), AgentHandler)
+        self.server.coordinator = self
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        threading.Thread(target=self.monitor, daemon=True).start()
+        print(f"Coordinator listening on {self.config['host']}:{self.port}")
+        return self.port
+
+    # Block until every job is done or failed; returns the jobs.
+    def wait(self):
+        with self.lock:
+            while any(job['state'] not in ['done', 'failed'] for job in self.jobs.values()):
+                self.lock.wait(1.0)
+            return self.jobs
+
+    # Tell the agents to exit and stop listening.
+    def stop(self):
+        with self.lock:
+            agents = list(self.agents.values())
+        for agent in agents:
+            try:
+                send_message(agent.wfile, agent.send_lock, {'type': 'shutdown'})
+            except OSError:
+                pass
+        if self.server != None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def register(self, name, cores, connection, wfile):
+        agent = AgentConnection(name, cores, connection, wfile)
+        with self.lock:
+            if name in self.agents:
+                raise RuntimeError("Duplicate agent name: " + name)
+            self.agents[name] = agent
+            print(f"Agent {name} joined with {cores} cores")
+            self.dispatch()
+        return agent
+
+    # Requeue the jobs of an agent that left or went silent
+    def drop(self, agent):
+        with self.lock:
+            if not agent.alive:
+                return
+            agent.alive = False
+            self.agents.pop(agent.name, None)
+            print(f"Agent {agent.name} left ({len(agent.jobs)} jobs in flight)")
+            for id in list(agent.jobs):
+                self.retry(self.jobs[id], f"agent {agent.name} lost")
+            agent.jobs.clear()
+            self.dispatch()
+            self.lock.notify_all()
+        try:
+            # A silent agent learns that it was dropped; it has to join again
+            agent.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def finish(self, agent, message):
+        with self.lock:
+            job = self.jobs[message['job']]
+            if message['job'] not in agent.jobs:
+                # Already given up on this agent and retried elsewhere
+                return
+            agent.jobs.discard(job['id'])
+            agent.busy -= min(job['cores'], agent.cores)
+            if 'error' in message:
+                self.retry(job, f"{agent.name}: {message['error']}")
+            else:
+                job['result'] = message
+            self.dispatch()
+        if 'error' not in message:
+            # The job ends either way, so that wait() returns even when recording it fails
+            state = 'done'
+            try:
+                if self.on_result != None:
+                    self.on_result(job)
+            except Exception as err:
+                state = 'failed'
+                job['error'] = f"result not recorded: {err}"
+                print(f"Job {job['id']} failed: {job['error']}")
+            with self.lock:
+                job['state'] = state
+                self.lock.notify_all()
+
+    # Called with the lock held
+    def retry(self, job, error):
+        job['error'] = error
+        if job['attempts'] > self.config['max_retries']:
+            job['state'] = 'failed'
+            print(f"Job {job['id']} failed after {job['attempts']} attempts: {error}")
+        else:
+            job['state'] = 'pending'
+            self.pending.append(job['id'])
+            print(f"Retrying job {job['id']}: {error}")
+
+    # Place pending jobs, largest first, on the agent with the most free cores.
+    # Called with the lock held.
+    def dispatch(self):
+        self.pending.sort(key=lambda id: -self.jobs[id]['cores'])
+        for id in list(self.pending):
+            job = self.jobs[id]
+            candidates = [a for a in self.agents.values() if a.alive and a.free() >= min(job['cores'], a.cores)]
+            if len(candidates) == 0:
+                continue
+            agent = max(candidates, key=lambda a: a.free())
+            try:
+                send_message(agent.wfile, agent.send_lock, {'type': 'job', 'job': id, 'payload': job['payload']})
+            except OSError:
+                # The handler thread of the agent drops it
+                continue
+            self.pending.remove(id)
+            job['state'] = 'running'
+            job['agent'] = agent.name
+            job['attempts'] += 1
+            agent.jobs.add(id)
+            agent.busy += min(job['cores'], agent.cores)
+
+    def monitor(self):
+        while True:
+            time.sleep(self.config['heartbeat_timeout'] / 4)
+            with self.lock:
+                now = time.monotonic()
+                silent = [a for a in self.agents.values() if now - a.last_seen > self.config['heartbeat_timeout']]
+            for agent in silent:
+                print(f"No heartbeat from agent {agent.name}")
+                self.drop(agent)
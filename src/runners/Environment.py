@@ -0,0 +1,69 @@
+# Environment
+# Checks whether the machine is quiet enough to measure on during an interleaved measurement
+# (see LFRunner): the 1-minute load average of /proc/loadavg before every run, and the CPU
+# frequency governors of /sys/devices/system/cpu/cpu*/cpufreq once before the measurement.
+# A governor that scales the frequency (powersave, ondemand, schedutil, ...) makes run times
+# depend on what ran before; waiting does not change it, so it is only reported.
+# Checks whose source does not exist (e.g. no cpufreq in a VM) are skipped.
+
+import os
+import glob
+
+class EnvironmentCheck(object):
+
+    def __init__(self):
+        self.config = {
+            # Highest acceptable 1-minute load average; None: the number of CPUs
+            'max_load': None,
+            # Acceptable governors; None or []: any
+            'governors': ['performance'],
+        }
+
+    def setConfig(self, config):
+        for key, value in config.items():
+            if key in self.config.keys():
+                self.config[key] = value
+
+    def max_load(self):
+        return self.config['max_load'] if self.config['max_load'] != None else float(os.cpu_count() or 1)
+
+    @staticmethod
+    def load():
+        try:
+            with open('/proc/loadavg') as f:
+                return float(f.read().split()[0])
+        except (OSError, ValueError, IndexError):
+            return None
+
+    # {governor: number of CPUs using it}
+    @staticmethod
+    def governors():
+        governors = {}
+        for path in glob.glob('/sys/devices/system/cpu/cpu[0-9]*/cpufreq/scaling_governor'):
+            try:
+                with open(path) as f:
+                    governor = f.read().strip()
+            except OSError:
+                continue
+            governors[governor] = governors.get(governor, 0) + 1
+        return governors
+
+    # Load beyond max_load; in_flight: runs of the measurement itself that are running now,
+    # which the load average counts too. [] when the load is fine.
+    def load_problems(self, in_flight=0):
+        load = self.load()
+        if load != None and load - in_flight > self.max_load():
+            return [f'load average {load:.2f} - {in_flight} runs in flight > {self.max_load():g}']
+        return []
+
+    def governor_problems(self):
+        problems = []
+        if self.config['governors']:
+            for governor, cpus in sorted(self.governors().items()):
+                if governor not in self.config['governors']:
+                    problems.append(f'{cpus} CPUs with governor {governor}')
+        return problems
+
+    # Reasons the machine is not fit to measure on; [] when it is.
+    def problems(self, in_flight=0):
+        return self.load_problems(in_flight) + self.governor_problems()
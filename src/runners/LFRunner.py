@@ -0,0 +1,605 @@
+# LF Runner
+# Builds generated LF files with the Lingua Franca compiler and runs the binaries.
+# Jobs can be fanned out over a shared pool of threads (each job is a subprocess).
+# A dataset is the dict returned by makeLF: {'workers': [...], 'schedulers': {name: [files]}}.
+# With stop conditions, runs are watched and killed as soon as their outcome is decided;
+# such runs are reported as censored (elapsed wall time and misses seen so far); their
+# wall time is a lower bound, so it is kept out of the execution time statistics.
+# Every build and run is reaped with wait4 to record its resource usage (see ResourceUsage).
+# cancel() kills the builds and runs in flight and makes the pending ones raise Cancelled.
+# Progress is published on self.events (see RunnerEvents) while a measurement is going on.
+# Every run is given a file for the summary the program writes at shutdown (see RunSummary);
+# its totals are recorded with the resource usage of the run. With 'keep_summaries', every
+# iteration's summary (with the per-task counters) is kept as <root>/summaries/<name>_<iteration>.json.
+# Task sets generated with 'tracing' write <name>.lft into the working directory of the run;
+# with the 'tracing' option, every iteration's trace is kept as <root>/traces/<name>_<iteration>.lft.
+# With 'interleave', every binary is built (and warmed up) first, then all (scheduler, worker,
+# iteration) runs are executed in a random order, so that drift of the machine over time does
+# not favour the configurations measured first. The 'environment' (see Environment) reports the
+# governors once and checks the load before each run; runs facing too much load are re-queued,
+# up to 'max_requeues' times, after which they are run and counted as noisy.
+
+import os
+import time
+import queue
+import random
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from results.StreamingStats import StreamAggregator, ReplicatedStats
+from runners.ResourceUsage import MonitoredProcess
+from runners.RunnerEvents import EventBus
+from runners.RunSummary import SUMMARY_ENV, read_summary, summary_metrics, remove_summary, keep_summary
+from profiling.Profiler import PROFILER
+
+# Raised by builds and runs of a cancelled runner
+class Cancelled(RuntimeError):
+    pass
+
+class LFRunner(object):
+
+    def __init__(self):
+        self.config = {
+            # 'gradlew': ./gradlew runLfc, 'lfc': build/install/lf-cli/bin/lfc
+            'compiler': 'gradlew',
+            'jobs': 1,
+            'verbose': False,
+            # Stop conditions (None: disabled)
+            # Kill a run once its deadline misses exceed this number
+            'max_deadline_misses': None,
+            # Kill a run once it is this many percent slower than the best finished
+            # scheduler of the same task set and number of workers
+            'max_slowdown': None,
+            # Sample /proc/<pid>/task/*/stat for per-thread CPU time of every run
+            'sample_threads': False,
+            # Run binaries in their own bin directory and keep the LF trace of every iteration
+            'tracing': False,
+            # Keep the summary (per-task counters) of every iteration next to the bin directory
+            'keep_summaries': False,
+            # Expected seconds of a measure_datasets job, fn(k, scheduler, worker, filepath);
+            # when set, the longest jobs start first (see sweeps/CostEstimator.py)
+            'job_cost': None,
+            # Interleaved measurement (see measure_interleaved): discarded warmup runs per
+            # binary, then every run in an order shuffled with 'shuffle_seed' (None: random)
+            'interleave': False,
+            'warmup': 0,
+            'shuffle_seed': None,
+            # EnvironmentCheck of interleaved runs (None: no checks); runs about to start under
+            # too much load are re-queued up to 'max_requeues' times, then run and kept as noisy
+            'environment': None,
+            'max_requeues': 3,
+            # Seconds to wait before retrying a run that failed the check before it
+            'settle_time': 5.0,
+        }
+        # Best wall-clock time of finished runs per comparison key
+        self.best_times = {}
+        self.lock = threading.Lock()
+        # Subprocesses in flight, killed by cancel()
+        self.processes = set()
+        self.cancelled = threading.Event()
+        # Builds, runs and finished jobs of measure_datasets, published from the job threads
+        self.events = EventBus()
+
+    def setConfig(self, config):
+        for key, value in config.items():
+            if key in self.config.keys():
+                self.config[key] = value
+
+    def lf_path(self):
+        LF_PATH = os.getenv("LF_PATH")
+        if LF_PATH == None:
+            raise RuntimeError("Set the environment variable LF_PATH to the path where Lingua Franca is installed")
+        return LF_PATH
+
+    # LF puts the binary of <root>/src/<name>.lf at <root>/bin/<name>
+    def binary_path(self, filepath):
+        filename = os.path.basename(filepath).split('.')[0]
+        root = os.path.dirname(os.path.dirname(os.path.normpath(filepath)))
+        return os.path.join(root, 'bin', filename)
+
+    def cancel(self):
+        self.cancelled.set()
+        with self.lock:
+            processes = list(self.processes)
+        for process in processes:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+
+    def check_cancelled(self):
+        if self.cancelled.is_set():
+            raise Cancelled("Cancelled")
+
+    # Start a subprocess that cancel() can kill; release it with self.processes.discard.
+    def spawn(self, command, **kwargs):
+        self.check_cancelled()
+        process = MonitoredProcess(command, **kwargs)
+        with self.lock:
+            self.processes.add(process)
+        if self.cancelled.is_set():
+            # cancel() may have run between the check and the registration
+            process.kill()
+        return process
+
+    def release(self, process):
+        with self.lock:
+            self.processes.discard(process)
+        self.check_cancelled()
+
+    # LF writes the trace of a program to <name>.lft in the working directory of the run
+    def run_dir(self, binpath):
+        return os.path.dirname(binpath) if self.config['tracing'] else self.lf_path()
+
+    # Move the trace of the last run of binpath to <root>/traces/<name>_<iteration>.lft.
+    def collect_trace(self, binpath, iteration):
+        trace = binpath + '.lft'
+        if not os.path.isfile(trace):
+            print(f"No trace found (was the task set generated with tracing?): {trace}")
+            return None
+        trace_dir = os.path.join(os.path.dirname(os.path.dirname(binpath)), 'traces')
+        os.makedirs(trace_dir, exist_ok=True)
+        path = os.path.join(trace_dir, f'{os.path.basename(binpath)}_{iteration}.lft')
+        os.replace(trace, path)
+        return path
+
+    def build(self, filepath):
+        LF_PATH = self.lf_path()
+        if not os.path.isfile(filepath):
+            raise RuntimeError("No LF file: " + filepath)
+
+        if self.config['compiler'] == 'lfc':
+            command = ['build/install/lf-cli/bin/lfc', filepath]
+            success_line = "Code generation finished"
+        else:
+            command = ['./gradlew', 'runLfc', '--args', filepath]
+            success_line = "BUILD SUCCESSFUL"
+
+        # With gradlew, the compilation happens in the Gradle daemon and is not part of the usage
+        with PROFILER.stage('build', file=filepath):
+            process = self.spawn(command, cwd=LF_PATH)
+            stdout, stderr, usage = process.communicate()
+            self.release(process)
+        stdout = stdout.decode("utf-8")
+        if self.config['verbose']:
+            print(stdout)
+
+        built_success = False
+        for line in reversed(stdout.split("\n")):
+            if line.startswith(success_line):
+                built_success = True
+                break
+
+        if not built_success:
+            print(stderr.decode("utf-8"))
+            raise RuntimeError("Failed to build: " + filepath)
+
+        print(f"Built Successfully: {filepath}")
+        return self.binary_path(filepath), usage
+
+    # Returns (exe_time, deadline_miss, censored, resource usage).
+    # key identifies the runs compared by 'max_slowdown', e.g. (task set, workers).
+    # keep_summary_as: path the summary of the run is moved to (None: it is removed).
+    def run(self, binpath, key=None, keep_summary_as=None):
+        if self.config['max_deadline_misses'] != None or self.config['max_slowdown'] != None:
+            return self.run_watched(binpath, key, keep_summary_as)
+
+        summary_path = self.summary_path()
+        try:
+            process = self.spawn([binpath], cwd=self.run_dir(binpath), capture_stderr=False,
+                                 sample_threads=self.config['sample_threads'], env={SUMMARY_ENV: summary_path})
+            stdout, _, usage = process.communicate()
+            self.release(process)
+            self.update_best_time(key, usage['wall_time'])
+            stdout = stdout.decode("utf-8")
+            if self.config['verbose']:
+                print('Raw output: \n' + stdout)
+            return self.parse_output(stdout, summary_path, usage) + (False, usage)
+        finally:
+            self.release_summary(summary_path, keep_summary_as)
+
+    # A new, empty file for the summary of one run (see RunSummary)
+    @staticmethod
+    def summary_path():
+        fd, path = tempfile.mkstemp(prefix='lf_summary_', suffix='.json')
+        os.close(fd)
+        return path
+
+    def release_summary(self, summary_path, keep_summary_as):
+        if keep_summary_as != None:
+            keep_summary(summary_path, keep_summary_as)
+        else:
+            remove_summary(summary_path)
+
+    # <root>/summaries/<name>_<iteration>.json of a run of binpath
+    def summary_destination(self, binpath, iteration):
+        summary_dir = os.path.join(os.path.dirname(os.path.dirname(binpath)), 'summaries')
+        return os.path.join(summary_dir, f'{os.path.basename(binpath)}_{iteration}.json')
+
+    def update_best_time(self, key, elapsed):
+        if key == None:
+            return
+        with self.lock:
+            self.best_times[key] = min(self.best_times.get(key, elapsed), elapsed)
+
+    def time_limit(self, key):
+        if self.config['max_slowdown'] == None or key == None:
+            return None
+        with self.lock:
+            best = self.best_times.get(key)
+        return None if best == None else best * (1 + self.config['max_slowdown'] / 100.0)
+
+    # Follow the child's stdout and kill it once a stop condition fires.
+    # The templates print '---- Deadline miss progress: <n>' whenever a deadline is missed.
+    def run_watched(self, binpath, key, keep_summary_as=None):
+        summary_path = self.summary_path()
+        try:
+            return self.watch(binpath, key, summary_path)
+        finally:
+            self.release_summary(summary_path, keep_summary_as)
+
+    def watch(self, binpath, key, summary_path):
+        process = self.spawn([binpath], cwd=self.run_dir(binpath), capture_stderr=False,
+                             sample_threads=self.config['sample_threads'], env={SUMMARY_ENV: summary_path})
+        lines = queue.Queue()
+
+        def read():
+            try:
+                for line in process.stdout:
+                    lines.put(line.decode("utf-8", "replace"))
+            except (OSError, ValueError):
+                # stdout is closed once the killed process is reaped
+                pass
+            lines.put(None)
+        threading.Thread(target=read, daemon=True).start()
+
+        start = time.monotonic()
+        limit = self.time_limit(key)
+        # Only the tail is needed to parse the final summary
+        tail = deque(maxlen=64)
+        misses = 0
+        reason = None
+        while True:
+            try:
+                line = lines.get(timeout=0.05)
+            except queue.Empty:
+                line = ''
+            if line == None:
+                break
+            if line.startswith("---- Deadline miss progress:"):
+                misses = max(misses, int(line.split(' ')[-1]))
+            elif len(line) > 0:
+                tail.append(line)
+
+            if self.config['max_deadline_misses'] != None and misses > self.config['max_deadline_misses']:
+                reason = f'{misses} deadline misses'
+            elif limit != None and time.monotonic() - start > limit:
+                reason = f'slower than {limit:.3f} sec'
+            if reason != None:
+                process.kill()
+                break
+
+        usage = process.wait()
+        self.release(process)
+        elapsed = time.monotonic() - start
+        if reason != None:
+            print(f"Stopped early ({reason}): {binpath}")
+            return elapsed, misses, True, usage
+
+        self.update_best_time(key, elapsed)
+        stdout = ''.join(tail)
+        if self.config['verbose']:
+            print('Raw output (tail): \n' + stdout)
+        return self.parse_output(stdout, summary_path, usage) + (False, usage)
+
+    # (exe_time, deadline_miss) of a run: from the summary the program wrote (its totals are
+    # added to usage), or from the end of its stdout when there is none.
+    def parse_output(self, stdout, summary_path=None, usage=None):
+        with PROFILER.stage('parse'):
+            summary = read_summary(summary_path) if summary_path != None else None
+            if summary == None:
+                return self.parse_lines(stdout)
+            if usage != None:
+                usage.update(summary_metrics(summary))
+            exe_time = summary['elapsed_physical'] / 1000000000
+            print('Total physical execution time: ' + str(exe_time))
+            return exe_time, summary['deadline_miss']
+
+    def parse_lines(self, stdout):
+        exe_time = None
+        deadline_miss = None
+        for line in reversed(stdout.split("\n")):
+            if line.startswith("---- Elapsed physical"):
+                exe_time = line.split(' ')[-1]
+            if line.startswith("---- Deadline miss:"):
+                deadline_miss = int(line.split(' ')[-1])
+                break
+
+        if exe_time == None or deadline_miss == None:
+            raise RuntimeError("Failed to parse the output of LF program")
+
+        exe_time = int(exe_time.replace(',', '')) / 1000000000
+        print('Total physical execution time: ' + str(exe_time))
+        return exe_time, deadline_miss
+
+    def run_single_LF(self, filepath):
+        return self.run(self.build(filepath)[0])
+
+    # Build once, then run num_iteration times.
+    def run_iterations(self, filepath, num_iteration):
+        binpath, _ = self.build(filepath)
+        return [self.run(binpath) for _ in range(int(num_iteration))]
+
+    # Apply fn to every item through a pool of self.config['jobs'] workers, keeping order.
+    def map(self, fn, items):
+        items = list(items)
+        if int(self.config['jobs']) <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=int(self.config['jobs'])) as pool:
+            return list(pool.map(fn, items))
+
+    # One job per (dataset, scheduler, worker): build once, then run num_iteration times.
+    # With a ResultStore, iterations already recorded under config_hashes[k] are not run again.
+    # Returns one dict per job, in job order: aggregators of 'exe_time', 'deadline_miss' and of
+    # every run 'resources' metric, the build usage, the number of censored runs and of runs
+    # kept although the environment was noisy (see measure_interleaved).
+    def measure_datasets(self, datasets, num_iteration, store=None, config_hashes=None):
+        jobs = []
+        for k, dataset in enumerate(datasets):
+            for scheduler, files in dataset['schedulers'].items():
+                for worker, filepath in zip(dataset['workers'], files):
+                    jobs.append((k, scheduler, worker, filepath))
+
+        # One step per build and per iteration; skipped ones count as done
+        total = len(jobs) * (int(num_iteration) + 1)
+        done = [0]
+        def step():
+            with self.lock:
+                done[0] += 1
+                return done[0]
+
+        def measure(job):
+            k, scheduler, worker, filepath = job
+            result = self.new_result(job)
+            point = {'k': k, 'scheduler': scheduler, 'workers': worker, 'file': filepath}
+            binpath = None
+            for iteration in range(int(num_iteration)):
+                sample = store.get(config_hashes[k], scheduler, worker, iteration) if store != None else None
+                stored = sample != None
+                if stored:
+                    print(f"Skipped (already measured): {filepath} #{iteration}")
+                    usage = store.get_resources(config_hashes[k], scheduler, worker, iteration, 'run')
+                else:
+                    if binpath == None:
+                        binpath = self.build_job(job, result, iteration, store, config_hashes, step, total)
+                    sample, usage = self.measure_run(job, binpath, iteration, store, config_hashes)
+                self.add_sample(result, sample, usage)
+                self.events.publish('run_finished', iteration=iteration, exe_time=sample[0], deadline_miss=sample[1],
+                                    censored=bool(sample[2]), stored=stored, usage=usage, done=step(), total=total, **point)
+            if binpath == None:
+                self.events.publish('build_skipped', done=step(), total=total, **point)
+            self.publish_aggregated(job, result)
+            return result
+
+        # The pool starts jobs in the order they are given; results are returned in job order
+        order = list(range(len(jobs)))
+        if self.config['job_cost'] != None:
+            order.sort(key=lambda i: -self.config['job_cost'](*jobs[i]))
+
+        self.events.publish('measure_started', jobs=len(jobs), total=total)
+        completed = False
+        try:
+            if self.config['interleave']:
+                results = self.measure_interleaved(jobs, order, int(num_iteration), store, config_hashes, step, total)
+            else:
+                results = [None] * len(jobs)
+                for i, result in zip(order, self.map(measure, [jobs[i] for i in order])):
+                    results[i] = result
+            completed = True
+        finally:
+            self.events.publish('measure_finished', jobs=len(jobs), completed=completed)
+        return results
+
+    def new_result(self, job):
+        k, scheduler, worker, _ = job
+        return {
+            'k': k,
+            'scheduler': scheduler,
+            'workers': worker,
+            'exe_time': StreamAggregator(),
+            'deadline_miss': StreamAggregator(),
+            'censored': 0,
+            'noisy': 0,
+            'resources': {},
+            'build_resources': {},
+        }
+
+    def add_sample(self, result, sample, usage):
+        if not sample[2]:
+            result['exe_time'].add(sample[0])
+        result['deadline_miss'].add(sample[1])
+        result['censored'] += int(sample[2])
+        for metric, value in usage.items():
+            result['resources'].setdefault(metric, StreamAggregator()).add(value)
+
+    # Build the file of a job; its usage is stored with the first iteration it is built for.
+    def build_job(self, job, result, iteration, store, config_hashes, step, total):
+        k, scheduler, worker, filepath = job
+        point = {'k': k, 'scheduler': scheduler, 'workers': worker, 'file': filepath}
+        self.events.publish('build_started', **point)
+        binpath, result['build_resources'] = self.build(filepath)
+        if store != None:
+            store.record_resources(config_hashes[k], scheduler, worker, iteration, 'build', result['build_resources'])
+        self.events.publish('build_finished', binary=binpath, usage=result['build_resources'],
+                            done=step(), total=total, **point)
+        return binpath
+
+    # Run one iteration of a job and store it; returns ((exe_time, deadline_miss, censored), usage).
+    def measure_run(self, job, binpath, iteration, store, config_hashes):
+        k, scheduler, worker, _ = job
+        with PROFILER.stage('run', file=binpath, iteration=iteration):
+            keep_summary_as = self.summary_destination(binpath, iteration) if self.config['keep_summaries'] else None
+            exe_time, deadline_miss, censored, usage = self.run(binpath, key=(k, worker), keep_summary_as=keep_summary_as)
+        if self.config['tracing']:
+            self.collect_trace(binpath, iteration)
+        if store != None:
+            store.record(config_hashes[k], scheduler, worker, iteration, exe_time, deadline_miss, censored)
+            store.record_resources(config_hashes[k], scheduler, worker, iteration, 'run', usage)
+        return (exe_time, deadline_miss, censored), usage
+
+    def publish_aggregated(self, job, result):
+        k, scheduler, worker, filepath = job
+        self.events.publish('point_aggregated', exe_time=result['exe_time'].summary(),
+                            deadline_miss=result['deadline_miss'].summary(), censored=result['censored'],
+                            result=result, k=k, scheduler=scheduler, workers=worker, file=filepath)
+
+    # Interleaved measurement: every job is built and warmed up with 'warmup' discarded runs
+    # first, then the missing (job, iteration) runs are measured in a random order, so that
+    # drift over time (heat, frequency scaling, background load) spreads over every scheduler
+    # and number of workers instead of biasing whichever is measured last. Runs of one binary
+    # never overlap. With an 'environment' check, the governors are reported once, and a run
+    # is re-queued at the end (after waiting 'settle_time') when the load is too high before
+    # it, discounting the other runs in flight, at most 'max_requeues' times; then it is run
+    # and counted as noisy.
+    def measure_interleaved(self, jobs, order, num_iteration, store, config_hashes, step, total):
+        results = [self.new_result(job) for job in jobs]
+        runs = []
+        for i, (k, scheduler, worker, filepath) in enumerate(jobs):
+            for iteration in range(num_iteration):
+                sample = store.get(config_hashes[k], scheduler, worker, iteration) if store != None else None
+                if sample == None:
+                    runs.append((i, iteration))
+                    continue
+                print(f"Skipped (already measured): {filepath} #{iteration}")
+                usage = store.get_resources(config_hashes[k], scheduler, worker, iteration, 'run')
+                self.add_sample(results[i], sample, usage)
+                self.events.publish('run_finished', iteration=iteration, exe_time=sample[0], deadline_miss=sample[1],
+                                    censored=bool(sample[2]), stored=True, usage=usage, done=step(), total=total,
+                                    k=k, scheduler=scheduler, workers=worker, file=filepath)
+
+        binaries = [None] * len(jobs)
+        def prepare(i):
+            missing = [iteration for j, iteration in runs if j == i]
+            k, scheduler, worker, filepath = jobs[i]
+            if len(missing) == 0:
+                self.events.publish('build_skipped', done=step(), total=total, k=k, scheduler=scheduler, workers=worker, file=filepath)
+                return
+            binaries[i] = self.build_job(jobs[i], results[i], missing[0], store, config_hashes, step, total)
+            for _ in range(int(self.config['warmup'])):
+                with PROFILER.stage('warmup', file=binaries[i]):
+                    self.run(binaries[i])
+        self.map(prepare, order)
+
+        environment = self.config['environment']
+        if environment != None:
+            for problem in environment.governor_problems():
+                print(f"Warning: {problem}; run times depend on the frequency the CPUs are at")
+
+        random.Random(self.config['shuffle_seed']).shuffle(runs)
+        pending = deque((i, iteration, 0) for i, iteration in runs)
+        busy = set()
+        failed = []
+        condition = threading.Condition()
+
+        # The next run whose binary is not running, or None once everything is measured
+        def next_run():
+            with condition:
+                while len(failed) == 0:
+                    if len(pending) == 0 and len(busy) == 0:
+                        return None
+                    for n, run in enumerate(pending):
+                        if run[0] not in busy:
+                            del pending[n]
+                            busy.add(run[0])
+                            return run
+                    condition.wait()
+                return None
+
+        def finish(i, requeue=None):
+            with condition:
+                busy.discard(i)
+                if requeue != None:
+                    pending.append(requeue)
+                condition.notify_all()
+
+        # Load problems before a run; the run itself is in busy but not started yet
+        def check(i, iteration, requeues):
+            if environment == None:
+                return []
+            with condition:
+                in_flight = len(busy) - 1
+            problems = environment.load_problems(in_flight)
+            if len(problems) > 0 and requeues < self.config['max_requeues']:
+                print(f"Re-queued ({', '.join(problems)}): {jobs[i][3]} #{iteration}")
+            return problems
+
+        def worker():
+            while True:
+                run = next_run()
+                if run == None:
+                    return
+                i, iteration, requeues = run
+                requeue = None
+                try:
+                    problems = check(i, iteration, requeues)
+                    if len(problems) > 0 and requeues < self.config['max_requeues']:
+                        requeue = (i, iteration, requeues + 1)
+                        time.sleep(self.config['settle_time'])
+                        continue
+                    sample, usage = self.measure_run(jobs[i], binaries[i], iteration, None, None)
+                    self.keep_run(jobs[i], results[i], iteration, sample, usage, len(problems) > 0, requeues,
+                                  store, config_hashes, step, total)
+                except BaseException:
+                    with condition:
+                        failed.append(True)
+                    raise
+                finally:
+                    finish(i, requeue)
+
+        threads = max(int(self.config['jobs']), 1)
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            futures = [pool.submit(worker) for _ in range(threads)]
+            for future in futures:
+                future.result()
+
+        for job, result in zip(jobs, results):
+            self.publish_aggregated(job, result)
+        return results
+
+    def keep_run(self, job, result, iteration, sample, usage, noisy, requeues, store, config_hashes, step, total):
+        k, scheduler, worker, filepath = job
+        if store != None:
+            store.record(config_hashes[k], scheduler, worker, iteration, *sample)
+            store.record_resources(config_hashes[k], scheduler, worker, iteration, 'run', usage)
+        if noisy:
+            print(f"Kept after {requeues} re-queues although the environment is noisy: {filepath} #{iteration}")
+        with self.lock:
+            self.add_sample(result, sample, usage)
+            result['noisy'] += int(noisy)
+        self.events.publish('run_finished', iteration=iteration, exe_time=sample[0], deadline_miss=sample[1],
+                            censored=bool(sample[2]), stored=False, usage=usage, done=step(), total=total,
+                            requeues=requeues, noisy=noisy, k=k, scheduler=scheduler, workers=worker, file=filepath)
+
+    # Measure replicated task sets of one configuration (same workers in every dataset) and
+    # aggregate per (scheduler, worker) across sets. Returns a dict of
+    #   'exe_times', 'deadline_misses': {scheduler: [ReplicatedStats per worker]}
+    #   'censored_runs', 'noisy_runs': {scheduler: [count per worker]}
+    #   'resources': {metric: {scheduler: [ReplicatedStats per worker]}} of the runs
+    #   'build_resources': {metric: {scheduler: [StreamAggregator per worker]}} of the builds
+    def run_datasets(self, datasets, num_iteration, store=None, config_hashes=None):
+        workers = datasets[0]['workers']
+        results = {'exe_times': {}, 'deadline_misses': {}, 'censored_runs': {}, 'noisy_runs': {}, 'resources': {}, 'build_resources': {}}
+        for job in self.measure_datasets(datasets, num_iteration, store, config_hashes):
+            scheduler = job['scheduler']
+            i = workers.index(job['workers'])
+            results['exe_times'].setdefault(scheduler, [ReplicatedStats() for _ in workers])[i].add_set(job['exe_time'])
+            results['deadline_misses'].setdefault(scheduler, [ReplicatedStats() for _ in workers])[i].add_set(job['deadline_miss'])
+            results['censored_runs'].setdefault(scheduler, [0 for _ in workers])[i] += job['censored']
+            results['noisy_runs'].setdefault(scheduler, [0 for _ in workers])[i] += job['noisy']
+            for metric, aggregator in job['resources'].items():
+                results['resources'].setdefault(metric, {}).setdefault(scheduler, [ReplicatedStats() for _ in workers])[i].add_set(aggregator)
+            for metric, value in job['build_resources'].items():
+                results['build_resources'].setdefault(metric, {}).setdefault(scheduler, [StreamAggregator() for _ in workers])[i].add(value)
+        return results
@@ -0,0 +1,142 @@
+# Resource Usage
+# Runs a child process and reaps it with os.wait4 to get its rusage (user/sys CPU time,
+# voluntary/involuntary context switches, max RSS). Optionally samples
+# /proc/<pid>/task/*/stat to get the CPU time of every thread (e.g. each LF worker):
+# worker threads that burn CPU while the task set is idle show up as a high minimum.
+
+import os
+import time
+import signal
+import threading
+import subprocess
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+# Run metrics written to result CSVs, with their column names
+RESOURCE_METRICS = ['user_time', 'sys_time', 'voluntary_switches', 'involuntary_switches', 'max_rss_kb']
+RESOURCE_COLUMNS = ['user cpu time', 'system cpu time', 'voluntary context switches', 'involuntary context switches', 'max rss (KB)']
+
+# Samples the CPU time of every thread of a running process from /proc.
+class ThreadSampler(object):
+
+    def __init__(self, pid, interval=0.1):
+        self.pid = pid
+        self.interval = interval
+        self.cpu_ticks = {}
+        self.peak_rss_kb = None
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.loop, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def loop(self):
+        while not self.stopped.is_set():
+            self.sample()
+            self.stopped.wait(self.interval)
+
+    def sample(self):
+        # VmHWM belongs to the exec'd image, unlike ru_maxrss (see rusage_metrics)
+        try:
+            with open(f'/proc/{self.pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        self.peak_rss_kb = int(line.split()[1])
+        except OSError:
+            pass
+
+        task_dir = f'/proc/{self.pid}/task'
+        try:
+            tids = os.listdir(task_dir)
+        except OSError:
+            return
+        for tid in tids:
+            try:
+                with open(f'{task_dir}/{tid}/stat') as f:
+                    stat = f.read()
+            except OSError:
+                continue
+            # The command name may contain spaces; fields after it start at 'state' (field 3)
+            fields = stat[stat.rfind(')') + 2:].split(' ')
+            self.cpu_ticks[tid] = int(fields[11]) + int(fields[12])
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        metrics = {}
+        if self.peak_rss_kb != None:
+            metrics['peak_rss_kb'] = self.peak_rss_kb
+        cpu_times = sorted(ticks / CLOCK_TICKS for ticks in self.cpu_ticks.values())
+        if len(cpu_times) > 0:
+            metrics.update({
+                'threads': len(cpu_times),
+                'max_thread_cpu': cpu_times[-1],
+                'min_thread_cpu': cpu_times[0],
+                'mean_thread_cpu': sum(cpu_times) / len(cpu_times),
+            })
+        return metrics
+
+def rusage_metrics(rusage, elapsed):
+    cpu_time = rusage.ru_utime + rusage.ru_stime
+    return {
+        'user_time': rusage.ru_utime,
+        'sys_time': rusage.ru_stime,
+        'cpu_time': cpu_time,
+        'cpu_utilization': cpu_time / elapsed if elapsed > 0 else 0.0,
+        'voluntary_switches': rusage.ru_nvcsw,
+        'involuntary_switches': rusage.ru_nivcsw,
+        # Linux reports ru_maxrss in kilobytes. It starts from the RSS of the forking
+        # (Python) process, so it is a floor for small programs; 'peak_rss_kb' is exact.
+        'max_rss_kb': rusage.ru_maxrss,
+    }
+
+# A child process whose resource usage is collected when it is reaped.
+class MonitoredProcess(object):
+
+    # env: variables added to the environment of this process
+    def __init__(self, command, cwd, capture_stderr=True, sample_threads=False, env=None):
+        # In its own process group, so that kill() also stops the children (e.g. of gradlew)
+        # that would otherwise keep stdout open
+        self.process = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                        stderr=subprocess.PIPE if capture_stderr else subprocess.DEVNULL, cwd=cwd,
+                                        start_new_session=True, env=dict(os.environ, **env) if env != None else None)
+        self.start = time.monotonic()
+        self.sampler = None
+        if sample_threads:
+            self.sampler = ThreadSampler(self.process.pid)
+            self.sampler.start()
+
+    @property
+    def stdout(self):
+        return self.process.stdout
+
+    def kill(self):
+        if self.process.returncode == None:
+            os.killpg(self.process.pid, signal.SIGKILL)
+
+    # Read stdout and stderr until EOF, then reap. Returns (stdout, stderr, metrics).
+    def communicate(self):
+        stderr = []
+        reader = None
+        if self.process.stderr != None:
+            reader = threading.Thread(target=lambda: stderr.append(self.process.stderr.read()), daemon=True)
+            reader.start()
+        stdout = self.process.stdout.read()
+        if reader != None:
+            reader.join()
+        return stdout, (stderr[0] if len(stderr) > 0 else b''), self.wait()
+
+    # Reap the child with wait4 (instead of Popen.wait) to get its rusage.
+    def wait(self):
+        _, status, rusage = os.wait4(self.process.pid, 0)
+        elapsed = time.monotonic() - self.start
+        self.process.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+        for stream in [self.process.stdout, self.process.stderr]:
+            if stream != None:
+                stream.close()
+
+        metrics = rusage_metrics(rusage, elapsed)
+        metrics['wall_time'] = elapsed
+        if self.sampler != None:
+            metrics.update(self.sampler.stop())
+        return metrics
@@ -0,0 +1,50 @@
+# Run Summary
+# Machine-readable summary that the task set templates write at shutdown to the file named by
+# the LF_TASKSET_SUMMARY environment variable of the run, as one JSON object:
+#   {"version": 1, "elapsed_physical": nsec, "deadline_miss": n, "reactions_triggered": n,
+#    "tasks": [{"id": i, "releases": n, "deadline_misses": n}, ...]}
+# LFRunner reads it instead of scraping the end of stdout; programs of templates that do not
+# write it (older or custom ones) are still parsed from stdout. Only the totals are recorded
+# with the resource usage; the per-task counters stay in the summary, which the runner keeps
+# as a file of its own on request (see keep_summary).
+
+import os
+import json
+
+SUMMARY_ENV = 'LF_TASKSET_SUMMARY'
+SUMMARY_VERSION = 1
+
+# The summary in path, or None when the program did not write a (complete) one.
+def read_summary(path):
+    try:
+        with open(path) as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(summary, dict) or summary.get('version') != SUMMARY_VERSION:
+        return None
+    if 'elapsed_physical' not in summary or 'deadline_miss' not in summary:
+        return None
+    return summary
+
+# Totals of a summary as run metrics (recorded and aggregated like the resource usage)
+def summary_metrics(summary):
+    metrics = {}
+    if 'reactions_triggered' in summary:
+        metrics['reactions_triggered'] = summary['reactions_triggered']
+    return metrics
+
+# Move a complete summary to destination; an incomplete one (e.g. of a killed run) is removed.
+def keep_summary(path, destination):
+    if read_summary(path) == None:
+        remove_summary(path)
+        return None
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    os.replace(path, destination)
+    return destination
+
+def remove_summary(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,102 @@
+# Runner Events
+# LFRunner publishes what it does as a stream of typed events, so that long sweeps can be
+# watched while they run: live plots, progress bars and newline-delimited JSON logs that
+# external dashboards tail. Subscribers are called from the runner's job threads; an
+# exception in one is printed and does not reach the runner or the other subscribers.
+
+import sys
+import json
+import time
+import threading
+import traceback
+
+# Fields of every event type. 'done'/'total' count builds and runs (skipped ones included).
+EVENT_FIELDS = {
+    'measure_started': ['jobs', 'total'],
+    'build_started': ['k', 'scheduler', 'workers', 'file'],
+    'build_finished': ['k', 'scheduler', 'workers', 'file', 'binary', 'usage', 'done', 'total'],
+    # Every iteration of the job was already in the result store
+    'build_skipped': ['k', 'scheduler', 'workers', 'file', 'done', 'total'],
+    # 'stored': the sample comes from the result store instead of a run
+    'run_finished': ['k', 'scheduler', 'workers', 'file', 'iteration', 'exe_time', 'deadline_miss',
+                     'censored', 'stored', 'usage', 'done', 'total'],
+    # One (task set, scheduler, worker) job is done; 'exe_time'/'deadline_miss' are summaries
+    # (see StreamAggregator.summary) and 'result' is the job's result dict of measure_datasets
+    'point_aggregated': ['k', 'scheduler', 'workers', 'file', 'exe_time', 'deadline_miss', 'censored', 'result'],
+    # 'completed' is False when the measurement was cancelled or failed
+    'measure_finished': ['jobs', 'completed'],
+}
+
+# Fields that only make sense inside the process
+LOCAL_FIELDS = ['result']
+
+class RunnerEvent(object):
+
+    def __init__(self, type, **fields):
+        if type not in EVENT_FIELDS:
+            raise RuntimeError("Unknown runner event: " + type)
+        missing = [field for field in EVENT_FIELDS[type] if field not in fields]
+        if len(missing) > 0:
+            raise RuntimeError(f"Runner event '{type}' lacks {', '.join(missing)}")
+        self.type = type
+        self.time = time.time()
+        self.fields = fields
+
+    def __getitem__(self, key):
+        return self.fields[key]
+
+    def get(self, key, default=None):
+        return self.fields.get(key, default)
+
+    def to_dict(self):
+        event = {'type': self.type, 'time': self.time}
+        event.update({k: v for k, v in self.fields.items() if k not in LOCAL_FIELDS})
+        return event
+
+class EventBus(object):
+
+    def __init__(self):
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    # fn(event) is called for every event; returns fn so that it can be unsubscribed.
+    def subscribe(self, fn):
+        with self.lock:
+            self.subscribers.append(fn)
+        return fn
+
+    def unsubscribe(self, fn):
+        with self.lock:
+            if fn in self.subscribers:
+                self.subscribers.remove(fn)
+
+    def publish(self, type, **fields):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        if len(subscribers) == 0:
+            return
+        event = RunnerEvent(type, **fields)
+        for fn in subscribers:
+            try:
+                fn(event)
+            except Exception:
+                print(f"Subscriber of runner events failed on '{type}':", file=sys.stderr)
+                traceback.print_exc()
+
+# Subscriber appending every event to a newline-delimited JSON file, flushed per line.
+class NDJSONLog(object):
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, 'a', encoding='UTF8')
+
+    def __call__(self, event):
+        line = json.dumps(event.to_dict(), default=str)
+        with self.lock:
+            self.file.write(line + '\n')
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
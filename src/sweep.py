@@ -0,0 +1,206 @@
+# Space-filling sweep over task set parameters. (Command line interface version.)
+# Instead of one cli.py invocation per combination, a Latin hypercube or Sobol design
+# picks the configurations, and interesting regions can be refined afterwards.
+# With --spec, the sweeps of a declarative spec file (see sweeps/SweepSpec.py) are run instead.
+
+import os
+import argparse
+from datetime import datetime
+
+from runners.LFRunner import LFRunner
+from results.ResultStore import ResultStore
+from runners.RunnerEvents import NDJSONLog
+from runners.Environment import EnvironmentCheck
+from sweeps.SweepPlanner import SweepPlanner, DEFAULT_SPACES
+from sweeps.SweepSpec import SpecSweep, load_spec, expand
+from plots.ReportRenderer import ReportRenderer
+from sweeps.CostEstimator import CostEstimator
+
+class SweepCLI(object):
+    def __init__(self):
+        parser = argparse.ArgumentParser(description="Space-filling sweep over task set parameters.")
+        parser.add_argument("-S", "--schedulers", nargs='+', type=str,
+                            help="Choose the schedulers: 'NP', 'GEDF_NP', 'GEDF_NP_CI, 'adaptive'")
+        parser.add_argument("-NI", "--num_iteration", type=int, default=1,
+                            help="Set the number of iterations")
+        parser.add_argument("-TT", "--total_time", nargs='+', type=str, default=["1", "sec"],
+                            help="Set the total time(ex. 1 sec); can choose the unit(sec, msec, usec, nsec)")
+        parser.add_argument("-BW", "--bounded_workers", nargs='+', type=int, default=[1, 4],
+                            help="Set the min & max workers(ex. -BW 1 10 : min is 1 & max is 10)")
+        parser.add_argument("-T", "--type", type=str, default='basic',
+                            help="Choose the type of taskset: 'basic', 'dag'")
+
+        parser.add_argument("--spec", type=str,
+                            help="Run the sweeps of a spec file (.json, .yaml, .toml) instead of a design")
+
+        # Design of experiments
+        parser.add_argument("-M", "--method", type=str, default='lhs',
+                            help="Choose the design: 'lhs' (Latin hypercube), 'sobol'")
+        parser.add_argument("-N", "--num_points", type=int, default=16,
+                            help="Set the number of design points")
+        parser.add_argument("--design_seed", type=int, default=0,
+                            help="Set the random seed of the design")
+        parser.add_argument("-R", "--refine", type=int, default=0,
+                            help="Set the number of refinement rounds around the most interesting points")
+        parser.add_argument("--refine_points", type=int, default=8,
+                            help="Set the number of new points in each refinement round")
+        parser.add_argument("--top", type=int, default=2,
+                            help="Set the number of interesting points refined in each round")
+
+        # Runner
+        parser.add_argument("-J", "--jobs", type=int, default=1,
+                            help="Set the number of build/run jobs executed in parallel (with --spec: of all jobs)")
+        parser.add_argument("--compiler", type=str, default='gradlew',
+                            help="Choose the LF compiler: 'gradlew', 'lfc'")
+        parser.add_argument("--max_misses", type=int,
+                            help="Stop a run as soon as its deadline misses exceed this number")
+        parser.add_argument("--max_slowdown", type=float,
+                            help="Stop a run as soon as it is this many percent slower than the best scheduler so far")
+        parser.add_argument("--interleave", action='store_true',
+                            help="Build every program of a design round first, then run them in a random order (not with --spec)")
+        parser.add_argument("--warmup", type=int, default=0,
+                            help="Set the number of discarded warmup runs per binary (with --interleave)")
+        parser.add_argument("--shuffle_seed", type=int,
+                            help="Set the random seed of the interleaved run order")
+        parser.add_argument("--max_load", type=float,
+                            help="Re-queue interleaved runs while the 1-minute load average, minus the runs in flight, exceeds this (default: number of CPUs)")
+        parser.add_argument("--governors", nargs='*', type=str, default=['performance'],
+                            help="Set the CPU frequency governors accepted without a warning (none: any)")
+        parser.add_argument("--max_requeues", type=int, default=3,
+                            help="Set how often a run is re-queued under bad conditions before it is kept")
+        parser.add_argument("--settle_time", type=float, default=5.0,
+                            help="Set the seconds to wait before a re-queued run is retried")
+        parser.add_argument("--store", type=str, default='output/results.db',
+                            help="Set the SQLite result store; points already measured are skipped on restart")
+        parser.add_argument("--estimate", action='store_true',
+                            help="Only print the expected wall-clock time of a --spec sweep, from the store's history")
+        parser.add_argument("--plot_processes", type=int, default=os.cpu_count() or 1,
+                            help="Set the number of processes rendering the report graphs of --spec")
+
+        self.args, _ = parser.parse_known_args()
+
+    def Run(self):
+        WORKING_DIR = os.getcwd()
+        if self.args.spec != None:
+            return self.RunSpec()
+        if self.args.schedulers == None:
+            raise RuntimeError("Choose the schedulers (-S) or a spec file (--spec)")
+        if self.args.type not in DEFAULT_SPACES:
+            raise RuntimeError("Sweeps support only 'basic' and 'dag' task sets")
+
+        base = {
+            'type': self.args.type,
+            'schedulers': self.args.schedulers,
+            'timeout': {'value': int(self.args.total_time[0]), 'timeUnit': self.args.total_time[1]},
+            'min_workers': self.args.bounded_workers[0],
+            'max_workers': self.args.bounded_workers[1],
+        }
+        # Only runs stopped at a number of misses need the progress lines
+        if self.args.max_misses != None:
+            base['miss_progress'] = True
+
+        planner = SweepPlanner()
+        planner.setConfig({
+            'estimator': self.estimator(),
+            'method': self.args.method,
+            'num_points': self.args.num_points,
+            'seed': self.args.design_seed,
+            'space': DEFAULT_SPACES[self.args.type],
+            'base': base,
+        })
+
+        runner = LFRunner()
+        runner.setConfig({
+            'compiler': self.args.compiler,
+            'jobs': self.args.jobs,
+            'max_deadline_misses': self.args.max_misses,
+            'max_slowdown': self.args.max_slowdown,
+        })
+        if self.args.interleave:
+            environment = EnvironmentCheck()
+            environment.setConfig({'max_load': self.args.max_load, 'governors': self.args.governors})
+            runner.setConfig({
+                'interleave': True,
+                'warmup': self.args.warmup,
+                'shuffle_seed': self.args.shuffle_seed,
+                'environment': environment,
+                'max_requeues': self.args.max_requeues,
+                'settle_time': self.args.settle_time,
+            })
+
+        output_dir = f'{WORKING_DIR}/output/sweep_{int(round(datetime.now().timestamp()))}'
+        os.makedirs(output_dir, exist_ok=True)
+
+        store = ResultStore(os.path.join(WORKING_DIR, self.args.store))
+        event_log = runner.events.subscribe(NDJSONLog(f'{output_dir}/events.ndjson'))
+
+        points = planner.execute(planner.design(), runner, f'{WORKING_DIR}/templates', f'{WORKING_DIR}/.gui/sweep',
+                                 self.args.num_iteration, store)
+        for _ in range(self.args.refine):
+            centers = planner.interesting(points, self.args.top)
+            points += planner.execute(planner.refine(centers, self.args.refine_points), runner,
+                                      f'{WORKING_DIR}/templates', f'{WORKING_DIR}/.gui/sweep', self.args.num_iteration, store)
+
+        planner.saveResult(points, f'{output_dir}/{self.args.type}-{self.args.method}.csv')
+        store.close()
+        event_log.close()
+        print(f"Saved {len(points)} design points to {output_dir}")
+
+    def RunSpec(self):
+        WORKING_DIR = os.getcwd()
+        points = expand(load_spec(self.args.spec))
+        # Only runs stopped at a number of misses need the progress lines
+        if self.args.max_misses != None:
+            for point in points:
+                point['config']['miss_progress'] = True
+
+        runner = LFRunner()
+        runner.setConfig({
+            'compiler': self.args.compiler,
+            'max_deadline_misses': self.args.max_misses,
+            'max_slowdown': self.args.max_slowdown,
+        })
+
+        # Longest work first; the plan counts every program, the sweep skips shared and stored ones
+        estimator = self.estimator()
+        print(estimator.summary(SpecSweep.plan(points, estimator, self.args.jobs)))
+        if self.args.estimate:
+            return
+
+        output_dir = f'{WORKING_DIR}/output/sweep_{int(round(datetime.now().timestamp()))}'
+        os.makedirs(output_dir, exist_ok=True)
+
+        store = ResultStore(os.path.join(WORKING_DIR, self.args.store))
+        sweep = SpecSweep()
+        sweep.setConfig({'jobs': self.args.jobs, 'estimator': estimator})
+        try:
+            sweep.execute(points, runner, f'{WORKING_DIR}/templates', f'{WORKING_DIR}/.gui/spec', store)
+        finally:
+            store.close()
+
+        name = os.path.splitext(os.path.basename(self.args.spec))[0]
+        sweep.saveResult(points, f'{output_dir}/{name}.csv')
+
+        report = ReportRenderer()
+        report.setConfig({
+            'title': f'Sweep {name}',
+            'description': [('spec', os.path.abspath(self.args.spec)), ('points', len(points)), ('results', f'{name}.csv')],
+            'processes': self.args.plot_processes,
+        })
+        for graph in sweep.graphs(points):
+            report.add(graph)
+        report.render(output_dir)
+        print(f"Saved {len(points)} sweep points and {len(report.graphs)} graphs (index.html) to {output_dir}")
+
+    # Cost model fitted to the store's builds and runs, if there is a store yet
+    def estimator(self):
+        estimator = CostEstimator()
+        path = os.path.join(os.getcwd(), self.args.store)
+        if os.path.isfile(path):
+            estimator.fit(path)
+        return estimator
+
+
+if __name__ == "__main__":
+    sweep = SweepCLI()
+    sweep.Run()
@@ -0,0 +1,196 @@
+# Cost Estimator
+# Expected build and run time of the jobs of a sweep, before it is launched:
+#   build  a + b * size, size being num_tasks (basic), max_depth * num_outputs (DAG) or 1
+#   run    timeout + overhead (LF programs run until their timeout; the overhead is at
+#          least 0, so programs that stop earlier are estimated at their timeout)
+# a, b and the overhead start from priors and are fitted to the wall times of earlier
+# builds and uncensored runs in a result store; configurations measured before use their
+# own median times. plan() then orders the jobs longest first and simulates them on the
+# available job slots (list scheduling, dependencies included) to get the expected
+# wall-clock time, i.e. the makespan.
+
+import json
+import heapq
+import sqlite3
+import statistics
+
+import numpy as np
+
+from results.ResultStore import ResultStore
+
+TIME_UNITS = {
+    'nsec': 1e-9, 'nsecs': 1e-9, 'usec': 1e-6, 'usecs': 1e-6, 'msec': 1e-3, 'msecs': 1e-3,
+    'sec': 1.0, 'secs': 1.0, 'min': 60.0, 'mins': 60.0, 'hour': 3600.0, 'hours': 3600.0,
+    'day': 86400.0, 'days': 86400.0, 'week': 604800.0, 'weeks': 604800.0,
+}
+
+def seconds(time_value):
+    return time_value['value'] * TIME_UNITS[time_value['timeUnit']]
+
+def format_duration(total):
+    total = int(round(total))
+    days, rest = divmod(total, 86400)
+    hours, rest = divmod(rest, 3600)
+    minutes, secs = divmod(rest, 60)
+    if days > 0:
+        return f'{days}d {hours}h {minutes:02d}m'
+    if hours > 0:
+        return f'{hours}h {minutes:02d}m {secs:02d}s'
+    return f'{minutes}m {secs:02d}s'
+
+class CostEstimator(object):
+
+    def __init__(self):
+        self.config = {
+            # Priors, used until the store has enough history
+            'build_time': 20.0,
+            'build_time_per_unit': 0.05,
+            'run_overhead': 0.5,
+            # Timeout of configs without one (TasksetGenerator's default)
+            'timeout': {'value': 10, 'timeUnit': 'sec'},
+        }
+        # {config hash: {'build': seconds, 'run': seconds}} of configurations measured before
+        self.history = {}
+        self.samples = {'build': 0, 'run': 0}
+
+    def setConfig(self, config):
+        for key, value in config.items():
+            if key in self.config.keys():
+                self.config[key] = value
+
+    @staticmethod
+    def size(config):
+        if config.get('type') == 'basic':
+            return int(config.get('num_tasks', 20))
+        if config.get('type') == 'dag':
+            return int(config.get('max_depth', 5)) * int(config.get('num_outputs', 4))
+        return 1
+
+    def timeout(self, config):
+        return seconds(config.get('timeout', self.config['timeout']))
+
+    # Fit the model to the builds and runs recorded in a result store (path of a .db).
+    def fit(self, path):
+        connection = sqlite3.connect(path)
+        try:
+            configs = {config_hash: json.loads(config) for config_hash, config in connection.execute('SELECT config_hash, config FROM configs')}
+            rows = connection.execute('''
+                SELECT r.config_hash, r.phase, r.value FROM resources r
+                LEFT JOIN measurements m USING (config_hash, scheduler, workers, iteration)
+                WHERE r.metric = 'wall_time' AND (r.phase = 'build' OR COALESCE(m.censored, 0) = 0)
+            ''').fetchall()
+        except sqlite3.OperationalError:
+            # Not a result store, or one from before resource usage was recorded
+            rows = []
+        connection.close()
+
+        times = {}
+        for config_hash, phase, value in rows:
+            if config_hash in configs:
+                times.setdefault((config_hash, phase), []).append(value)
+        self.history = {}
+        for (config_hash, phase), values in times.items():
+            self.history.setdefault(config_hash, {})[phase] = statistics.median(values)
+
+        # Only task set configs fit the model; programs of spec sweeps ({'program': hash}) are history only
+        described = {h for h, config in configs.items() if 'type' in config}
+        builds = [(self.size(configs[h]), t) for (h, phase), values in times.items() if phase == 'build' and h in described for t in values]
+        runs = [t - self.timeout(configs[h]) for (h, phase), values in times.items() if phase == 'run' and h in described for t in values]
+        self.samples = {'build': len(builds), 'run': len(runs)}
+
+        if len(set(size for size, _ in builds)) >= 2:
+            slope, intercept = np.polyfit([size for size, _ in builds], [t for _, t in builds], 1)
+            self.config['build_time_per_unit'] = max(float(slope), 0.0)
+            self.config['build_time'] = max(float(intercept), 0.0)
+        elif len(builds) > 0:
+            # One size: keep the prior's proportions, scaled to the measured time
+            prior = self.config['build_time'] + self.config['build_time_per_unit'] * builds[0][0]
+            scale = statistics.median(t for _, t in builds) / prior if prior > 0 else 0.0
+            self.config['build_time'] *= scale
+            self.config['build_time_per_unit'] *= scale
+        if len(runs) > 0:
+            # Programs that finish before their timeout (e.g. short histories) would give a negative one
+            self.config['run_overhead'] = max(statistics.median(runs), 0.0)
+        return self
+
+    # (build seconds, run seconds) of one program of config; config_hash: the key its
+    # measurements are stored under, when it is not the config's fingerprint
+    def estimate(self, config, config_hash=None):
+        build = self.config['build_time'] + self.config['build_time_per_unit'] * self.size(config)
+        run = max(self.timeout(config) + self.config['run_overhead'], 0.0)
+        known = self.history.get(config_hash if config_hash != None else ResultStore.fingerprint(config), {})
+        return known.get('build', build), known.get('run', run)
+
+    # Expected makespan of tasks [{'key', 'cost', 'deps': [keys]}] on slots, started
+    # longest first: among the ready tasks, the one heading the most remaining work
+    # (its cost plus the longest chain of tasks depending on it) starts first.
+    # Returns {'makespan', 'work', 'slots', 'order': [keys in start order], 'rank': {key: seconds}}.
+    @staticmethod
+    def plan(tasks, slots):
+        tasks = {task['key']: task for task in tasks}
+        dependents = {key: [] for key in tasks}
+        remaining = {}
+        for key, task in tasks.items():
+            remaining[key] = len(task['deps'])
+            for dep in task['deps']:
+                dependents[dep].append(key)
+
+        # Upward rank, from the tasks nothing depends on back to the roots
+        rank = {}
+        def upward(key):
+            stack = [key]
+            while len(stack) > 0:
+                current = stack[-1]
+                pending = [d for d in dependents[current] if d not in rank]
+                if len(pending) > 0:
+                    stack += pending
+                    continue
+                stack.pop()
+                rank[current] = tasks[current]['cost'] + max([rank[d] for d in dependents[current]] + [0.0])
+        for key in tasks:
+            if key not in rank:
+                upward(key)
+
+        # Heap entries carry the task's position, so that keys are never compared
+        position = {key: i for i, key in enumerate(tasks)}
+        ready = [(-rank[key], position[key], key) for key, count in remaining.items() if count == 0]
+        heapq.heapify(ready)
+        running = []
+        now, order, free = 0.0, [], max(int(slots), 1)
+        while len(ready) > 0 or len(running) > 0:
+            while free > 0 and len(ready) > 0:
+                _, i, key = heapq.heappop(ready)
+                order.append(key)
+                heapq.heappush(running, (now + tasks[key]['cost'], i, key))
+                free -= 1
+            now, _, key = heapq.heappop(running)
+            free += 1
+            for dependent in dependents[key]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    heapq.heappush(ready, (-rank[dependent], position[dependent], dependent))
+        return {
+            'makespan': now,
+            'work': sum(task['cost'] for task in tasks.values()),
+            'slots': max(int(slots), 1),
+            'order': order,
+            'rank': rank,
+        }
+
+    # Tasks of LFRunner.measure_datasets for replicated task sets [(config, config hash)]: one job
+    # per (task set, scheduler, workers) that builds once and runs the iterations not in store.
+    def measure_tasks(self, replicas, num_iteration, store=None):
+        tasks = []
+        for k, (config, config_hash) in enumerate(replicas):
+            build, run = self.estimate(config, config_hash)
+            for scheduler in config['schedulers']:
+                for worker in range(config['min_workers'], config['max_workers'] + 1):
+                    missing = sum(1 for i in range(num_iteration) if store == None or store.get(config_hash, scheduler, worker, i) == None)
+                    tasks.append({'key': (k, scheduler, worker), 'cost': build + missing * run if missing > 0 else 0.0, 'deps': []})
+        return tasks
+
+    def summary(self, result):
+        return (f"Estimated wall-clock: {format_duration(result['makespan'])} with {result['slots']} jobs "
+                f"({format_duration(result['work'])} of work; fitted to {self.samples['build']} builds and {self.samples['run']} runs, "
+                f"build {self.config['build_time']:.2f} s + {self.config['build_time_per_unit']:.4f} s per unit of size, "
+                f"run timeout {self.config['run_overhead']:+.2f} s)")
@@ -0,0 +1,130 @@
+# Job Graph
+# A DAG of keyed jobs executed through one pool, so that a single concurrency limit holds
+# across every step of a sweep. Adding a job whose key already exists returns the existing
+# job instead: identical steps of different sweep entries are done once.
+# Jobs may add more jobs while the graph runs (e.g. a generate step adding the builds of
+# the files it wrote); a job starts once all of its dependencies have finished. Among the
+# jobs that are ready, the one with the highest priority (e.g. the longest expected work
+# behind it, see sweeps/CostEstimator.py) starts first; equal priorities start in order.
+
+import heapq
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class Job(object):
+
+    def __init__(self, key, kind, fn, deps, priority=0.0):
+        self.key = key
+        self.kind = kind
+        self.priority = priority
+        # Called with the results of deps, in order
+        self.fn = fn
+        self.deps = deps
+        self.dependents = []
+        self.remaining = 0
+        # 'pending', 'running' or 'done'
+        self.state = 'pending'
+        self.result = None
+
+class JobGraph(object):
+
+    def __init__(self):
+        self.jobs = {}
+        # Number of add() calls answered with an existing job, per kind
+        self.shared = {}
+        self.lock = threading.Condition()
+        self.pool = None
+        self.unfinished = 0
+        self.error = None
+        # Ready jobs waiting for a slot: (-priority, sequence, key)
+        self.ready = []
+        self.sequence = itertools.count()
+        self.running = 0
+        self.max_jobs = 1
+
+    # Add a job unless one with the same key exists; returns the key.
+    def add(self, key, kind, fn, deps=(), priority=0.0):
+        with self.lock:
+            if key in self.jobs:
+                self.shared[kind] = self.shared.get(kind, 0) + 1
+                return key
+            for dep in deps:
+                if dep not in self.jobs:
+                    raise RuntimeError(f"Job {key} depends on unknown job {dep}")
+            job = Job(key, kind, fn, list(deps), priority)
+            for dep in job.deps:
+                if self.jobs[dep].state != 'done':
+                    self.jobs[dep].dependents.append(key)
+                    job.remaining += 1
+            self.jobs[key] = job
+            self.unfinished += 1
+            if self.pool != None and job.remaining == 0:
+                self.submit(job)
+        return key
+
+    def result(self, key):
+        return self.jobs[key].result
+
+    def count(self, kind):
+        return sum(1 for job in self.jobs.values() if job.kind == kind)
+
+    # Called with the lock held
+    def submit(self, job):
+        self.queue(job)
+        self.dispatch()
+
+    # Called with the lock held; queue every ready job before dispatching, so that priorities hold
+    def queue(self, job):
+        heapq.heappush(self.ready, (-job.priority, next(self.sequence), job.key))
+
+    # Start ready jobs while slots are free; called with the lock held
+    def dispatch(self):
+        while self.error == None and self.running < self.max_jobs and len(self.ready) > 0:
+            _, _, key = heapq.heappop(self.ready)
+            job = self.jobs[key]
+            job.state = 'running'
+            self.running += 1
+            self.pool.submit(self.execute_job, job)
+
+    def execute_job(self, job):
+        try:
+            result = job.fn(*[self.jobs[dep].result for dep in job.deps])
+        except BaseException as err:
+            with self.lock:
+                self.running -= 1
+                if self.error == None:
+                    self.error = err
+                self.lock.notify_all()
+            return
+
+        with self.lock:
+            job.result = result
+            job.state = 'done'
+            self.running -= 1
+            self.unfinished -= 1
+            for key in job.dependents:
+                dependent = self.jobs[key]
+                dependent.remaining -= 1
+                if dependent.remaining == 0:
+                    self.queue(dependent)
+            self.dispatch()
+            self.lock.notify_all()
+
+    # Run every job with at most max_jobs at a time. The first failure stops new jobs
+    # from starting and is raised once the running ones have finished.
+    def run(self, max_jobs=1):
+        with ThreadPoolExecutor(max_workers=max(int(max_jobs), 1)) as pool:
+            with self.lock:
+                self.pool = pool
+                self.max_jobs = max(int(max_jobs), 1)
+                for job in list(self.jobs.values()):
+                    if job.state == 'pending' and job.remaining == 0:
+                        self.queue(job)
+                self.dispatch()
+                while self.unfinished > 0 and self.error == None:
+                    self.lock.wait()
+        with self.lock:
+            self.pool = None
+        if self.error != None:
+            raise self.error
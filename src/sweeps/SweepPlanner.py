@@ -0,0 +1,158 @@
+# Sweep Planner
+# Builds space-filling designs (Latin hypercube or Sobol) over the configuration
+# space of TasksetGenerator, generates the LF files of every design point and
+# measures them through the shared pool of an LFRunner.
+# Points whose schedulers disagree the most can be refined with a denser local design.
+
+import csv
+import math
+
+from scipy.stats import qmc
+
+from TasksetGenerator import TasksetGenerator
+from results.ResultStore import ResultStore
+from sweeps.CostEstimator import CostEstimator
+from runners.ResourceUsage import RESOURCE_METRICS, RESOURCE_COLUMNS
+
+# Default parameter spaces for each type of task set.
+# A dimension is either numeric ('range', optionally 'integer') or categorical ('choices').
+DEFAULT_SPACES = {
+    'basic': {
+        'utilization': {'range': [0.1, 0.9]},
+        'num_tasks': {'range': [1, 40], 'integer': True},
+        'p_deadline': {'range': [0.0, 1.0]},
+        'periodicity': {'choices': ['sporadic', 'periodic']},
+        'seed': {'range': [0, 2**31 - 1], 'integer': True},
+    },
+    'dag': {
+        'max_depth': {'range': [2, 8], 'integer': True},
+        'num_outputs': {'range': [1, 8], 'integer': True},
+        'seed': {'range': [0, 2**31 - 1], 'integer': True},
+    },
+}
+
+class SweepPlanner(object):
+
+    def __init__(self):
+        self.config = {
+            'method': 'lhs',
+            'num_points': 16,
+            'seed': 0,
+            'space': DEFAULT_SPACES['basic'],
+            # Fixed TasksetGenerator configuration shared by every design point
+            'base': {'type': 'basic'},
+            # Optional CostEstimator: prints the expected wall-clock time of every execute()
+            # and starts the longest jobs first
+            'estimator': None,
+        }
+        self.next_id = 0
+
+    def setConfig(self, config):
+        for key, value in config.items():
+            if key in self.config.keys():
+                self.config[key] = value
+
+    # Draw num_points samples from the unit hypercube [0, 1)^d.
+    def sample_unit(self, num_points, seed):
+        dimension = len(self.config['space'])
+        if self.config['method'] == 'lhs':
+            return qmc.LatinHypercube(dimension, seed=seed).random(num_points)
+        elif self.config['method'] == 'sobol':
+            # Sobol points are balanced for powers of two; keep the leading num_points.
+            m = max(0, math.ceil(math.log2(num_points)))
+            return qmc.Sobol(dimension, scramble=True, seed=seed).random_base2(m)[:num_points]
+        raise RuntimeError("Unknown design method: " + str(self.config['method']))
+
+    def to_config(self, unit):
+        config = {}
+        for (name, dim), x in zip(self.config['space'].items(), unit):
+            if 'choices' in dim:
+                config[name] = dim['choices'][min(int(x * len(dim['choices'])), len(dim['choices']) - 1)]
+            else:
+                low, high = dim['range']
+                value = low + x * (high - low)
+                if dim.get('integer', False):
+                    value = min(max(int(round(value)), low), high)
+                config[name] = value
+        return config
+
+    def make_points(self, units):
+        points = []
+        for unit in units:
+            points.append({'id': self.next_id, 'unit': list(unit), 'config': self.to_config(unit), 'results': []})
+            self.next_id += 1
+        return points
+
+    def design(self):
+        return self.make_points(self.sample_unit(self.config['num_points'], self.config['seed']))
+
+    # Sample num_points new points in boxes of side `shrink` around each center point.
+    def refine(self, centers, num_points, shrink=0.25, seed=None):
+        if len(centers) == 0:
+            return []
+        seed = self.config['seed'] + self.next_id if seed == None else seed
+        per_center = max(1, num_points // len(centers))
+
+        units = []
+        for i, center in enumerate(centers):
+            for u in self.sample_unit(per_center, seed + i):
+                units.append([min(max(c + (x - 0.5) * shrink, 0.0), 1.0 - 1e-12) for c, x in zip(center['unit'], u)])
+        return self.make_points(units)
+
+    # Points where the measured `key` spreads the most across schedulers.
+    def interesting(self, points, count, key='exe_time'):
+        def spread(point):
+            by_worker = {}
+            for r in point['results']:
+                by_worker.setdefault(r['workers'], []).append(r[key])
+            spreads = [(max(v) - min(v)) / max(min(v), 1e-9) for v in by_worker.values() if len(v) > 1]
+            return max(spreads) if len(spreads) > 0 else 0.0
+
+        return sorted([p for p in points if len(p['results']) > 0], key=spread, reverse=True)[:count]
+
+    # Generate every point into outputDir/point_<id>/src and measure all files on the runner's pool.
+    # With a ResultStore, iterations already recorded for a point's config are not run again.
+    def execute(self, points, runner, templateDir, outputDir, num_iteration=1, store=None):
+        datasets, configs = [], []
+        for point in points:
+            config = dict(self.config['base'], **point['config'])
+            point['config_hash'] = store.add_config(config) if store != None else ResultStore.fingerprint(config)
+            configs.append((dict(TasksetGenerator().config, **config), point['config_hash']))
+
+            generator = TasksetGenerator()
+            generator.setConfig(config)
+            datasets.append(generator.makeLF(templateDir=templateDir, outputDir=f'{outputDir}/point_{point["id"]}/src'))
+
+        if self.config['estimator'] != None:
+            tasks = self.config['estimator'].measure_tasks(configs, num_iteration, store)
+            costs = {task['key']: task['cost'] for task in tasks}
+            runner.setConfig({'job_cost': lambda k, scheduler, worker, filepath: costs.get((k, scheduler, worker), 0.0)})
+            print(self.config['estimator'].summary(CostEstimator.plan(tasks, runner.config['jobs'])))
+
+        for job in runner.measure_datasets(datasets, num_iteration, store, [p['config_hash'] for p in points]):
+            points[job['k']]['results'].append({
+                'scheduler': job['scheduler'],
+                'workers': job['workers'],
+                'exe_time': job['exe_time'].mean(),
+                'deadline_miss': job['deadline_miss'].mean(),
+                'exe_time_p95': job['exe_time'].quantile(0.95),
+                'exe_time_p99': job['exe_time'].quantile(0.99),
+                'max_deadline_miss': job['deadline_miss'].stats.max,
+                'censored': job['censored'],
+                'resources': {metric: a.mean() for metric, a in job['resources'].items()},
+            })
+
+        return points
+
+    def saveResult(self, points, output_file):
+        names = list(self.config['space'].keys())
+        with open(output_file, 'w', encoding='UTF8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['point'] + names + ['scheduler', 'worker', 'physical execution time', 'deadline miss',
+                                                 'execution time p95', 'execution time p99', 'maximum deadline miss', 'censored runs'] + RESOURCE_COLUMNS)
+            for point in points:
+                for r in point['results']:
+                    writer.writerow([point['id']] + [point['config'][n] for n in names] +
+                                    [r['scheduler'], r['workers'], r['exe_time'], r['deadline_miss'],
+                                     r['exe_time_p95'], r['exe_time_p99'], r['max_deadline_miss'], r['censored']] +
+                                    [r['resources'].get(metric, '') for metric in RESOURCE_METRICS])
@@ -0,0 +1,362 @@
+# Sweep Spec
+# Declarative sweeps: a spec file (JSON, YAML or TOML) lists sweep entries, each a task set
+# type with fixed settings and a grid of parameters. Every grid point expands into
+#   generate (per task set replica) -> build (per distinct LF program) -> run (per iteration)
+#   -> aggregate (per scheduler and number of workers)
+# jobs of one JobGraph. Steps are keyed by what they produce, so a program that several
+# entries generate is built and run once, and binaries are cached on disk across sweeps.
+#
+# {
+#   "defaults": {"schedulers": ["NP", "GEDF_NP"], "min_workers": 1, "max_workers": 4,
+#                "timeout": "1 sec", "num_iteration": 3, "num_tasksets": 2},
+#   "sweeps": [
+#     {"name": "util", "type": "basic", "periodicity": "periodic",
+#      "grid": {"utilization": [0.3, 0.6, 0.9], "num_tasks": [5, 10]}},
+#     {"type": "dag", "grid": {"max_depth": [2, 4]}},
+#     {"type": "custom", "template": "templates/Custom_1_Deadline_1_NonDeadline.lf",
+#      "grid": {"DEADLINE": ["50 msec", "100 msec"]}}
+#   ]
+# }
+# A custom entry also sweeps the placeholders its template declares (see tasksets/CustomTaskSet.py),
+# over the declared values unless its grid names them.
+
+import os
+import csv
+import json
+import shutil
+import hashlib
+import itertools
+import threading
+from datetime import datetime
+
+from TasksetGenerator import TasksetGenerator
+from tasksets.CustomTaskSet import load_template
+from results.ResultStore import ResultStore
+from results.StreamingStats import StreamAggregator, ReplicatedStats
+from sweeps.JobGraph import JobGraph
+from sweeps.CostEstimator import CostEstimator
+
+# Keys of a sweep entry that are not task set settings
+ENTRY_KEYS = ['name', 'grid', 'template', 'num_iteration', 'num_tasksets']
+# Settings that may be written as "<value> <unit>", e.g. "100 msec"
+TIME_KEYS = ['timeout', 'deadline', 'period', 'execution_time']
+
+def load_spec(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.json':
+        with open(path) as f:
+            return json.load(f)
+    elif extension in ['.yaml', '.yml']:
+        try:
+            import yaml
+        except ImportError:
+            raise RuntimeError("Install PyYAML to read YAML sweep specs: " + path)
+        with open(path) as f:
+            return yaml.safe_load(f)
+    elif extension == '.toml':
+        try:
+            import tomllib
+        except ImportError:
+            raise RuntimeError("TOML sweep specs need Python 3.11 or later: " + path)
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    raise RuntimeError("Unknown sweep spec format (use .json, .yaml or .toml): " + path)
+
+def parse_time(value):
+    if isinstance(value, str):
+        number, unit = value.split()
+        return {'value': int(number), 'timeUnit': unit}
+    return value
+
+# Every grid point of every entry: [{'id', 'entry', 'params', 'config', 'template', 'num_iteration', 'num_tasksets'}]
+def expand(spec):
+    defaults = dict(spec.get('defaults', {}))
+    points = []
+    for i, entry in enumerate(spec.get('sweeps', [])):
+        settings = dict(defaults, **entry)
+        if 'type' not in settings:
+            raise RuntimeError(f"Sweep entry {i} has no task set type")
+        grid = settings.get('grid', {}) or {}
+        template_points = [None]
+        if settings['type'] == 'custom':
+            if 'template' not in settings:
+                raise RuntimeError(f"Custom sweep entry {i} has no template")
+            # Placeholders declared by the template sweep over their declared values, or over
+            # the values the grid gives them; only those with several values are point params
+            declared = load_template(settings['template'])['params']
+            template_points = TasksetGenerator.templateGrid(settings['template'], {n: v for n, v in grid.items() if n in declared})
+            swept = [n for n in declared if len(set(p[n] for p in template_points)) > 1]
+            grid = {n: v for n, v in grid.items() if n not in declared}
+        names = list(grid.keys())
+        for values in itertools.product(*[grid[name] if isinstance(grid[name], list) else [grid[name]] for name in names]):
+            for template_params in template_points:
+                params = dict(zip(names, values))
+                config = {k: v for k, v in settings.items() if k not in ENTRY_KEYS}
+                config.update(params)
+                for key in TIME_KEYS:
+                    if key in config:
+                        config[key] = parse_time(config[key])
+                num_tasksets = int(settings.get('num_tasksets', 1))
+                if template_params != None:
+                    config['params'] = template_params
+                    params.update({n: template_params[n] for n in swept})
+                    # Custom templates have no seed to replicate
+                    num_tasksets = 1
+                points.append({
+                    'id': len(points),
+                    'entry': settings.get('name', f'{config["type"]}_{i}'),
+                    'params': params,
+                    'config': config,
+                    'template': settings.get('template', ''),
+                    'num_iteration': int(settings.get('num_iteration', 1)),
+                    'num_tasksets': num_tasksets,
+                    'results': [],
+                })
+    return points
+
+class SpecSweep(object):
+
+    def __init__(self):
+        self.config = {
+            # Global limit of concurrent jobs (generate, build and run alike)
+            'jobs': 1,
+            # Optional CostEstimator; ready jobs then start longest work first
+            'estimator': None,
+        }
+        self.lock = threading.Lock()
+
+    def setConfig(self, config):
+        for key, value in config.items():
+            if key in self.config.keys():
+                self.config[key] = value
+
+    # Generate, build and run every point; point['results'] gets one dict per scheduler and worker.
+    # outputDir holds generated/<config hash>/ (LF files) and builds/<program hash>/ (binary cache).
+    def execute(self, points, runner, templateDir, outputDir, store=None):
+        self.graph = JobGraph()
+        self.runner = runner
+        self.store = store
+        self.templateDir = templateDir
+        self.outputDir = outputDir
+        # Points without a seed share one, so that identical points are still generated once
+        default_seed = int(round(datetime.now().timestamp()))
+
+        for point in points:
+            point['config'].setdefault('seed', default_seed)
+            generator = TasksetGenerator()
+            generator.setConfig(point['config'])
+            point['seeds'] = generator.replicaSeeds(point['num_tasksets'])
+            point['runs'] = {}
+            point['expanded'] = 0
+            for k, seed in enumerate(point['seeds']):
+                generate_key = self.add_generate(point, seed)
+                self.graph.add(f'expand:{point["id"]}:{k}', 'expand',
+                               lambda dataset, point=point, k=k, generate_key=generate_key: self.expand_replica(point, k, generate_key, dataset),
+                               [generate_key], self.work(point))
+
+        self.graph.run(self.config['jobs'])
+        for kind in ['generate', 'build', 'run']:
+            print(f"{kind}: {self.graph.count(kind)} jobs, {self.graph.shared.get(kind, 0)} shared between sweep entries")
+        return points
+
+    # Generate jobs are keyed by everything that is generated, schedulers and workers included
+    # (ResultStore.fingerprint leaves them out, as the measurements are stored per scheduler and worker).
+    def add_generate(self, point, seed):
+        config = dict(TasksetGenerator().config, **point['config'])
+        config.update(seed=seed, template=point['template'])
+        config_hash = hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+        outputDir = os.path.join(self.outputDir, 'generated', config_hash, 'src')
+
+        def generate():
+            generator = TasksetGenerator()
+            generator.setConfig(point['config'])
+            generator.setConfig({'seed': seed})
+            return generator.makeLF(templateDir=self.templateDir, outputDir=outputDir, template_path=point['template'])
+        return self.graph.add(f'generate:{config_hash}', 'generate', generate, priority=self.work(point))
+
+    # (build seconds, run seconds) of a program of point; (0, 0) without an estimator
+    def estimate(self, point, program=None):
+        if self.config['estimator'] == None:
+            return 0.0, 0.0
+        config = dict(TasksetGenerator().config, **point['config'])
+        return self.config['estimator'].estimate(config, ResultStore.fingerprint({'program': program}) if program != None else None)
+
+    # Expected seconds of building and running the programs of one replica of point
+    def work(self, point):
+        build, run = self.estimate(point)
+        config = dict(TasksetGenerator().config, **point['config'])
+        programs = len(config['schedulers']) * (config['max_workers'] - config['min_workers'] + 1)
+        return programs * (build + point['num_iteration'] * run)
+
+    # Expected wall-clock time of points on jobs slots (see CostEstimator.plan), before anything is
+    # generated: programs that entries share or whose runs are stored are counted anyway.
+    @staticmethod
+    def plan(points, estimator, jobs):
+        tasks = []
+        for point in points:
+            config = dict(TasksetGenerator().config, **point['config'])
+            build, run = estimator.estimate(config)
+            for k in range(point['num_tasksets']):
+                generate = f'generate:{point["id"]}:{k}'
+                tasks.append({'key': generate, 'cost': 0.0, 'deps': []})
+                for scheduler in config['schedulers']:
+                    for worker in range(config['min_workers'], config['max_workers'] + 1):
+                        program = f'{point["id"]}:{k}:{scheduler}:{worker}'
+                        tasks.append({'key': f'build:{program}', 'cost': build, 'deps': [generate]})
+                        tasks += [{'key': f'run:{program}:{i}', 'cost': run, 'deps': [f'build:{program}']} for i in range(point['num_iteration'])]
+        return CostEstimator.plan(tasks, jobs)
+
+    # Add the builds and runs of one generated replica; the last replica of a point adds its aggregates.
+    def expand_replica(self, point, k, generate_key, dataset):
+        for scheduler, files in dataset['schedulers'].items():
+            for worker, filepath in zip(dataset['workers'], files):
+                with open(filepath, 'rb') as f:
+                    contents = f.read()
+                name = os.path.basename(filepath)
+                program = hashlib.sha256(name.encode('utf-8') + b'\0' + contents).hexdigest()[:16]
+                build, run = self.estimate(point, program)
+                build_key = self.graph.add(f'build:{program}', 'build',
+                                           lambda program=program, filepath=filepath: self.build(program, filepath),
+                                           priority=build + point['num_iteration'] * run)
+                run_keys = []
+                for iteration in range(point['num_iteration']):
+                    run_keys.append(self.graph.add(
+                        f'run:{program}:{iteration}', 'run',
+                        lambda binpath, program=program, scheduler=scheduler, worker=worker, iteration=iteration:
+                            self.run(binpath, program, scheduler, worker, iteration, (generate_key, worker)),
+                        [build_key], run))
+                with self.lock:
+                    point['runs'].setdefault((scheduler, worker), {})[k] = run_keys
+
+        with self.lock:
+            point['expanded'] += 1
+            if point['expanded'] < point['num_tasksets']:
+                return
+        for (scheduler, worker), replicas in point['runs'].items():
+            layout = [(k, key) for k in sorted(replicas.keys()) for key in replicas[k]]
+            self.graph.add(f'aggregate:{point["id"]}:{scheduler}:{worker}', 'aggregate',
+                           lambda *samples, point=point, scheduler=scheduler, worker=worker, layout=layout:
+                               self.aggregate(point, scheduler, worker, [k for k, _ in layout], samples),
+                           [key for _, key in layout])
+
+    # Binaries are cached under builds/<program hash>/bin, so they survive across sweeps.
+    def build(self, program, filepath):
+        source = os.path.join(self.outputDir, 'builds', program, 'src', os.path.basename(filepath))
+        binpath = self.runner.binary_path(source)
+        if os.path.isfile(binpath):
+            print(f"Cached build: {binpath}")
+            return binpath
+        os.makedirs(os.path.dirname(source), exist_ok=True)
+        shutil.copyfile(filepath, source)
+        binpath, usage = self.runner.build(source)
+        if self.store != None:
+            self.store.record_resources(self.store.add_config({'program': program}), '', 0, 0, 'build', usage)
+        return binpath
+
+    # Runs of a program are stored under its hash, whichever sweep entry generated it.
+    def run(self, binpath, program, scheduler, worker, iteration, key):
+        config_hash = self.store.add_config({'program': program}) if self.store != None else None
+        sample = self.store.get(config_hash, scheduler, worker, iteration) if self.store != None else None
+        if sample != None:
+            print(f"Skipped (already measured): {binpath} #{iteration}")
+            return sample
+        exe_time, deadline_miss, censored, usage = self.runner.run(binpath, key=key)
+        if self.store != None:
+            self.store.record(config_hash, scheduler, worker, iteration, exe_time, deadline_miss, censored)
+            self.store.record_resources(config_hash, scheduler, worker, iteration, 'run', usage)
+        return exe_time, deadline_miss, censored
+
+    def aggregate(self, point, scheduler, worker, replicas, samples):
+        exe_times, deadline_misses = {}, {}
+        censored = 0
+        for k, (exe_time, deadline_miss, stopped) in zip(replicas, samples):
+            if not stopped:
+                exe_times.setdefault(k, StreamAggregator()).add(exe_time)
+            deadline_misses.setdefault(k, StreamAggregator()).add(deadline_miss)
+            censored += int(stopped)
+        exe_time_replicas, deadline_miss_replicas = ReplicatedStats(), ReplicatedStats()
+        for k in sorted(deadline_misses.keys()):
+            exe_time_replicas.add_set(exe_times.get(k, StreamAggregator()))
+            deadline_miss_replicas.add_set(deadline_misses[k])
+
+        result = {
+            'scheduler': scheduler,
+            'workers': worker,
+            'exe_time': exe_time_replicas.mean(),
+            'deadline_miss': deadline_miss_replicas.mean(),
+            'exe_time_p95': exe_time_replicas.quantile(0.95),
+            'exe_time_p99': exe_time_replicas.quantile(0.99),
+            'max_deadline_miss': deadline_miss_replicas.pooled().stats.max,
+            'exe_time_between_stdev': exe_time_replicas.between_variance() ** 0.5,
+            'exe_time_within_stdev': exe_time_replicas.within_variance() ** 0.5,
+            'exe_time_ci': exe_time_replicas.confidence_interval(),
+            'censored': censored,
+        }
+        with self.lock:
+            point['results'].append(result)
+        return result
+
+    def saveResult(self, points, output_file):
+        names = []
+        for point in points:
+            names += [name for name in point['params'].keys() if name not in names]
+        with open(output_file, 'w', encoding='UTF8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['point', 'entry', 'type'] + names +
+                            ['number of task sets', 'scheduler', 'worker', 'physical execution time', 'deadline miss',
+                             'execution time p95', 'execution time p99', 'maximum deadline miss',
+                             'execution time stdev between task sets', 'execution time stdev within task sets', 'censored runs'])
+            for point in points:
+                for r in sorted(point['results'], key=lambda r: (r['scheduler'], r['workers'])):
+                    writer.writerow([point['id'], point['entry'], point['config']['type']] + [point['params'].get(n, '') for n in names] +
+                                    [point['num_tasksets'], r['scheduler'], r['workers'], r['exe_time'], r['deadline_miss'],
+                                     r['exe_time_p95'], r['exe_time_p99'], r['max_deadline_miss'],
+                                     r['exe_time_between_stdev'], r['exe_time_within_stdev'], r['censored']])
+
+    # Report graphs (see plots/ReportRenderer.py) of the entries with one or two grid parameters:
+    # one parameter gives execution time (95% CI band) and deadline miss lines per number of
+    # workers, two give execution time and deadline miss heatmaps per scheduler and number of workers.
+    def graphs(self, points):
+        entries = {}
+        for point in points:
+            entries.setdefault(point['entry'], []).append(point)
+
+        graphs = []
+        for entry, entry_points in entries.items():
+            names = list(entry_points[0]['params'].keys())
+            axes = [list(dict.fromkeys(p['params'][name] for p in entry_points)) for name in names]
+            if len(names) not in [1, 2] or any(len(axis) < 2 for axis in axes):
+                continue
+            # {(scheduler, workers): {param values: result}}
+            results = {}
+            for point in entry_points:
+                for r in point['results']:
+                    results.setdefault((r['scheduler'], r['workers']), {})[tuple(point['params'][n] for n in names)] = r
+            schedulers = sorted(set(s for s, _ in results.keys()))
+            workers = sorted(set(w for _, w in results.keys()))
+
+            if len(names) == 1:
+                for worker in workers:
+                    def values(key, worker=worker):
+                        return {s: [results[(s, worker)][(v,)][key] if (v,) in results.get((s, worker), {}) else None for v in axes[0]]
+                                for s in schedulers}
+                    intervals = values('exe_time_ci')
+                    graphs.append({'name': f'{entry}/exe_time-workers_{worker}', 'kind': 'lines',
+                                   'title': f'{entry} / {worker} workers', 'caption': f'{entry}: execution time, {worker} workers',
+                                   'xlabel': names[0], 'ylabel': 'Physical Execution times (band: 95% CI)',
+                                   'x': axes[0], 'series': values('exe_time'),
+                                   'band': {s: ([i[0] if i else None for i in intervals[s]], [i[1] if i else None for i in intervals[s]])
+                                            for s in schedulers}})
+                    graphs.append({'name': f'{entry}/deadline_miss-workers_{worker}', 'kind': 'lines',
+                                   'title': f'{entry} / {worker} workers', 'caption': f'{entry}: deadline misses, {worker} workers',
+                                   'xlabel': names[0], 'ylabel': 'Deadline Misses',
+                                   'x': axes[0], 'series': values('deadline_miss')})
+            else:
+                for (scheduler, worker), by_params in sorted(results.items()):
+                    for key, label in [('exe_time', 'Physical Execution time'), ('deadline_miss', 'Deadline Misses')]:
+                        graphs.append({'name': f'{entry}/{key}-{scheduler}-workers_{worker}', 'kind': 'heatmap',
+                                       'title': f'{entry} / {scheduler} / {worker} workers', 'caption': f'{entry}: {label}, {scheduler}, {worker} workers',
+                                       'xlabel': names[0], 'ylabel': names[1], 'zlabel': label,
+                                       'x': axes[0], 'y': axes[1],
+                                       'z': [[by_params[(x, y)][key] if (x, y) in by_params else None for x in axes[0]] for y in axes[1]]})
+        return graphs
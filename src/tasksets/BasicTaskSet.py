@@ -5,7 +5,11 @@
 
 import os
 import sys
-import numpy as np
+
+from profiling.Profiler import PROFILER
+from tasksets.LFWriter import LFWriter
+from tasksets.LegacyRandomState import LegacyRandomState
+from tasksets.TaskSetModel import TaskSetModel, time_literal
 
 class BasicTaskSet(object):
 
@@ -21,6 +25,10 @@ class BasicTaskSet(object):
             'utilization': 0.6,
             'seed': 0,
             'p_deadline': 0.6,
+            # Enable LF runtime tracing (<name>.lft written next to the binary's working directory)
+            'tracing': False,
+            # Print a progress line on every deadline miss (runs stopped at max_deadline_misses)
+            'miss_progress': False,
         }
 
         if os.path.isfile(TEMPLATE_PATH) == True:
@@ -35,18 +43,27 @@ class BasicTaskSet(object):
                 self.config[key] = value
 
 
-    def makeLF(self, outputDir='./'):
+    # writer: LFWriter collecting the manifest of written files (a new one if None)
+    # model: TaskSetModel to render (drawn from the config if None)
+    def makeLF(self, outputDir='./', writer=None, model=None):
         if not os.path.isdir(outputDir):
             raise RuntimeError("No output directory: " + outputDir)
+        if writer == None:
+            writer = LFWriter()
+        if model == None:
+            model = self.model()
         
         char_to_replace = {}
         char_to_replace['$TOTAL_TIME$'] = f'{self.config["timeout"]["value"]} {self.config["timeout"]["timeUnit"]}'
         char_to_replace['$UTILIZATION$'] = str(self.config['utilization'])
         char_to_replace['$PERIODIC$'] = 'true' if self.config['periodicity'] == 'periodic' else 'false'
         char_to_replace['$PERIOD$'] = f'{self.config["period"]["value"]} {self.config["period"]["timeUnit"]}'
-        char_to_replace['$NUM_TASKS$'] = str(self.config['num_tasks'])
+        char_to_replace['$NUM_TASKS$'] = str(len(model.tasks))
         char_to_replace['$RANDOM_SEED$'] = str(self.config['seed'])
-        char_to_replace['$TASKCONFIG$'] = self.task_config()
+        char_to_replace['$TASKCONFIG$'] = self.task_config(model)
+        char_to_replace['$TRACING$'] = ',\n    tracing: true' if self.config['tracing'] else ''
+        char_to_replace['$TRACING_DEFINE$'] = '#define TASK_SET_TRACING_IN' if self.config['tracing'] else ''
+        char_to_replace['$MISS_PROGRESS_DEFINE$'] = '#define TASK_SET_MISS_PROGRESS' if self.config['miss_progress'] else ''
 
         workers = [w for w in range(self.config['min_workers'], self.config['max_workers']+1)]
         generated_files = {
@@ -67,19 +84,16 @@ class BasicTaskSet(object):
                 FILE_NAME = f'{self.config["periodicity"].capitalize()}_{scheduler}_{worker}.lf'
                 FILE_PATH = f'{outputDir}/{FILE_NAME}'
 
-                contents = self.template
-                for k, v in char_to_replace.items():
-                    contents = contents.replace(k, v)
+                with PROFILER.stage('render', file=FILE_NAME):
+                    contents = self.template
+                    for k, v in char_to_replace.items():
+                        contents = contents.replace(k, v)
 
-                with open(FILE_PATH, 'w') as lf_file:
-                    lf_file.write(contents)
-                    lf_file.close()
+                with PROFILER.stage('write', file=FILE_NAME):
+                    status = writer.write(FILE_PATH, contents)
 
-                if os.path.isfile(FILE_PATH) == True:
-                    print(f'File saved: {FILE_PATH}')
-                    generated_files['schedulers'][scheduler].append(FILE_PATH)
-                else:
-                    raise RuntimeError('Failed to generate LF file: ' + FILE_PATH)
+                print(f'File {"saved" if status == "written" else "unchanged"}: {FILE_PATH}')
+                generated_files['schedulers'][scheduler].append(FILE_PATH)
 
         return generated_files
 
@@ -92,50 +106,64 @@ class BasicTaskSet(object):
         }
         return TimeValue['value'] * TimeUnits[TimeValue['timeUnit']]
 
-    def task_config(self):
-        configs = ""
-
-        deadlines = np.random.rand(self.config['num_tasks'])
-        deadline_task_indexs = deadlines <= self.config['p_deadline']
-        deadlines[~deadline_task_indexs] = 0
+    # Draw the tasks of the config (see TaskSetModel)
+    def model(self):
+        # Seed the draw so that a (config, seed) pair always yields the same task set.
+        # (Same draws as np.random.RandomState(seed), without importing NumPy.)
+        rng = LegacyRandomState(self.config['seed'] if isinstance(self.config['seed'], int) else None)
+        deadlines = rng.rand(self.config['num_tasks'])
+        deadline_task_indexs = [d <= self.config['p_deadline'] for d in deadlines]
+        deadlines = [d if has_deadline else 0 for d, has_deadline in zip(deadlines, deadline_task_indexs)]
 
         total_time = self.translate_TimeValue(self.config['timeout'])
 
         if self.config['periodicity'] == 'sporadic':
             
             exe_time = int(total_time * self.config['utilization'] / float(self.config['num_tasks']))
-            if self.config['p_deadline'] > 0 and deadlines.sum() > 0:
+            if self.config['p_deadline'] > 0 and sum(deadlines) > 0:
                 ratio = (total_time - exe_time) / float(self.config['p_deadline'])
                 print(f"sproadic -> ratio: {ratio}")
-                deadlines[deadline_task_indexs] = deadlines[deadline_task_indexs] * ratio + exe_time
+                deadlines = [d * ratio + exe_time if has_deadline else d for d, has_deadline in zip(deadlines, deadline_task_indexs)]
         
         elif self.config['periodicity'] == 'periodic':
             period = self.translate_TimeValue(self.config['period'])
             exe_time = int(period * self.config['utilization'] / float(self.config['num_tasks']))
-            if self.config['p_deadline'] > 0 and deadlines.sum() > 0:
+            if self.config['p_deadline'] > 0 and sum(deadlines) > 0:
                 ratio = (period - exe_time) / float(self.config['p_deadline'])
                 print(f"periodic -> ratio: {ratio}")
-                deadlines[deadline_task_indexs] = deadlines[deadline_task_indexs] * ratio + exe_time
+                deadlines = [d * ratio + exe_time if has_deadline else d for d, has_deadline in zip(deadlines, deadline_task_indexs)]
+
+        deadlines = [int(d) for d in deadlines]
+        rng.shuffle(deadlines)
 
-        deadlines = np.array([int(d) for d in deadlines])
-        np.random.shuffle(deadlines)
-        deadline_task_indexs = deadlines > 0
+        period = int(self.translate_TimeValue(self.config['period']))
+        release_time = period if self.config['periodicity'] == 'periodic' else 0
+        tasks = [{'id': i, 'exe_time': exe_time, 'deadline': d, 'release_time': release_time, 'period': period}
+                 for i, d in enumerate(deadlines)]
+        return TaskSetModel('basic', dict(self.config), tasks=tasks)
+
+    def task_config(self, model=None):
+        if model == None:
+            model = self.model()
+        configs = ""
 
         total_time = f"{self.config['timeout']['value']} {self.config['timeout']['timeUnit']}"
-        exe_time = f"{exe_time} nsec"
-        period = f"{self.config['period']['value']} {self.config['period']['timeUnit']}"
         periodicity = "true" if self.config['periodicity'] == 'periodic' else "false"
-        release_time = f"{period}" if self.config['periodicity'] == 'periodic' else "0 nsec"
-
-        for i, d in enumerate(deadlines):
-            if d > 0:
-                configs += f"\ttask{i} = new TaskWithDeadline(id={i}, release_time={release_time}, total_time={total_time}, exe_time={exe_time}, periodic={periodicity}, period={period}, deadline_time={d} nsec);\n"
+        period_unit = self.config['period']['timeUnit']
+
+        for task in model.tasks:
+            i = task['id']
+            exe_time = time_literal(task['exe_time'])
+            period = time_literal(task['period'], period_unit)
+            release_time = time_literal(task['release_time'], period_unit if self.config['periodicity'] == 'periodic' else 'nsec')
+            if task['deadline'] > 0:
+                configs += f"\ttask{i} = new TaskWithDeadline(id={i}, release_time={release_time}, total_time={total_time}, exe_time={exe_time}, periodic={periodicity}, period={period}, deadline_time={task['deadline']} nsec);\n"
             else: 
                 configs += f"\ttask{i} = new TaskWithoutDeadline(id={i}, release_time={release_time}, total_time={total_time}, exe_time={exe_time}, periodic={periodicity}, period={period});\n"
 
         configs += "\n"
 
-        for i in range(deadlines.size):
-            configs += f"\trunner.out -> task{i}.in;\n"
+        for task in model.tasks:
+            configs += f"\trunner.out -> task{task['id']}.in;\n"
 
         return configs
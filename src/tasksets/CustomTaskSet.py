@@ -1,17 +1,116 @@
 # User customized Taskset
 # @author Yunsang Cho
+#
+# Besides $SCHEDULER_TYPE$, $NUM_WORKERS$ and $MISS_PROGRESS_DEFINE$ (defines
+# TASK_SET_MISS_PROGRESS when runs are stopped at a number of deadline misses), a template may declare its own placeholders in
+# its header comment, one per line:
+#   @param <NAME> <type> <values>
+# type is int, float, time, bool or str; values are a comma-separated list or, for int,
+# float and time, an inclusive range start..stop[:step] (time ranges end with the unit):
+#   * @param EXE_TIME time 50..250:50 msec
+#   * @param DEADLINE time 100 msec, 200 msec
+#   * @param PERIODIC bool true, false
+# $NAME$ is replaced by the value in the 'params' setting, or by the first declared value.
+# The declared values are the template's sweep grid (see TasksetGenerator.templateGrid).
+# Templates are parsed once per process and file version, then rendered from their parts.
 
 import os
+import re
 import sys
-import numpy as np
+import itertools
+
+from profiling.Profiler import PROFILER
+from tasksets.LFWriter import LFWriter
+
+PARAM_TYPES = ['int', 'float', 'time', 'bool', 'str']
+PARAM_LINE = re.compile(r'@param\s+([A-Z][A-Z0-9_]*)\s+(\w+)\s+(.+?)\s*$', re.MULTILINE)
+PLACEHOLDER = re.compile(r'\$([A-Z][A-Z0-9_]*)\$')
+RANGE = re.compile(r'^(-?[0-9.]+)\s*\.\.\s*(-?[0-9.]+)(?:\s*:\s*([0-9.]+))?(?:\s+([a-z]+))?$')
+
+# {path: (mtime, parsed template)}
+_TEMPLATES = {}
+
+# A declared or given value of a placeholder, normalized (time values as '<number> <unit>')
+def convert(name, type, value):
+    try:
+        if type == 'int':
+            return int(value)
+        if type == 'float':
+            return float(value)
+        if type == 'bool':
+            if isinstance(value, bool):
+                return value
+            if str(value).lower() in ['true', 'false']:
+                return str(value).lower() == 'true'
+            raise ValueError(value)
+        if type == 'time':
+            number, unit = str(value).split()
+            number = float(number)
+            return f'{int(number) if number.is_integer() else number} {unit}'
+        return str(value)
+    except ValueError:
+        raise RuntimeError(f"Invalid {type} value of template parameter {name}: {value}")
+
+# Text of a value in LF code
+def render_value(type, value):
+    if type == 'bool':
+        return 'true' if value else 'false'
+    return str(value)
+
+def parse_values(name, type, text):
+    match = RANGE.match(text.strip())
+    if match != None and type in ['int', 'float', 'time']:
+        start, stop, step, unit = match.groups()
+        if (type == 'time') != (unit != None):
+            raise RuntimeError(f"Only time ranges of template parameter {name} have a unit: {text}")
+        number = int if type == 'int' and '.' not in start + stop + (step or '') else float
+        start, stop, step = number(start), number(stop), number(step or 1)
+        if step <= 0:
+            raise RuntimeError(f"Invalid step of template parameter {name}: {text}")
+        count = int((stop - start) / step + 1e-9) + 1
+        values = [start + i * step for i in range(count)]
+        if number == float:
+            values = [round(v, 12) for v in values]
+        return [convert(name, type, f'{v} {unit}' if unit != None else v) for v in values]
+    return [convert(name, type, value.strip()) for value in text.split(',')]
+
+# {'parts': literal text and placeholder names, alternating, 'params': {name: {'type', 'values'}}}
+def parse_template(text):
+    params = {}
+    for name, type, values in PARAM_LINE.findall(text):
+        if type not in PARAM_TYPES:
+            raise RuntimeError(f"Unknown type of template parameter {name}: {type} (use {', '.join(PARAM_TYPES)})")
+        params[name] = {'type': type, 'values': parse_values(name, type, values)}
+    return {'parts': PLACEHOLDER.split(text), 'params': params}
+
+def load_template(path):
+    mtime = os.path.getmtime(path)
+    if path not in _TEMPLATES or _TEMPLATES[path][0] != mtime:
+        with open(path) as f:
+            _TEMPLATES[path] = (mtime, parse_template(f.read()))
+    return _TEMPLATES[path][1]
+
+# Placeholders without a value are left as they are
+def render(parts, values):
+    return ''.join(values.get(part, f'${part}$') if i % 2 == 1 else part for i, part in enumerate(parts))
+
+# Every combination of the declared values; grid: {name: [values]} replacing some of them
+def template_grid(template, grid=None):
+    grid = grid or {}
+    for name in grid:
+        if name not in template['params']:
+            raise RuntimeError("Undeclared template parameter: " + name)
+    names = list(template['params'].keys())
+    values = [[convert(name, template['params'][name]['type'], v) for v in (grid[name] if isinstance(grid[name], list) else [grid[name]])]
+              if name in grid else template['params'][name]['values'] for name in names]
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
 
 class CustomTaskSet(object):
 
     def __init__(self, TEMPLATE_PATH=''):
 
         if os.path.isfile(TEMPLATE_PATH) == True:
-            with open(TEMPLATE_PATH) as f:
-                self.template = f.read()
+            self.template = load_template(TEMPLATE_PATH)
         else:
             raise RuntimeError('Invalid template path: ' + TEMPLATE_PATH)
 
@@ -19,19 +118,39 @@ class CustomTaskSet(object):
             'schedulers': ['NP'],
             'min_workers': 1,
             'max_workers': 20,
-            'filename': TEMPLATE_PATH.split('/')[-1].split('.')[0]
+            'filename': TEMPLATE_PATH.split('/')[-1].split('.')[0],
+            # Values of the declared placeholders: {name: value}
+            'params': {},
+            # Print a progress line on every deadline miss (runs stopped at max_deadline_misses)
+            'miss_progress': False,
         }
 
     def setConfig(self, config):
         for key, value in config.items():
             if key in self.config.keys():
                 self.config[key] = value
-    
-    def makeLF(self, outputDir='./'):
+
+    # Text of every declared placeholder: the given value or the first declared one
+    def param_values(self):
+        declared = self.template['params']
+        for name in self.config['params']:
+            if name not in declared:
+                raise RuntimeError("Undeclared template parameter: " + name)
+        values = {}
+        for name, param in declared.items():
+            value = self.config['params'].get(name, param['values'][0])
+            values[name] = render_value(param['type'], convert(name, param['type'], value))
+        return values
+
+    # writer: LFWriter collecting the manifest of written files (a new one if None)
+    def makeLF(self, outputDir='./', writer=None):
         if not os.path.isdir(outputDir):
             raise RuntimeError("No output directory: " + outputDir)
-        
-        char_to_replace = {}
+        if writer == None:
+            writer = LFWriter()
+
+        char_to_replace = self.param_values()
+        char_to_replace['MISS_PROGRESS_DEFINE'] = '#define TASK_SET_MISS_PROGRESS' if self.config['miss_progress'] else ''
 
         workers = [w for w in range(self.config['min_workers'], self.config['max_workers']+1)]
         generated_files = {
@@ -45,24 +164,19 @@ class CustomTaskSet(object):
         }
 
         for scheduler in self.config['schedulers']:
-            char_to_replace['$SCHEDULER_TYPE$'] = scheduler
+            char_to_replace['SCHEDULER_TYPE'] = scheduler
             for worker in workers:
-                char_to_replace['$NUM_WORKERS$'] = str(worker)
+                char_to_replace['NUM_WORKERS'] = str(worker)
                 FILE_NAME = f'{self.config["filename"].capitalize()}_{scheduler}_{worker}.lf'
                 FILE_PATH = f'{outputDir}/{FILE_NAME}'
 
-                contents = self.template
-                for k, v in char_to_replace.items():
-                    contents = contents.replace(k, v)
-
-                with open(FILE_PATH, 'w') as lf_file:
-                    lf_file.write(contents)
-                    lf_file.close()
-                
-                if os.path.isfile(FILE_PATH) == True:
-                    print(f'File saved: {FILE_PATH}')
-                    generated_files['schedulers'][scheduler].append(FILE_PATH)
-                else:
-                    raise RuntimeError('Failed to generate LF file: ' + FILE_PATH)
+                with PROFILER.stage('render', file=FILE_NAME):
+                    contents = render(self.template['parts'], char_to_replace)
+
+                with PROFILER.stage('write', file=FILE_NAME):
+                    status = writer.write(FILE_PATH, contents)
+
+                print(f'File {"saved" if status == "written" else "unchanged"}: {FILE_PATH}')
+                generated_files['schedulers'][scheduler].append(FILE_PATH)
 
         return generated_files
@@ -2,12 +2,15 @@
 # @author Yunsang Cho
 # @author ByeongGil Jun
 
-import numpy as np
 import os
 import sys
 import random
 from datetime import datetime
 
+from profiling.Profiler import PROFILER
+from tasksets.LFWriter import LFWriter
+from tasksets.TaskSetModel import TaskSetModel, TIME_UNITS
+
 # A node corresponding to one DAG component reactor
 class Node:
     
@@ -22,8 +25,9 @@ class Node:
             self.parents = ['runner']
         self.size= len(self.parents)
 
-    def get_string(self):
-        result = f'{self.name} = new Component_{self.size}();\n'
+    # task_id: index of the node's counters in the run summary
+    def get_string(self, task_id=0):
+        result = f'{self.name} = new Component_{self.size}(id={task_id});\n'
         if self.level == 1:
             return result + f'\trunner.out{self.index} -> {self.name}.in1;\n\n'
 
@@ -46,6 +50,8 @@ class DagTaskSet(object):
             'num_outputs': 4,
             'execution_time': {'value': 100, 'timeUnit': 'msec'},
             'deadline': {'value': 100, 'timeUnit': 'msec'},
+            # Enable LF runtime tracing (<name>.lft written next to the binary's working directory)
+            'tracing': False,
         }
 
         if os.path.isfile(TEMPLATE_PATH) == True:
@@ -59,9 +65,13 @@ class DagTaskSet(object):
             if key in self.config.keys():
                 self.config[key] = value
 
-    def makeLF(self, outputDir='./'):
+    # writer: LFWriter collecting the manifest of written files (a new one if None)
+    # model: TaskSetModel to render (drawn from the config if None)
+    def makeLF(self, outputDir='./', writer=None, model=None):
         if not os.path.isdir(outputDir):
             raise RuntimeError("No output directory: " + outputDir)
+        if writer == None:
+            writer = LFWriter()
         
         char_to_replace = {
             '$STARTOUTPUT$' : '',
@@ -73,6 +83,7 @@ class DagTaskSet(object):
         }
 
         char_to_replace['$TIMEOUT$'] = f'{self.config["timeout"]["value"]} {self.config["timeout"]["timeUnit"]}'
+        char_to_replace['$TRACING$'] = ',\n    tracing: true' if self.config['tracing'] else ''
         
         outputs = [f'out{i}' for i in range(self.config['num_outputs'])]
 
@@ -85,7 +96,9 @@ class DagTaskSet(object):
         char_to_replace['$STARTUPREACTION$'] += "\t=}"
         char_to_replace['$COMPONENTS$'] += self.make_component_reactor()
 
-        char_to_replace['$TASKCONFIG$'] += self.task_config_multiple_inputs(seed=self.config['seed'])
+        task_arr = self.model_nodes(model if model != None else self.model())
+        char_to_replace['$TASKCONFIG$'] += self.task_config_multiple_inputs(task_arr)
+        char_to_replace['$NUM_TASKS$'] = str(sum(len(tasks) for tasks in task_arr))
 
         char_to_replace['$EXE_TIME$'] += f'{self.config["execution_time"]["value"]} {self.config["execution_time"]["timeUnit"]}'
         char_to_replace['$DEADLINE$'] += f'{self.config["deadline"]["value"]} {self.config["deadline"]["timeUnit"]}'
@@ -109,19 +122,16 @@ class DagTaskSet(object):
                 FILE_NAME = f'DAG_{scheduler}_{worker}.lf'
                 FILE_PATH = f'{outputDir}/{FILE_NAME}'
 
-                contents = self.template
-                for k, v in char_to_replace.items():
-                    contents = contents.replace(k, v)
-                
-                with open(FILE_PATH, 'w') as lf_file:
-                    lf_file.write(contents)
-                    lf_file.close()
+                with PROFILER.stage('render', file=FILE_NAME):
+                    contents = self.template
+                    for k, v in char_to_replace.items():
+                        contents = contents.replace(k, v)
                 
-                if os.path.isfile(FILE_PATH) == True:
-                    print(f'File saved: {FILE_PATH}')
-                    generated_files['schedulers'][scheduler].append(FILE_PATH)
-                else:
-                    raise RuntimeError('Failed to generate LF file: ' + FILE_PATH)
+                with PROFILER.stage('write', file=FILE_NAME):
+                    status = writer.write(FILE_PATH, contents)
+
+                print(f'File {"saved" if status == "written" else "unchanged"}: {FILE_PATH}')
+                generated_files['schedulers'][scheduler].append(FILE_PATH)
         
         return generated_files                
 
@@ -130,7 +140,7 @@ class DagTaskSet(object):
         for i in range(1, self.config['num_outputs']+1):
             inputs = [f'in{j}' for j in range(1, i+1)]
             
-            component = f'reactor Component_{i} {{\n'
+            component = f'reactor Component_{i}(id:int=0) {{\n'
                     
             for input in inputs:
                 component += f'\tinput {input}:time;\n'
@@ -139,7 +149,9 @@ class DagTaskSet(object):
             
             # define reaction
             component += f'\treaction({", ".join(inputs)}) -> out {{=\n'
-            component += f'\t\tlong long int physical_start_time = lf_time_physical();\n\n'
+            component += f'\t\tlong long int physical_start_time = lf_time_physical();\n'
+            component += f'\t\tlf_atomic_fetch_add(&total_reactions_triggered, 1);\n'
+            component += f'\t\tlf_atomic_fetch_add(&task_releases[self->id], 1);\n\n'
             component += f'\t\tif (in1->is_present) {{\n\t\t\tself->exe_time = in1->value;\n\t\t}}'
             
             for input in inputs[1:]:
@@ -153,10 +165,12 @@ class DagTaskSet(object):
 
         return result
 
-    def task_config_multiple_inputs(self, seed=datetime.now()):
-        random.seed(seed)
+    # Levels of Nodes, the first one fed by the runner.
+    # Drawn from a generator of its own (same draws as random.seed(seed)), not the global one.
+    def task_nodes(self, seed=datetime.now()):
+        rng = random.Random(seed)
 
-        heights = [random.randint(1, self.config['num_outputs']) for _ in range(self.config['max_depth'])]
+        heights = [rng.randint(1, self.config['num_outputs']) for _ in range(self.config['max_depth'])]
         heights[0] = self.config['num_outputs']
 
         arr_for_random = [[i for i in range(N)] for N in range(1, self.config['num_outputs']+1)]
@@ -167,14 +181,41 @@ class DagTaskSet(object):
                 for h in range(height):
                     task_arr[i].append(Node(f'{i+1}_{h}', []))
             else:
-                sizes = [random.randint(1, heights[i-1]) for _ in range(height)]
+                sizes = [rng.randint(1, heights[i-1]) for _ in range(height)]
                 for h in range(height):
-                    random.shuffle(arr_for_random[heights[i-1]-1])
+                    rng.shuffle(arr_for_random[heights[i-1]-1])
                     task_arr[i].append(Node(f'{i+1}_{h}', arr_for_random[heights[i-1]-1][:sizes[h]].copy()))
 
+        return task_arr
+
+    # Draw the DAG of the config (see TaskSetModel); every node runs for execution_time
+    def model(self):
+        exe_time = int(self.translate_TimeValue(self.config['execution_time']))
+        nodes = []
+        for tasks in self.task_nodes(seed=self.config['seed']):
+            for task in tasks:
+                parents = [int(p.split('_')[-1]) for p in task.parents] if task.level > 1 else []
+                nodes.append({'level': task.level, 'index': task.index, 'exe_time': exe_time, 'parents': parents})
+        return TaskSetModel('dag', dict(self.config), nodes=nodes)
+
+    # Levels of Nodes of a model
+    def model_nodes(self, model):
+        task_arr = []
+        for node in model.nodes:
+            while len(task_arr) < node['level']:
+                task_arr.append([])
+            task_arr[node['level'] - 1].append(Node(f'{node["level"]}_{node["index"]}', node['parents']))
+        return task_arr
+
+    def translate_TimeValue(self, TimeValue):
+        return TimeValue['value'] * TIME_UNITS[TimeValue['timeUnit']]
+
+    def task_config_multiple_inputs(self, task_arr):
         task_config = ''
+        task_id = 0
         for tasks in task_arr:
             for task in tasks:
-                task_config += task.get_string() + '\t'
+                task_config += task.get_string(task_id) + '\t'
+                task_id += 1
 
         return task_config
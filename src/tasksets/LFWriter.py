@@ -0,0 +1,60 @@
+# LF Writer
+# Writes generated LF files atomically: the contents go to a temporary file in the same
+# directory through one large buffer, which is then renamed over the target, so a crash
+# never leaves a truncated .lf file behind. A file whose contents are already there is
+# left untouched (same mtime), so incremental builds and caches downstream stay valid.
+# Every write is recorded in a manifest of paths, SHA-256 hashes and statuses.
+
+import os
+import hashlib
+import threading
+
+class LFWriter(object):
+
+    def __init__(self):
+        self.config = {
+            # Bytes buffered before a write() system call
+            'buffer_size': 1 << 20,
+        }
+        # [{'path', 'sha256', 'bytes', 'status'}] in write order
+        self.manifest = []
+
+    def setConfig(self, config):
+        for key, value in config.items():
+            if key in self.config.keys():
+                self.config[key] = value
+
+    # Write contents to path unless it already holds them; returns 'written' or 'unchanged'.
+    def write(self, path, contents):
+        data = contents.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+
+        if self.existing_digest(path, len(data)) == digest:
+            self.manifest.append({'path': path, 'sha256': digest, 'bytes': len(data), 'status': 'unchanged'})
+            return 'unchanged'
+
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(temp_path, 'wb', buffering=self.config['buffer_size']) as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        self.manifest.append({'path': path, 'sha256': digest, 'bytes': len(data), 'status': 'written'})
+        return 'written'
+
+    # SHA-256 of the file at path, or None if it is missing or not size bytes long
+    def existing_digest(self, path, size):
+        try:
+            if os.stat(path).st_size != size:
+                return None
+            with open(path, 'rb') as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        except FileNotFoundError:
+            return None
+
+    def count(self, status):
+        return sum(1 for entry in self.manifest if entry['status'] == status)
@@ -0,0 +1,43 @@
+# Legacy Random State
+# Pure-Python copy of the draws that basic task sets take from np.random.RandomState(seed):
+# rand() and shuffle() of NumPy's legacy MT19937 generator, bit for bit, so that a
+# (config, seed) pair yields the same task set as before. Importing NumPy takes longer
+# than generating a task set, so generation does without it.
+
+import random
+
+class LegacyRandomState(object):
+
+    def __init__(self, seed=None):
+        # Python's Random is the same MT19937; only the seeding differs
+        self.random = random.Random()
+        if seed != None:
+            if seed < 0 or seed > 2**32 - 1:
+                raise RuntimeError("Seed must be between 0 and 2**32 - 1")
+            # init_genrand, as NumPy does for integer seeds (Python uses init_by_array)
+            mt = [seed]
+            for i in range(1, 624):
+                mt.append((1812433253 * (mt[-1] ^ (mt[-1] >> 30)) + i) & 0xffffffff)
+            self.random.setstate((3, tuple(mt) + (624,), None))
+
+    # Uniform doubles in [0, 1): both use genrand_res53
+    def rand(self, size):
+        return [self.random.random() for _ in range(size)]
+
+    # random_interval: the low bits of 32-bit draws, rejected until they are <= max
+    def interval(self, max):
+        if max == 0:
+            return 0
+        mask = max
+        for shift in [1, 2, 4, 8, 16]:
+            mask |= mask >> shift
+        while True:
+            value = self.random.getrandbits(32) & mask
+            if value <= max:
+                return value
+
+    # In-place Fisher-Yates from the back, as RandomState.shuffle on a 1-d array
+    def shuffle(self, x):
+        for i in reversed(range(1, len(x))):
+            j = self.interval(i)
+            x[i], x[j] = x[j], x[i]
@@ -0,0 +1,110 @@
+# Task Set Model
+# The parameters of a generated task set, kept apart from the LF text rendered from them, so
+# that analyses and simulations can read them without parsing LF and one generation can be
+# rendered again (other schedulers, workers or templates) without drawing it again.
+#   basic  tasks  {'id', 'exe_time', 'deadline' (0: none), 'release_time', 'period'} in nsec
+#   dag    nodes  {'level', 'index', 'exe_time', 'parents': [indexes in the previous level]}
+#          (level 1 nodes are fed by the runner)
+# settings holds the config of the generator, from which the rest of the template is filled.
+# Models are saved as JSON (.json) or as NumPy columns (.npz, with the settings as JSON).
+
+import os
+import json
+
+MODEL_VERSION = 1
+TIME_UNITS = {'sec': 1000000000, 'msec': 1000000, 'usec': 1000, 'nsec': 1}
+BASIC_COLUMNS = ['id', 'exe_time', 'deadline', 'release_time', 'period']
+NODE_COLUMNS = ['level', 'index', 'exe_time']
+
+# LF time literal of nsec, in unit when it is a whole number of them
+def time_literal(nsec, unit='nsec'):
+    factor = TIME_UNITS.get(unit, 1)
+    if nsec % factor == 0:
+        return f'{nsec // factor} {unit}'
+    return f'{nsec} nsec'
+
+class TaskSetModel(object):
+
+    def __init__(self, type, settings, tasks=None, nodes=None):
+        if type not in ['basic', 'dag']:
+            raise RuntimeError("Task set models are 'basic' or 'dag': " + str(type))
+        self.type = type
+        self.settings = settings
+        self.tasks = tasks if tasks != None else []
+        self.nodes = nodes if nodes != None else []
+
+    def __len__(self):
+        return len(self.tasks) if self.type == 'basic' else len(self.nodes)
+
+    # Edges (parent, child) of a DAG as 'task_<level>_<index>' names, 'runner' feeding level 1
+    def edges(self):
+        edges = []
+        for node in self.nodes:
+            child = f'task_{node["level"]}_{node["index"]}'
+            if node['level'] == 1:
+                edges.append(('runner', child))
+            edges += [(f'task_{node["level"] - 1}_{p}', child) for p in node['parents']]
+        return edges
+
+    def to_dict(self):
+        model = {'version': MODEL_VERSION, 'type': self.type, 'settings': self.settings}
+        if self.type == 'basic':
+            model['tasks'] = self.tasks
+        else:
+            model['nodes'] = self.nodes
+        return model
+
+    @staticmethod
+    def from_dict(model):
+        if model.get('version') != MODEL_VERSION:
+            raise RuntimeError("Unsupported task set model version: " + str(model.get('version')))
+        return TaskSetModel(model['type'], model['settings'], model.get('tasks'), model.get('nodes'))
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if len(directory) > 0:
+            os.makedirs(directory, exist_ok=True)
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.json':
+            with open(path, 'w') as f:
+                # Seeds may be datetimes (unseeded generators)
+                json.dump(self.to_dict(), f, indent=1, default=str)
+        elif extension == '.npz':
+            import numpy as np
+            meta = {'version': MODEL_VERSION, 'type': self.type, 'settings': self.settings}
+            arrays = {'meta': np.array(json.dumps(meta, default=str))}
+            if self.type == 'basic':
+                for column in BASIC_COLUMNS:
+                    arrays[column] = np.array([task[column] for task in self.tasks], dtype=np.int64)
+            else:
+                for column in NODE_COLUMNS:
+                    arrays[column] = np.array([node[column] for node in self.nodes], dtype=np.int64)
+                # Parents as one flat array with an offset per node (CSR)
+                arrays['parents'] = np.array([p for node in self.nodes for p in node['parents']], dtype=np.int64)
+                arrays['parent_offsets'] = np.cumsum([0] + [len(node['parents']) for node in self.nodes]).astype(np.int64)
+            np.savez_compressed(path, **arrays)
+        else:
+            raise RuntimeError("Unknown task set model format (use .json or .npz): " + path)
+
+    @staticmethod
+    def load(path):
+        if not os.path.isfile(path):
+            raise RuntimeError("No task set model: " + path)
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.json':
+            with open(path) as f:
+                return TaskSetModel.from_dict(json.load(f))
+        elif extension == '.npz':
+            import numpy as np
+            with np.load(path) as arrays:
+                model = json.loads(str(arrays['meta']))
+                if model['type'] == 'basic':
+                    columns = {column: arrays[column].tolist() for column in BASIC_COLUMNS}
+                    model['tasks'] = [dict(zip(BASIC_COLUMNS, row)) for row in zip(*[columns[c] for c in BASIC_COLUMNS])]
+                else:
+                    columns = {column: arrays[column].tolist() for column in NODE_COLUMNS}
+                    parents, offsets = arrays['parents'].tolist(), arrays['parent_offsets'].tolist()
+                    model['nodes'] = [dict(zip(NODE_COLUMNS, row), parents=parents[offsets[i]:offsets[i + 1]])
+                                      for i, row in enumerate(zip(*[columns[c] for c in NODE_COLUMNS]))]
+            return TaskSetModel.from_dict(model)
+        raise RuntimeError("Unknown task set model format (use .json or .npz): " + path)
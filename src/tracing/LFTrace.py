@@ -0,0 +1,138 @@
+# LF Trace
+# Reads the binary trace (<name>.lft) that the LF C runtime writes when the target has
+# 'tracing: true', without going through trace_to_csv. The records are mapped straight
+# into a NumPy structured array, so traces of millions of events load in one pass.
+#
+# File layout (reactor-c trace.c):
+#   header: start time (int64), table size (int32), then per traced object
+#           self pointer, trigger pointer, object type (int32), NUL-terminated description
+#   body:   repeated blocks of a record count (int32) followed by that many trace_record_t
+
+import numpy as np
+
+# trace_record_t on a 64-bit target; align=True reproduces the C struct padding (64 bytes)
+RECORD_DTYPE = np.dtype([
+    ('event_type', '<i4'),
+    ('pointer', '<u8'),
+    ('src_id', '<i4'),
+    ('dst_id', '<i4'),
+    ('logical_time', '<i8'),
+    ('microstep', '<u4'),
+    ('physical_time', '<i8'),
+    ('trigger', '<u8'),
+    ('extra_delay', '<i8'),
+], align=True)
+
+# trace_event_t, in enum order. Runtimes that insert events (e.g. reaction_deadline_missed
+# after reaction_ends) need their own list passed to read_trace.
+EVENT_TYPES = [
+    'reaction_starts',
+    'reaction_ends',
+    'schedule_called',
+    'user_event',
+    'user_value',
+    'worker_wait_starts',
+    'worker_wait_ends',
+    'scheduler_advancing_time_starts',
+    'scheduler_advancing_time_ends',
+]
+
+class LFTrace(object):
+
+    def __init__(self, start_time, objects, records, event_types=EVENT_TYPES):
+        self.start_time = start_time
+        # [{'pointer', 'trigger', 'type', 'description'}] of every traced reactor, trigger and user event
+        self.objects = objects
+        self.records = records
+        self.event_types = event_types
+        self.descriptions = {o['pointer']: o['description'] for o in objects}
+
+    def event(self, name):
+        return self.event_types.index(name)
+
+    def workers(self):
+        reactions = self.records[np.isin(self.records['event_type'], [self.event('reaction_starts'), self.event('reaction_ends')])]
+        return np.unique(reactions['src_id'])
+
+    # Paired (start, end) physical times of one event kind per worker, relative to the start time.
+    # The runtime reports reaction and wait events with the worker number as src_id.
+    # Returns {worker: (starts, ends, pointers)} with int64 nanosecond arrays.
+    def intervals(self, kind='reaction'):
+        start_type, end_type = self.event(kind + '_starts'), self.event(kind + '_ends')
+        records = self.records[np.isin(self.records['event_type'], [start_type, end_type])]
+        # Stable sort by worker, then time; a start sorts before an end with the same timestamp
+        order = np.lexsort((records['event_type'] != start_type, records['physical_time'], records['src_id']))
+        records = records[order]
+
+        intervals = {}
+        for worker in np.unique(records['src_id']):
+            events = records[records['src_id'] == worker]
+            starts = events[events['event_type'] == start_type]
+            ends = events[events['event_type'] == end_type]
+            # A run stopped at the timeout may leave the last start unmatched
+            n = min(len(starts), len(ends))
+            intervals[int(worker)] = (starts['physical_time'][:n] - self.start_time,
+                                      ends['physical_time'][:n] - self.start_time,
+                                      starts['pointer'][:n])
+        return intervals
+
+    # Busy fraction of every worker in `bins` equal slices of [0, end]. Returns (edges, {worker: fractions}).
+    def utilization(self, bins=100, end=None):
+        intervals = self.intervals('reaction')
+        if end == None:
+            end = max([ends[-1] for _, ends, _ in intervals.values() if len(ends) > 0], default=0)
+        edges = np.linspace(0, max(end, 1), bins + 1)
+        utilization = {}
+        for worker, (starts, ends, _) in intervals.items():
+            utilization[worker] = np.diff(busy_time(starts, ends, edges)) / np.diff(edges)
+        return edges, utilization
+
+    # Values logged with tracepoint_user_value, e.g. the task ID of the basic task sets
+    def user_values(self, description=None):
+        records = self.records[self.records['event_type'] == self.event('user_value')]
+        if description != None:
+            pointers = [p for p, d in self.descriptions.items() if d == description]
+            records = records[np.isin(records['pointer'], pointers)]
+        return records['physical_time'] - self.start_time, records['extra_delay']
+
+# Cumulative busy time at each of `times`, for sorted non-overlapping [starts, ends) intervals.
+def busy_time(starts, ends, times):
+    if len(starts) == 0:
+        return np.zeros(len(times))
+    durations = ends - starts
+    cumulative = np.concatenate(([0], np.cumsum(durations)))
+    index = np.searchsorted(starts, times, side='right') - 1
+    inside = np.clip(times - starts[np.maximum(index, 0)], 0, durations[np.maximum(index, 0)])
+    return np.where(index >= 0, cumulative[np.maximum(index, 0)] + inside, 0)
+
+def read_trace(path, event_types=EVENT_TYPES):
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    offset = 0
+
+    def read(dtype):
+        nonlocal offset
+        value = np.frombuffer(data, dtype=dtype, count=1, offset=offset)[0]
+        offset += np.dtype(dtype).itemsize
+        return value
+
+    start_time = int(read('<i8'))
+    objects = []
+    for _ in range(int(read('<i4'))):
+        pointer, trigger, object_type = int(read('<u8')), int(read('<u8')), int(read('<i4'))
+        end = offset
+        while data[end] != 0:
+            end += 1
+        description = bytes(data[offset:end]).decode('utf-8', 'replace')
+        offset = end + 1
+        objects.append({'pointer': pointer, 'trigger': trigger, 'type': object_type, 'description': description})
+
+    # Every flush of a worker's buffer is one block; the records of a block are contiguous
+    blocks = []
+    while offset + 4 <= len(data):
+        count = int(read('<i4'))
+        if count <= 0 or offset + count * RECORD_DTYPE.itemsize > len(data):
+            break
+        blocks.append(np.frombuffer(data, dtype=RECORD_DTYPE, count=count, offset=offset))
+        offset += count * RECORD_DTYPE.itemsize
+    records = np.concatenate(blocks) if len(blocks) > 0 else np.zeros(0, dtype=RECORD_DTYPE)
+    return LFTrace(start_time, objects, records, event_types)